@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the compression of the Play Store API responses (lists of apps, search
+results, categories and bulk details): bytes on the wire and latency of each request,
+with and without gzip, replaying recorded responses over a simulated network link.
+
+Record the responses once (from the local stand-in for the Google Play Store, or from
+the real store with --live), then replay them as many times as needed:
+
+    python3 -m benchmarks.compression --responses responses/ --record
+    python3 -m benchmarks.compression --responses responses/ --bandwidth 1M
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.recorder import ResponseRecorder
+from playstoredownloader.playstore.throttle import parse_rate
+from test.stub_server import StubServer, synthetic_apps, write_credentials
+
+
+def operations(args) -> dict:
+    packages = [f"{args.prefix}{index}" for index in range(args.results)]
+    return {
+        "list": lambda api: api.list_app_by_category(
+            args.category, args.subcategory, args.results
+        ),
+        "search": lambda api: api.search(args.query),
+        "browse": lambda api: api.get_store_categories(),
+        "bulkDetails": lambda api: api.bulk_details(packages),
+    }
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Serve the recorded API responses (compressed with gzip when the client accepts
+    it), simulating the latency and the bandwidth of a network link.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, responses: str, latency: float = 0.0, bandwidth: int = None):
+        super().__init__(("127.0.0.1", 0), ReplayRequestHandler)
+        self.recorder = ResponseRecorder(responses, ResponseRecorder.REPLAY)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.sent_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @contextmanager
+    def serve(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        login_url, api_url = Playstore.LOGIN_URL, Playstore.API_URL
+        Playstore.LOGIN_URL, Playstore.API_URL = f"{self.url}/auth", f"{self.url}/fdfe/"
+        try:
+            yield self
+        finally:
+            Playstore.LOGIN_URL, Playstore.API_URL = login_url, api_url
+            self.shutdown()
+            self.server_close()
+
+    def response_for(self, path: str, query: str, body: bytes) -> bytes:
+        # The same request can be recorded with the query parameters passed
+        # separately or already in the path (e.g., the next pages of a list).
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        data = body or None
+        keys = [ResponseRecorder.key_for(path, params, data)]
+        if query:
+            keys.append(ResponseRecorder.key_for(f"{path}?{query}", None, data))
+        for key in keys:
+            try:
+                return self.recorder.load(key)
+            except RuntimeError:
+                continue
+        raise RuntimeError(f"No recorded response for '{path}'")
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    # Don't delay the body after the headers (the delayed acknowledgments of the
+    # client would add tens of milliseconds to each request).
+    disable_nagle_algorithm = True
+    server: ReplayServer
+
+    def log_message(self, format_string, *args):
+        pass
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self._reply()
+
+    def _reply(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        url = urlparse(self.path)
+
+        content_encoding = None
+        if url.path == "/auth":
+            content = b"SID=stub-sid\nLSID=stub-lsid\nAuth=stub-auth-token\n"
+        else:
+            try:
+                content = self.server.response_for(
+                    url.path[len("/fdfe/") :], url.query, body
+                )
+            except RuntimeError:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                content = gzip.compress(content)
+                content_encoding = "gzip"
+
+        # The time needed to receive the response on the simulated link.
+        delay = self.server.latency
+        if self.server.bandwidth:
+            delay += len(content) / self.server.bandwidth
+        if delay:
+            time.sleep(delay)
+
+        # Count the bytes before sending them, so they are already counted when the
+        # client receives the response.
+        with self.server._lock:
+            self.server.sent_bytes += len(content)
+
+        self.send_response(200)
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def record(args, credentials: str) -> None:
+    def record_all():
+        api = Playstore(
+            credentials,
+            recorder=ResponseRecorder(args.responses, ResponseRecorder.RECORD),
+        )
+        for operation in operations(args).values():
+            operation(api)
+
+    if args.live:
+        record_all()
+    else:
+        apps = synthetic_apps(args.results, prefix=args.prefix)
+        with StubServer(apps) as server, server.patch_playstore():
+            record_all()
+
+    print(f"Responses recorded in '{args.responses}'", file=sys.stderr)
+
+
+def replay(args, credentials: str) -> dict:
+    results = {}
+    server = ReplayServer(args.responses, args.latency, args.bandwidth)
+    with server.serve():
+        for compress in (False, True):
+            api = Playstore(credentials, compress_responses=compress)
+            mode = "gzip" if compress else "identity"
+            for name, operation in operations(args).items():
+                durations = []
+                sent_bytes = server.sent_bytes
+                for _ in range(args.iterations):
+                    start_time = time.perf_counter()
+                    operation(api)
+                    durations.append(time.perf_counter() - start_time)
+                results.setdefault(name, {})[mode] = {
+                    "iterations": args.iterations,
+                    "bytes_per_request": (server.sent_bytes - sent_bytes)
+                    / args.iterations,
+                    "mean_milliseconds": statistics.mean(durations) * 1e3,
+                    "median_milliseconds": statistics.median(durations) * 1e3,
+                }
+
+    for name, modes in results.items():
+        identity, compressed = modes["identity"], modes["gzip"]
+        print(
+            f"{name}: {identity['bytes_per_request']:.0f} -> "
+            f"{compressed['bytes_per_request']:.0f} bytes "
+            f"({compressed['bytes_per_request'] / identity['bytes_per_request']:.0%}), "
+            f"{identity['median_milliseconds']:.2f} -> "
+            f"{compressed['median_milliseconds']:.2f} ms (median)",
+            file=sys.stderr,
+        )
+    return results
+
+
+def get_cmd_args():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.compression",
+        description="Measure the bytes on the wire and the latency of the Play Store "
+        "API requests, with and without compressed responses.",
+    )
+    parser.add_argument(
+        "--responses",
+        type=str,
+        required=True,
+        help="The directory containing the recorded responses",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Record the responses instead of measuring the requests",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Record the responses from the real Google Play Store (requires valid "
+        "credentials) instead of the local stand-in server",
+    )
+    parser.add_argument(
+        "--credentials",
+        type=str,
+        help="The configuration file with the credentials (needed with --live)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="The latency (in seconds) of the simulated link",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=parse_rate,
+        default=None,
+        help='The bandwidth (in bytes per second, e.g., "1M") of the simulated link. '
+        "By default, the bandwidth is not limited",
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--prefix", type=str, default="com.stub.app")
+    parser.add_argument("--query", type=str, default="com.stub")
+    parser.add_argument("--category", type=str, default="TOOLS")
+    parser.add_argument("--subcategory", type=str, default="apps_topselling_free")
+    parser.add_argument("--results", type=int, default=100)
+    parser.add_argument("--output", type=str, help="Where to save the results (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    args = get_cmd_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        credentials = args.credentials or write_credentials(
+            str(Path(work_dir) / "credentials.json")
+        )
+
+        if args.record:
+            record(args, credentials)
+            return
+
+        results = replay(args, credentials)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    # Run the benchmark from the main directory of the project by using this command:
+    # pipenv run python -m benchmarks.compression --responses responses/
+    main()
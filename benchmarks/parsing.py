@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Micro-benchmark of the parsing of the Play Store API responses (search, lists of apps,
+categories and app details), using recorded responses so that the results are
+deterministic and not affected by the network.
+
+Record the responses once (from the local stand-in for the Google Play Store, or from
+the real store with --live), then replay them as many times as needed:
+
+    python3 -m benchmarks.parsing --responses responses/ --record
+    python3 -m benchmarks.parsing --responses responses/ --iterations 1000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from playstoredownloader.playstore.meta import PackageMeta
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.recorder import ResponseRecorder
+from test.stub_server import StubServer, synthetic_apps, write_credentials
+
+
+def operations(args) -> dict:
+    return {
+        "search": lambda api: api.search(args.query),
+        "list_app_by_category": lambda api: api.list_app_by_category(
+            args.category, args.subcategory, args.results
+        ),
+        "get_store_categories": lambda api: api.get_store_categories(),
+        "package_meta": lambda api: PackageMeta(api, args.package),
+    }
+
+
+def record(args, credentials: str) -> None:
+    def record_all():
+        api = Playstore(
+            credentials,
+            recorder=ResponseRecorder(args.responses, ResponseRecorder.RECORD),
+        )
+        for operation in operations(args).values():
+            operation(api)
+
+    if args.live:
+        record_all()
+    else:
+        apps = synthetic_apps(args.results, prefix="com.stub.app")
+        with StubServer(apps) as server, server.patch_playstore():
+            record_all()
+
+    print(f"Responses recorded in '{args.responses}'", file=sys.stderr)
+
+
+def replay(args, credentials: str) -> dict:
+    api = Playstore(
+        credentials, recorder=ResponseRecorder(args.responses, ResponseRecorder.REPLAY)
+    )
+
+    results = {}
+    for name, operation in operations(args).items():
+        durations = []
+        for _ in range(args.iterations):
+            start_time = time.perf_counter()
+            operation(api)
+            durations.append(time.perf_counter() - start_time)
+        results[name] = {
+            "iterations": args.iterations,
+            "mean_microseconds": statistics.mean(durations) * 1e6,
+            "median_microseconds": statistics.median(durations) * 1e6,
+        }
+        print(
+            f"{name}: {results[name]['mean_microseconds']:.1f} us "
+            f"(median {results[name]['median_microseconds']:.1f} us)",
+            file=sys.stderr,
+        )
+    return results
+
+
+def get_cmd_args():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.parsing",
+        description="Measure the parsing of recorded Play Store API responses.",
+    )
+    parser.add_argument(
+        "--responses",
+        type=str,
+        required=True,
+        help="The directory containing the recorded responses",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Record the responses instead of measuring the parsing",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Record the responses from the real Google Play Store (requires valid "
+        "credentials) instead of the local stand-in server",
+    )
+    parser.add_argument(
+        "--credentials",
+        type=str,
+        help="The configuration file with the credentials (needed with --live)",
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--package", type=str, default="com.stub.app0")
+    parser.add_argument("--query", type=str, default="com.stub")
+    parser.add_argument("--category", type=str, default="TOOLS")
+    parser.add_argument("--subcategory", type=str, default="apps_topselling_free")
+    parser.add_argument("--results", type=int, default=100)
+    parser.add_argument("--output", type=str, help="Where to save the results (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    args = get_cmd_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        credentials = args.credentials or write_credentials(
+            str(Path(work_dir) / "credentials.json")
+        )
+
+        if args.record:
+            record(args, credentials)
+            return
+
+        results = replay(args, credentials)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    # Run the benchmark from the main directory of the project by using this command:
+    # pipenv run python -m benchmarks.parsing --responses responses/
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+"""
+End-to-end throughput benchmark of MultiDownloader, against the local stand-in for the
+Google Play Store (see test/stub_server.py), so no credentials or network are needed.
+
+The stand-in server runs in a separate process, so the CPU time and the peak memory
+measured are only those of the downloader. The results are saved as JSON (with the
+commit they were measured on) and can be compared with a previous run to spot
+regressions:
+
+    python3 -m benchmarks.throughput --packages 20 100 --output new.json
+    python3 -m benchmarks.throughput --packages 20 100 --compare new.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from playstoredownloader.downloader.downloader import Downloader
+from playstoredownloader.downloader.multi_downloader import MultiDownloader
+from playstoredownloader.playstore.playstore import Playstore
+from test.stub_server import StubApp, StubServer, write_credentials
+
+# The metrics compared between runs, and whether higher values are better.
+COMPARED_METRICS = {
+    "packages_per_minute": True,
+    "megabytes_per_second": True,
+    "cpu_seconds": False,
+    "peak_rss_megabytes": False,
+}
+
+
+def file_sizes(count: int, mean_size: int, distribution: str, seed: int) -> list:
+    """
+    Generate the sizes of the apk files of the benchmark.
+
+    :param count: The number of sizes to generate.
+    :param mean_size: The mean size (in bytes).
+    :param distribution: "fixed" (all the files have the mean size), "uniform"
+                         (between 0 and twice the mean size) or "lognormal" (a few big
+                         files and many small ones, as in the real store).
+    :param seed: The seed of the random generator.
+    :return: A list of sizes (in bytes).
+    """
+
+    generator = random.Random(seed)
+    if distribution == "fixed":
+        return [mean_size] * count
+    if distribution == "uniform":
+        return [generator.randint(1, 2 * mean_size) for _ in range(count)]
+    if distribution == "lognormal":
+        # With sigma=1, the mean of the distribution is exp(mu + 1/2).
+        sigma = 1.0
+        mu = math.log(max(mean_size, 1)) - sigma**2 / 2
+        return [max(1, int(generator.lognormvariate(mu, sigma))) for _ in range(count)]
+    raise ValueError(f"Unknown size distribution '{distribution}'")
+
+
+def run_server(apps: list, options: dict, address_queue) -> None:
+    server = StubServer(apps, **options)
+    address_queue.put((server.login_url, server.api_url))
+    server.serve_forever()
+
+
+def run_scenario(args, package_count: int) -> dict:
+    sizes = file_sizes(package_count, args.apk_size, args.distribution, args.seed)
+    apps = [
+        StubApp(
+            f"com.benchmark.app{index}",
+            apk_size=size,
+            split_sizes={"config.en": args.split_size} if args.split_size else {},
+        )
+        for index, size in enumerate(sizes)
+    ]
+    server_options = {
+        "latency": args.latency,
+        "file_latency": args.latency,
+        "bandwidth": args.bandwidth,
+    }
+
+    address_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=run_server, args=(apps, server_options, address_queue), daemon=True
+    )
+    server.start()
+    Playstore.LOGIN_URL, Playstore.API_URL = address_queue.get(timeout=30)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="benchmark-"))
+    try:
+        credentials = write_credentials(str(work_dir / "credentials.json"))
+        downloader = Downloader(
+            False, bool(args.split_size), credentials, work_dir / "out", None
+        )
+        packages = [app.package_name for app in apps]
+
+        start_cpu = time.process_time()
+        start_time = time.perf_counter()
+        MultiDownloader(packages, downloader, prefetch=args.prefetch).download()
+        elapsed = time.perf_counter() - start_time
+        cpu_seconds = time.process_time() - start_cpu
+    finally:
+        server.terminate()
+        server.join()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    total_bytes = sum(sizes) + args.split_size * package_count
+    return {
+        "packages": package_count,
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "packages_per_minute": package_count * 60 / elapsed,
+        "megabytes_per_second": total_bytes / 1e6 / elapsed,
+        "cpu_seconds": cpu_seconds,
+        # On Linux, ru_maxrss is in kilobytes (and it's the peak of the process).
+        "peak_rss_megabytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    baseline_scenarios = {
+        scenario["packages"]: scenario for scenario in baseline["scenarios"]
+    }
+    print(f"Comparison with {baseline.get('commit')} (positive is better):")
+    for scenario in results["scenarios"]:
+        old = baseline_scenarios.get(scenario["packages"])
+        if old is None:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if not old[metric]:
+                continue
+            change = 100 * (scenario[metric] - old[metric]) / old[metric]
+            changes.append(f"{metric} {change if higher_is_better else -change:+.1f}%")
+        print(f"  {scenario['packages']} packages: " + ", ".join(changes))
+
+
+def get_cmd_args():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks.throughput",
+        description="Measure the throughput of the downloads against a local "
+        "stand-in for the Google Play Store.",
+    )
+    parser.add_argument(
+        "--packages",
+        type=int,
+        nargs="+",
+        default=[20],
+        help="The number of packages to download in each scenario",
+    )
+    parser.add_argument(
+        "--apk-size", type=int, default=5 * 1024 * 1024, help="Mean apk size (bytes)"
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=("fixed", "uniform", "lognormal"),
+        default="lognormal",
+        help="The distribution of the apk sizes",
+    )
+    parser.add_argument(
+        "--split-size", type=int, default=0, help="Size of a split apk per package"
+    )
+    parser.add_argument("--prefetch", type=int, default=2)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Server latency (seconds)"
+    )
+    parser.add_argument(
+        "--bandwidth", type=int, default=None, help="Bandwidth per file (bytes/s)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, help="Where to save the results (JSON)")
+    parser.add_argument("--compare", type=str, help="Previous results (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    args = get_cmd_args()
+
+    results = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "recorded": time.time(),
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "compare")
+        },
+        "scenarios": [],
+    }
+
+    for package_count in args.packages:
+        scenario = run_scenario(args, package_count)
+        results["scenarios"].append(scenario)
+        print(
+            f"{package_count} packages: {scenario['packages_per_minute']:.1f} "
+            f"packages/min, {scenario['megabytes_per_second']:.1f} MB/s, "
+            f"{scenario['cpu_seconds']:.2f} CPU s, "
+            f"{scenario['peak_rss_megabytes']:.1f} MB peak RSS",
+            file=sys.stderr,
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    # Run the benchmark from the main directory of the project by using this command:
+    # pipenv run python -m benchmarks.throughput
+    main()
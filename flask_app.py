@@ -3,20 +3,51 @@
 import logging
 import os
 import re
+import threading
+from urllib.request import pathname2url
 
-from flask import Flask, make_response, jsonify
-from flask import render_template
+from flask import Flask, make_response, jsonify, abort
+from flask import render_template, request, send_file, Response
 from flask_socketio import SocketIO, emit
+from werkzeug.security import safe_join
 
 from playstoredownloader.downloader.out_dir import OutDir
+from playstoredownloader.downloader.progress import ProgressBatcher, ProgressThrottle
+from playstoredownloader.downloader.jobs import JobQueue, JobState, QueueFullError
+from playstoredownloader.downloader.manifest import Manifest
+from playstoredownloader.playstore import metrics
 from playstoredownloader.playstore.meta import PackageMeta
 from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.throttle import BandwidthLimiter, parse_rate
 
 if "LOG_LEVEL" in os.environ:
     log_level = os.environ["LOG_LEVEL"]
 else:
     log_level = logging.INFO
 
+# The maximum number of downloads executed at the same time, and the maximum number of
+# downloads waiting to be executed (further requests will be rejected).
+max_concurrent_downloads = int(os.environ.get("MAX_CONCURRENT_DOWNLOADS", 2))
+max_queued_downloads = int(os.environ.get("MAX_QUEUED_DOWNLOADS", 100))
+
+# Progress updates are sent at most every PROGRESS_MIN_INTERVAL seconds and only when
+# the progress changes by at least PROGRESS_MIN_DELTA. The updates of all the downloads
+# followed by a client are sent together every PROGRESS_BATCH_INTERVAL seconds (use 0
+# to send each update as soon as it's available).
+progress_min_interval = float(os.environ.get("PROGRESS_MIN_INTERVAL", 0.25))
+progress_min_delta = int(os.environ.get("PROGRESS_MIN_DELTA", 1))
+progress_batch_interval = float(os.environ.get("PROGRESS_BATCH_INTERVAL", 0.25))
+
+# Optional limits of the download speed (e.g., "2M"): DOWNLOAD_RATE_LIMIT is shared
+# fairly by all the concurrent downloads, DOWNLOAD_RATE_LIMIT_PER_JOB applies to each
+# single download.
+download_rate_limit = os.environ.get("DOWNLOAD_RATE_LIMIT")
+download_rate_limit = parse_rate(download_rate_limit) if download_rate_limit else None
+download_rate_limit_per_job = os.environ.get("DOWNLOAD_RATE_LIMIT_PER_JOB")
+download_rate_limit_per_job = (
+    parse_rate(download_rate_limit_per_job) if download_rate_limit_per_job else None
+)
+
 # Logging configuration.
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -49,6 +80,12 @@ package_name_regex = re.compile(
 
 def create_app():
     app = Flask(__name__)
+    # When running behind a reverse proxy supporting X-Sendfile, let the proxy send the
+    # downloaded files.
+    app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE", "").lower() in (
+        "1",
+        "true",
+    )
     # Create the download directory (if not already existing).
     if not os.path.isdir(downloaded_apk_location):
         os.makedirs(downloaded_apk_location)
@@ -61,6 +98,11 @@ socket = SocketIO(application, ping_timeout=600)
 
 @application.after_request
 def add_cache_header(response):
+    if request.endpoint == "get_download":
+        # The downloaded files can be cached, but they have to be validated (using
+        # their ETag) before being used.
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     response.headers[
         "Cache-Control"
     ] = "public, max-age=0, no-cache, no-store, must-revalidate"
@@ -70,7 +112,9 @@ def add_cache_header(response):
 
 
 @application.errorhandler(400)
+@application.errorhandler(404)
 @application.errorhandler(500)
+@application.errorhandler(503)
 def application_error(error):
     logger.error(error)
     return make_response(jsonify(str(error)), error.code)
@@ -81,54 +125,223 @@ def home():
     return render_template("index.html")
 
 
+@application.route("/downloads/<path:file_name>", methods=["GET"])
+def get_download(file_name):
+    # The file is sent with zero-copy sendfile if supported by the server (or by the
+    # reverse proxy, when USE_X_SENDFILE is enabled), and partial downloads (Range
+    # requests) and conditional requests are supported.
+    file_path = safe_join(downloaded_apk_location, file_name)
+    if (
+        file_path is None
+        or not os.path.isfile(file_path)
+        or os.path.basename(file_path).startswith(".")
+    ):
+        abort(404, f"Unable to find file '{file_name}'")
+
+    # Use the hash computed during the download as ETag (if the file wasn't modified
+    # after the download), so there is no need to read the file to validate the
+    # client's cache.
+    entry = Manifest.for_directory(os.path.dirname(file_path)).get(file_path)
+    return send_file(
+        file_path,
+        as_attachment=True,
+        conditional=True,
+        etag=entry["sha256"] if entry else True,
+    )
+
+
+@application.route("/metrics", methods=["GET"], strict_slashes=False)
+def get_metrics():
+    jobs = download_jobs.jobs()
+    for state in JobState.ALL:
+        jobs_metric.set(sum(1 for job in jobs if job.state == state), state=state)
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+@application.route("/jobs", methods=["GET"], strict_slashes=False)
+def list_jobs():
+    return jsonify([job.to_dict() for job in download_jobs.jobs()])
+
+
+@application.route("/jobs", methods=["POST"], strict_slashes=False)
+def create_job():
+    package_name = (request.get_json(silent=True) or {}).get("package_name", "")
+    if not package_name_regex.match(package_name):
+        abort(400, "Please specify a valid package name")
+    try:
+        job = download_jobs.submit(package_name)
+    except QueueFullError as e:
+        abort(503, str(e))
+    return make_response(jsonify(job.to_dict()), 202)
+
+
+@application.route("/jobs/<job_id>", methods=["GET"], strict_slashes=False)
+def get_job(job_id):
+    job = download_jobs.get(job_id)
+    if not job:
+        abort(404, f"Unable to find job '{job_id}'")
+    return jsonify(job.to_dict())
+
+
 @socket.on("start_download")
 def on_start_download(package_name):
     if package_name_regex.match(package_name):
+        # The download is executed in background. If the same package is already
+        # being downloaded (e.g., requested by another client), just follow the
+        # progress of the download already in progress.
         try:
-            api = Playstore(credentials_location)
-            meta = PackageMeta(api, package_name)
-            try:
-                app = meta.app_details().docV2
-            except AttributeError:
-                emit(
-                    "download_bad_package",
-                    f"Unable to retrieve application with "
-                    f"package name '{package_name}'",
-                )
-                return
-
-            details = {
-                "package_name": app.docid,
-                "title": app.title,
-                "creator": app.creator,
-            }
-            downloaded_apk_file_path = os.path.join(
-                downloaded_apk_location,
-                re.sub(
-                    r"[^\w\-_.\s]",
-                    "_",
-                    f"{details['title']} by {details['creator']} - "
-                    f"{details['package_name']}.apk",
-                ),
-            )
-
-            # noinspection PyProtectedMember
-            for progress in api._download_with_progress(
-                meta,
-                OutDir(downloaded_apk_file_path, meta=meta),
-            ):
-                emit("download_progress", progress)
-
-            logger.info(
-                f"The application was downloaded and "
-                f"saved to '{downloaded_apk_file_path}'"
-            )
-            emit("download_success", "The application was successfully downloaded")
-        except Exception as e:
+            job = download_jobs.submit(package_name)
+        except QueueFullError as e:
             emit("download_error", str(e))
+            return
+        emit("download_queued", job.id)
+        follow(request.sid, job)
     else:
         emit("download_error", "Please specify a valid package name")
 
 
+@socket.on("follow_job")
+def on_follow_job(job_id):
+    # Receive the events of a job (e.g., created with the REST API).
+    job = download_jobs.get(job_id)
+    if job:
+        follow(request.sid, job)
+    else:
+        emit("download_error", f"Unable to find job '{job_id}'")
+
+
+@socket.on("disconnect")
+def on_disconnect(*_):
+    # Stop sending the events of the jobs followed by the disconnected client.
+    with subscriptions_lock:
+        followed = subscriptions.pop(request.sid, {})
+    for job, callback in followed.values():
+        job.unsubscribe(callback)
+    if progress_batcher:
+        progress_batcher.discard(request.sid)
+
+
+class BadPackageError(Exception):
+    """The requested package can't be found in the store."""
+
+
+def subscriber(sid, job_id):
+    def on_event(event, data):
+        if event == "download_progress" and progress_batcher:
+            progress_batcher.add(sid, job_id, data)
+        else:
+            if progress_batcher:
+                # Make sure the pending progress updates are received first.
+                progress_batcher.flush(sid)
+            socket.emit(event, data, to=sid)
+
+    return on_event
+
+
+def follow(sid, job):
+    # Send the events of a job to a client, until the client disconnects.
+    with subscriptions_lock:
+        followed = subscriptions.setdefault(sid, {})
+        if job.id in followed:
+            # The client already follows the job (e.g., the same package requested
+            # twice), don't send each event twice.
+            return
+        callback = subscriber(sid, job.id)
+        followed[job.id] = (job, callback)
+        job.subscribe(callback)
+
+
+def download_package(job):
+    package_name = job.key
+    try:
+        api = Playstore(
+            credentials_location,
+            bandwidth_limiter=bandwidth_limiter,
+            download_rate_limit=download_rate_limit_per_job,
+        )
+        meta = PackageMeta(api, package_name)
+        try:
+            app = meta.app_details().docV2
+        except AttributeError:
+            message = (
+                f"Unable to retrieve application with package name '{package_name}'"
+            )
+            job.publish("download_bad_package", message)
+            raise BadPackageError(message)
+
+        details = {
+            "package_name": app.docid,
+            "title": app.title,
+            "creator": app.creator,
+        }
+        downloaded_apk_file_path = os.path.join(
+            downloaded_apk_location,
+            re.sub(
+                r"[^\w\-_.\s]",
+                "_",
+                f"{details['title']} by {details['creator']} - "
+                f"{details['package_name']}.apk",
+            ),
+        )
+
+        throttle = ProgressThrottle(progress_min_interval, progress_min_delta)
+
+        out_dir = OutDir(downloaded_apk_file_path, meta=meta)
+
+        # noinspection PyProtectedMember
+        for progress in api._download_with_progress(meta, out_dir):
+            job.progress = progress
+            if throttle.should_send(progress):
+                job.publish("download_progress", progress)
+
+        logger.info(
+            f"The application was downloaded and "
+            f"saved to '{downloaded_apk_file_path}'"
+        )
+        # The downloaded file can be retrieved with the /downloads/ endpoint.
+        relative_path = os.path.relpath(out_dir.apk_path, downloaded_apk_location)
+        job.result = {"files": [f"downloads/{pathname2url(relative_path)}"]}
+        job.publish("download_success", "The application was successfully downloaded")
+    except BadPackageError:
+        raise
+    except Exception as e:
+        job.publish("download_error", str(e))
+        raise
+
+
+# Progress frames contain the latest progress of each download followed by a client.
+progress_batcher = (
+    ProgressBatcher(
+        lambda sid, frame: socket.emit("download_progress_batch", frame, to=sid),
+        progress_batch_interval,
+    )
+    if progress_batch_interval > 0
+    else None
+)
+
+# The jobs followed by each connected client (by session id, then by job id), with
+# the function receiving their events.
+subscriptions = {}
+subscriptions_lock = threading.Lock()
+
+# The bandwidth limit shared by all the downloads.
+bandwidth_limiter = (
+    BandwidthLimiter(download_rate_limit) if download_rate_limit else None
+)
+
+# The number of download jobs (exported with the other metrics).
+jobs_metric = metrics.REGISTRY.gauge(
+    "web_download_jobs", "Number of known download jobs, by state.", ("state",)
+)
+
+# The downloads are executed in background by a pool of workers. Concurrent requests
+# for the same package share the same download job.
+download_jobs = JobQueue(
+    download_package,
+    max_workers=max_concurrent_downloads,
+    max_queued=max_queued_downloads,
+)
+
+
 if __name__ == "__main__":
     socket.run(application, host="0.0.0.0", port=5000)
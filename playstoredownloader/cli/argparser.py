@@ -2,6 +2,22 @@
 
 import argparse
 
+from playstoredownloader.downloader.versions import parse_package_spec
+from playstoredownloader.playstore.throttle import parse_rate
+from playstoredownloader.playstore.util import Util
+
+
+def package_spec(spec: str) -> str:
+    """
+    Check a package to be downloaded (with the optional specific versions).
+
+    :param spec: The package name, optionally followed by the version codes.
+    :return: The same package spec (if valid).
+    """
+
+    parse_package_spec(spec)
+    return spec
+
 
 def get_cmd_args():
     """
@@ -15,12 +31,15 @@ def get_cmd_args():
     )
     parser.add_argument(
         "package",
-        type=str,
+        type=package_spec,
         nargs="+",
         help="The package name of the application to be downloaded, "
         'e.g., "com.spotify.music" or "com.whatsapp". Can be specified multiple times '
         "as a space separated list to download more packages, e.g., "
-        '"com.spotify.music" "com.whatsapp" "com.here.app.maps"',
+        '"com.spotify.music" "com.whatsapp" "com.here.app.maps". Specific (older) '
+        "versions can be downloaded instead of the current one by adding their "
+        'version codes (or ranges of version codes), e.g., "com.whatsapp@123" or '
+        '"com.whatsapp@120-125,130"',
     )
     parser.add_argument(
         "-b",
@@ -71,4 +90,106 @@ def get_cmd_args():
         help="An optional tag prepended to the file name of the downloaded app(s), "
         'e.g., "[TAG] filename.apk"',
     )
+    parser.add_argument(
+        "-l",
+        "--library",
+        dest="library",
+        type=str,
+        metavar="FILE",
+        default=argparse.SUPPRESS,
+        help="The path of a file where to keep track of the apps acquired by the "
+        "account and of the apps that couldn't be acquired (e.g., because the "
+        "purchase failed). When used, the apps that couldn't be acquired are added to "
+        "the account without first checking if they can be downloaded when they are "
+        "requested again, thus saving a request to the server for each new attempt",
+    )
+    parser.add_argument(
+        "-p",
+        "--prefetch",
+        dest="prefetch",
+        type=int,
+        metavar="N",
+        default=argparse.SUPPRESS,
+        help="How many of the next packages should have their details and download "
+        "links requested in background while the current package is being "
+        "downloaded (e.g., 2). By default, nothing is prefetched and the packages "
+        "are processed strictly one at a time",
+    )
+    parser.add_argument(
+        "-m",
+        "--metrics",
+        dest="metrics",
+        type=str,
+        metavar="FILE",
+        default=argparse.SUPPRESS,
+        help="The path of a file where to save, at the end of the downloads, the "
+        "metrics collected (login and request latencies, downloaded bytes, "
+        "throughput, retries and failures) in the Prometheus text format",
+    )
+    parser.add_argument(
+        "-T",
+        "--timings",
+        dest="timings",
+        type=str,
+        metavar="FILE",
+        default=argparse.SUPPRESS,
+        help="The path of a file where to append, in JSON lines format, the time "
+        "spent in each phase of every download (requests to the store, time to first "
+        "byte, transfer time and throughput of each file)",
+    )
+    parser.add_argument(
+        "-r",
+        "--limit-rate",
+        dest="limit_rate",
+        type=parse_rate,
+        metavar="RATE",
+        default=argparse.SUPPRESS,
+        help="The maximum download speed, in bytes per second. A k, M or G suffix "
+        'can be used, e.g., "500k" or "2M". By default, the download speed is not '
+        "limited",
+    )
+    parser.add_argument(
+        "-f",
+        "--fsync",
+        dest="fsync",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Flush each downloaded file to disk before considering it complete "
+        "(slower, but the file is guaranteed to be intact even after a power loss)",
+    )
+    parser.add_argument(
+        "-d",
+        "--min-free",
+        dest="min_free",
+        type=Util.parse_size,
+        metavar="SIZE",
+        default=argparse.SUPPRESS,
+        help="The disk space that must be left free in the output directory (a k, M "
+        'or G suffix can be used, e.g., "10G"). Before downloading each app, the '
+        "space needed is checked (and reserved) and the downloads stop if there is "
+        "not enough free space. By default, the downloads stop only if the apps "
+        "don't fit on the disk",
+    )
+    parser.add_argument(
+        "-w",
+        "--wait-for-space",
+        dest="wait_for_space",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Pause the downloads (instead of stopping them) when there is not "
+        "enough free disk space, until some space is freed",
+    )
+    parser.add_argument(
+        "-W",
+        "--watch",
+        dest="watch",
+        type=float,
+        metavar="SECONDS",
+        default=argparse.SUPPRESS,
+        help="Keep running and check periodically (every SECONDS seconds) the "
+        "versions of the applications, downloading each new version as soon as it "
+        "is found. The applications are checked in batches spread over the interval, "
+        "and the versions already in the output directory are not downloaded again "
+        "(can't be used with -p or with specific versions of the applications)",
+    )
     return parser.parse_args()
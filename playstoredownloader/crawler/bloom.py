@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import hashlib
+import math
+import struct
+from pathlib import Path
+
+
+class BloomFilter(object):
+    """
+    A compact set of strings (e.g., the package names already seen by a crawler).
+
+    The filter uses a fixed amount of memory (about 1.8 MB for one million strings with
+    a false positive rate of 0.1%), independently of the length of the strings. Strings
+    can't be removed, and a string never added can (rarely) be reported as present,
+    but a string added is always reported as present.
+    """
+
+    _HEADER = struct.Struct("<4sQIQ")
+    _MAGIC = b"PSBF"
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        BloomFilter object constructor.
+
+        :param capacity: The number of strings expected to be added.
+        :param error_rate: The probability that a string never added is reported as
+                           present (when capacity strings have been added).
+        """
+
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("Invalid capacity or error rate for the Bloom filter")
+
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: the positions are h1 + i * h2 (mod size).
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> bool:
+        """
+        Add a string.
+
+        :param item: The string to add.
+        :return: True if the string was not present (so it was actually added).
+        """
+
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def save(self, path) -> None:
+        """
+        Save the filter to a file.
+
+        :param path: The path of the file.
+        """
+
+        with Path(path).open("wb") as file:
+            file.write(
+                self._HEADER.pack(self._MAGIC, self.size, self.hash_count, self.count)
+            )
+            file.write(self._bits)
+
+    @classmethod
+    def load(cls, path) -> "BloomFilter":
+        """
+        Load a filter saved to a file.
+
+        :param path: The path of the file.
+        :return: The BloomFilter object.
+        """
+
+        content = Path(path).read_bytes()
+        magic, size, hash_count, count = cls._HEADER.unpack_from(content)
+        bits = content[cls._HEADER.size :]
+        if magic != cls._MAGIC or len(bits) != (size + 7) // 8:
+            raise RuntimeError(f"'{path}' is not a valid Bloom filter file")
+
+        bloom_filter = cls.__new__(cls)
+        bloom_filter.size = size
+        bloom_filter.hash_count = hash_count
+        bloom_filter.count = count
+        bloom_filter._bits = bytearray(bits)
+        return bloom_filter
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from playstoredownloader.crawler.output import (
+    RecordWriter,
+    load_checkpoint,
+    save_checkpoint,
+)
+from playstoredownloader.playstore.playstore import Playstore
+
+logger = logging.getLogger(__name__)
+
+
+def app_record(doc: object, **extra) -> dict:
+    """
+    Get the record describing an app found in a listing.
+
+    :param doc: The protobuf (DocV2) object of the app.
+    :param extra: Additional fields of the record.
+    :return: A dictionary with the package name, title, developer, version code and
+             rating of the app, plus the additional fields.
+    """
+
+    return {
+        "package": doc.docid,
+        "title": doc.title,
+        "developer": doc.creator,
+        "version_code": doc.details.appDetails.versionCode,
+        "rating": round(doc.aggregateRating.starRating, 3),
+        **extra,
+    }
+
+
+class CategoryCrawler(object):
+    """
+    Crawl the apps listed in the categories (and subcategories, e.g., top free, top
+    paid) of the Google Play Store.
+
+    The listings are crawled concurrently (the number of requests per second can be
+    limited with the request_limiter of the Playstore object) and the apps are written
+    to the output file as soon as they are found. The progress is saved periodically in
+    a checkpoint file, so an interrupted crawl can be resumed later from the last
+    checkpoint, without fetching again the listings already completed and without
+    duplicating the records already written.
+    """
+
+    FIELDS = [
+        "category",
+        "subcategory",
+        "rank",
+        "package",
+        "title",
+        "developer",
+        "version_code",
+        "rating",
+    ]
+
+    def __init__(
+        self,
+        api: Playstore,
+        output_file,
+        checkpoint_file=None,
+        subcategories: list = None,
+        limit: int = None,
+        page_size: int = None,
+        max_workers: int = 4,
+        checkpoint_interval: int = 100,
+    ):
+        """
+        CategoryCrawler object constructor.
+
+        :param api: The Playstore object used for the requests (shared by all the
+                    threads of the crawler).
+        :param output_file: The file where to write the apps found (CSV if its
+                            extension is ".csv", JSON lines otherwise).
+        :param checkpoint_file: Optional file where to save the progress of the crawl.
+                                If the file already exists, the crawl is resumed.
+        :param subcategories: The subcategories to crawl in each category. If not
+                              specified, all the subcategories of each category are
+                              crawled.
+        :param limit: Optional maximum number of apps to crawl in each listing.
+        :param page_size: How many apps to request from the server for each page.
+        :param max_workers: How many listings to crawl at the same time.
+        :param checkpoint_interval: How many records to write between two checkpoints.
+        """
+
+        self.api = api
+        self.output_file = output_file
+        self.checkpoint_file = checkpoint_file
+        self.subcategories = subcategories
+        self.limit = limit
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.checkpoint_interval = checkpoint_interval
+
+        # The number of apps already written for each listing ("category/subcategory"),
+        # or None for the listings completed.
+        self.progress = {}
+
+        self._writer = None
+        self._written = 0
+        self._unsaved_records = 0
+        self._lock = threading.Lock()
+
+    def categories(self) -> list:
+        """
+        Get the categories of apps in the Google Play Store.
+
+        :return: A sorted list with the ids of the categories (e.g., "TOOLS").
+        """
+
+        browse_response = self.api.get_store_categories()
+        if browse_response is None:
+            raise RuntimeError("Unable to get the categories of the Google Play Store")
+
+        categories = set()
+        for category in browse_response.category:
+            category_id = parse_qs(urlparse(category.dataUrl).query).get("cat")
+            if category_id:
+                categories.add(category_id[0])
+        return sorted(categories)
+
+    def listings(self, categories: list = None) -> list:
+        """
+        Get the listings to crawl.
+
+        :param categories: The categories to crawl. If not specified, all the
+                           categories of the Google Play Store are crawled.
+        :return: A list of (category, subcategory) tuples.
+        """
+
+        listings = []
+        for category in categories or self.categories():
+            subcategories = self.subcategories or self.api.list_app_by_category(
+                category
+            )
+            for subcategory in subcategories or []:
+                listings.append((category, subcategory))
+        return listings
+
+    def _save_checkpoint(self) -> None:
+        # Called with the lock held.
+        self._unsaved_records = 0
+        if self.checkpoint_file is not None:
+            save_checkpoint(
+                self.checkpoint_file,
+                {"offset": self._writer.offset, "progress": self.progress},
+            )
+
+    def _crawl_listing(self, category: str, subcategory: str) -> None:
+        key = f"{category}/{subcategory}"
+        with self._lock:
+            already_written = self.progress.get(key, 0)
+
+        rank = 0
+        for doc in self.api.list_app_by_category_iter(
+            category, subcategory, limit=self.limit, page_size=self.page_size
+        ):
+            rank += 1
+            if rank <= already_written:
+                # Written before the crawl was interrupted.
+                continue
+            with self._lock:
+                self._writer.write(
+                    app_record(
+                        doc, category=category, subcategory=subcategory, rank=rank
+                    )
+                )
+                self.progress[key] = rank
+                self._written += 1
+                self._unsaved_records += 1
+                if self._unsaved_records >= self.checkpoint_interval:
+                    self._save_checkpoint()
+
+        with self._lock:
+            self.progress[key] = None
+            self._save_checkpoint()
+
+        logger.info(f"Crawled {rank} apps in '{key}'")
+
+    def crawl(self, categories: list = None) -> int:
+        """
+        Crawl the apps in the categories of the Google Play Store (resuming the
+        previous crawl, if a checkpoint file exists).
+
+        :param categories: The categories to crawl. If not specified, all the
+                           categories of the Google Play Store are crawled.
+        :return: The number of records written.
+        """
+
+        offset = None
+        checkpoint = None
+        if self.checkpoint_file is not None:
+            checkpoint = load_checkpoint(self.checkpoint_file)
+        if checkpoint is not None:
+            offset = checkpoint["offset"]
+            self.progress = checkpoint["progress"]
+            logger.info(f"Resuming the crawl from '{self.checkpoint_file}'")
+
+        listings = [
+            (category, subcategory)
+            for category, subcategory in self.listings(categories)
+            if self.progress.get(f"{category}/{subcategory}", 0) is not None
+        ]
+
+        self._written = 0
+        failed = 0
+        self._writer = RecordWriter(self.output_file, self.FIELDS, offset)
+        with self._writer:
+            with ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="category-crawler"
+            ) as executor:
+                futures = {
+                    executor.submit(self._crawl_listing, *listing): listing
+                    for listing in listings
+                }
+                for future, (category, subcategory) in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed += 1
+                        logger.error(
+                            f"Error when crawling '{category}/{subcategory}': {e}"
+                        )
+
+            with self._lock:
+                self._save_checkpoint()
+
+        if failed:
+            logger.warning(
+                f"{failed} listings were not crawled completely, run the crawl again "
+                "to resume them"
+            )
+        return self._written
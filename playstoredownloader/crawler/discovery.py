@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import collections
+import logging
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from playstoredownloader.crawler.bloom import BloomFilter
+from playstoredownloader.crawler.output import (
+    RecordWriter,
+    load_checkpoint,
+    save_checkpoint,
+)
+from playstoredownloader.playstore.meta import PackageMeta
+from playstoredownloader.playstore.playstore import Playstore
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_NAME_IN_URL = re.compile(
+    r"[?&](?:doc|id)=([a-zA-Z][a-zA-Z0-9_]*(?:\.[a-zA-Z][a-zA-Z0-9_]*)+)"
+)
+
+
+def related_packages(api: Playstore, package_name: str, listing_limit: int) -> list:
+    """
+    Get the package names of the apps related to an app (e.g., "you might also like",
+    other apps of the same developer), using the related links in its details.
+
+    :param api: The Playstore object used for the requests.
+    :param package_name: The package name of the app.
+    :param listing_limit: The maximum number of apps to get from each related listing.
+    :return: A list with the package names of the related apps (it might contain
+             duplicates).
+    """
+
+    doc = PackageMeta(api, package_name).details.docV2
+    links = list(doc.relatedLinks.relatedLinks)
+    if doc.relatedLinks.HasField("youMightAlsoLike"):
+        links.append(doc.relatedLinks.youMightAlsoLike)
+
+    package_names = []
+    for link in links:
+        for url in (link.url1, link.url2):
+            if not url:
+                continue
+            match = PACKAGE_NAME_IN_URL.search(unquote(url))
+            if match:
+                # A link to the details of another app.
+                package_names.append(match.group(1))
+            elif not urlparse(url).scheme:
+                # A listing of apps (relative to the API url).
+                package_names.extend(
+                    related_doc.docid
+                    for related_doc in api.iter_listing(url, limit=listing_limit)
+                )
+    return package_names
+
+
+class PackageDiscoveryCrawler(object):
+    """
+    Discover the package names of the apps in the Google Play Store, with a breadth
+    first visit of the apps related to some initial apps.
+
+    The details of many apps are fetched at the same time (the number of requests per
+    second can be limited with the request_limiter of the Playstore object), and the
+    apps found are written to the output file as soon as they are found. The package
+    names already seen are kept in a Bloom filter, so even millions of apps need only
+    a few MB of memory (a few apps might be skipped because of the false positives of
+    the filter, see error_rate).
+
+    The frontier (the apps found but not explored yet), the seen apps and the position
+    reached in the output file are saved periodically in the state directory, so an
+    interrupted crawl can be resumed later from the last checkpoint.
+    """
+
+    FIELDS = ["package", "depth", "found_from"]
+
+    STATE_FILE = "state.json"
+
+    def __init__(
+        self,
+        api: Playstore,
+        state_directory,
+        output_file,
+        max_workers: int = 8,
+        expected_packages: int = 10_000_000,
+        error_rate: float = 0.001,
+        listing_limit: int = 100,
+        checkpoint_interval: int = 100,
+    ):
+        """
+        PackageDiscoveryCrawler object constructor.
+
+        :param api: The Playstore object used for the requests (shared by all the
+                    threads of the crawler).
+        :param state_directory: The directory where to save the state of the crawl. If
+                                the directory already contains a state, the crawl is
+                                resumed.
+        :param output_file: The file where to write the apps found (CSV if its
+                            extension is ".csv", JSON lines otherwise).
+        :param max_workers: How many apps to explore at the same time.
+        :param expected_packages: The number of package names expected to be found
+                                  (used to size the Bloom filter of the seen apps).
+        :param error_rate: The probability of skipping an app never seen (when
+                           expected_packages apps have been found).
+        :param listing_limit: The maximum number of apps to get from each listing of
+                              related apps.
+        :param checkpoint_interval: How many apps to explore between two checkpoints.
+        """
+
+        self.api = api
+        self.state_directory = Path(state_directory)
+        self.output_file = output_file
+        self.max_workers = max_workers
+        self.expected_packages = expected_packages
+        self.error_rate = error_rate
+        self.listing_limit = listing_limit
+        self.checkpoint_interval = checkpoint_interval
+
+        self.seen = None
+        # The (package name, depth) tuples of the apps to explore.
+        self.frontier = collections.deque()
+        self.generation = 0
+
+        self._writer = None
+
+    def _generation_files(self, generation: int) -> tuple:
+        return (
+            self.state_directory / f"frontier-{generation}.txt",
+            self.state_directory / f"seen-{generation}.bloom",
+        )
+
+    def _load_state(self) -> int:
+        state = load_checkpoint(self.state_directory / self.STATE_FILE)
+        if state is None:
+            self.seen = BloomFilter(self.expected_packages, self.error_rate)
+            self.frontier = collections.deque()
+            self.generation = 0
+            return None
+
+        logger.info(f"Resuming the crawl from '{self.state_directory}'")
+        self.generation = state["generation"]
+        frontier_file, seen_file = self._generation_files(self.generation)
+        self.seen = BloomFilter.load(seen_file)
+        self.frontier = collections.deque()
+        with frontier_file.open("r") as file:
+            for line in file:
+                depth, package_name = line.rstrip("\n").split("\t", 1)
+                self.frontier.append((package_name, int(depth)))
+        return state["offset"]
+
+    def _save_state(self, exploring: list) -> None:
+        # Each checkpoint is written to new files, which become the current state only
+        # when the state file (pointing to them) is replaced.
+        generation = self.generation + 1
+        frontier_file, seen_file = self._generation_files(generation)
+        with frontier_file.open("w") as file:
+            for package_name, depth in (*exploring, *self.frontier):
+                file.write(f"{depth}\t{package_name}\n")
+        self.seen.save(seen_file)
+        save_checkpoint(
+            self.state_directory / self.STATE_FILE,
+            {
+                "generation": generation,
+                "offset": self._writer.offset,
+                "seen": len(self.seen),
+                "frontier": len(exploring) + len(self.frontier),
+            },
+        )
+
+        for old_file in self._generation_files(self.generation):
+            if old_file.exists():
+                old_file.unlink()
+        self.generation = generation
+
+    def _found(self, package_name: str, depth: int, found_from: str = None) -> bool:
+        if not self.seen.add(package_name):
+            return False
+        self.frontier.append((package_name, depth))
+        self._writer.write(
+            {"package": package_name, "depth": depth, "found_from": found_from}
+        )
+        return True
+
+    def crawl(
+        self, seeds: list = (), max_packages: int = None, max_depth: int = None
+    ) -> int:
+        """
+        Discover new apps, starting from some initial apps (and from the apps not
+        explored yet by the previous crawl, if the crawl is resumed).
+
+        :param seeds: The package names of the initial apps (the apps already seen are
+                      ignored).
+        :param max_packages: Optional maximum number of new apps to find.
+        :param max_depth: Optional maximum distance from the initial apps of the apps
+                          to explore.
+        :return: The number of new apps found.
+        """
+
+        self.state_directory.mkdir(parents=True, exist_ok=True)
+        offset = self._load_state()
+
+        found = 0
+        # The apps being explored, by future.
+        exploring = {}
+        # The apps too far from the initial apps (kept for the next crawls).
+        deferred = []
+
+        self._writer = RecordWriter(self.output_file, self.FIELDS, offset)
+        with self._writer, ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="package-crawler"
+        ) as executor:
+            try:
+                for seed in seeds:
+                    found += self._found(seed, 0)
+
+                explored = 0
+                while (self.frontier or exploring) and (
+                    max_packages is None or found < max_packages
+                ):
+                    # Keep all the workers busy (and a few more apps queued).
+                    while self.frontier and len(exploring) < 2 * self.max_workers:
+                        package_name, depth = self.frontier.popleft()
+                        if max_depth is not None and depth > max_depth:
+                            deferred.append((package_name, depth))
+                            continue
+                        future = executor.submit(
+                            related_packages,
+                            self.api,
+                            package_name,
+                            self.listing_limit,
+                        )
+                        exploring[future] = (package_name, depth)
+                    if not exploring:
+                        break
+
+                    done, _ = wait(exploring, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        package_name, depth = exploring.pop(future)
+                        try:
+                            related = future.result()
+                        except Exception as e:
+                            logger.error(f"Error when exploring '{package_name}': {e}")
+                            continue
+                        for related_package in related:
+                            if max_packages is not None and found >= max_packages:
+                                break
+                            found += self._found(
+                                related_package, depth + 1, package_name
+                            )
+
+                        explored += 1
+                        if explored % self.checkpoint_interval == 0:
+                            self._save_state(list(exploring.values()))
+                            logger.info(
+                                f"{len(self.seen)} apps seen, {len(self.frontier)} "
+                                "apps to explore"
+                            )
+            finally:
+                # The apps still being explored are explored again when resuming.
+                for future in exploring:
+                    future.cancel()
+                self.frontier.extend(deferred)
+                self._save_state(list(exploring.values()))
+
+        return found
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+
+class RecordWriter(object):
+    """
+    Write the records found by a crawler to a file, as soon as they are found.
+
+    The format of the file depends on its extension: CSV for ".csv" files (with a header
+    line, and the columns in the order of the fields), JSON lines otherwise. The file is
+    opened in append mode, so that an interrupted crawl can be resumed: the position
+    reached in the file is saved in the checkpoints of the crawl (see offset), and
+    anything written after the last checkpoint is discarded when resuming.
+    """
+
+    def __init__(self, path, fields: list, offset: int = None):
+        """
+        RecordWriter object constructor.
+
+        :param path: The path of the output file.
+        :param fields: The names of the fields of the records.
+        :param offset: The position in the output file from which to continue writing
+                       (the content after this position is discarded). If not
+                       specified, the file is overwritten.
+        """
+
+        self.path = Path(path)
+        self.fields = fields
+        self.csv = self.path.suffix.lower() == ".csv"
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a+" if offset is not None else "w", newline="")
+        self._file.seek(offset or 0)
+        self._file.truncate()
+        if self.csv:
+            self._csv_writer = csv.DictWriter(
+                self._file, fieldnames=fields, extrasaction="ignore"
+            )
+            if not offset:
+                self._csv_writer.writeheader()
+
+    def write(self, record: dict) -> None:
+        """
+        Write a record.
+
+        :param record: The record to be written (a dictionary with the fields of the
+                       record).
+        """
+
+        with self._lock:
+            if self.csv:
+                self._csv_writer.writerow(record)
+            else:
+                self._file.write(f"{json.dumps(record)}\n")
+
+    @property
+    def offset(self) -> int:
+        """
+        The current position in the output file, after flushing all the records
+        written so far.
+        """
+
+        with self._lock:
+            self._file.flush()
+            return self._file.tell()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def load_checkpoint(path) -> dict:
+    """
+    Load the checkpoint of a crawl.
+
+    :param path: The path of the checkpoint file.
+    :return: The content of the checkpoint, or None if there is no checkpoint.
+    """
+
+    path = Path(path)
+    if not path.is_file():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_checkpoint(path, checkpoint: dict) -> None:
+    """
+    Save the checkpoint of a crawl, replacing the previous one atomically (so that an
+    interrupted crawl always finds a complete checkpoint).
+
+    :param path: The path of the checkpoint file.
+    :param checkpoint: The content of the checkpoint (it must be serializable to JSON).
+    """
+
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+    try:
+        temp_path.write_text(json.dumps(checkpoint))
+        os.replace(temp_path, path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
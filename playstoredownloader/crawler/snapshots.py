@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class Change(object):
+    """A difference between two snapshots of the catalog."""
+
+    ADDED = "added"
+    REMOVED = "removed"
+    UPDATED = "updated"
+
+    def __init__(
+        self,
+        change: str,
+        package: str,
+        old_version_code: int = None,
+        new_version_code: int = None,
+    ):
+        self.change = change
+        self.package = package
+        self.old_version_code = old_version_code
+        self.new_version_code = new_version_code
+
+    def to_dict(self) -> dict:
+        return {
+            "change": self.change,
+            "package": self.package,
+            "old_version_code": self.old_version_code,
+            "new_version_code": self.new_version_code,
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, Change) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Change({self.to_dict()})"
+
+
+class SnapshotStore(object):
+    """
+    Store the apps found by each crawl of the Google Play Store (a snapshot of the
+    catalog), to find what changed between two crawls.
+
+    The snapshots are kept in a SQLite database, where the apps of each snapshot are
+    indexed by package name, so the differences between two snapshots (new apps,
+    removed apps and new versions) are computed by the database using the index, and
+    only the differences (not the whole snapshots) are loaded in memory.
+    """
+
+    def __init__(self, path):
+        """
+        SnapshotStore object constructor.
+
+        :param path: The path of the database file (created if it doesn't exist).
+        """
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    created REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS apps (
+                    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+                    package TEXT NOT NULL,
+                    version_code INTEGER,
+                    rating REAL,
+                    title TEXT,
+                    developer TEXT,
+                    PRIMARY KEY (snapshot_id, package)
+                ) WITHOUT ROWID;
+                """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def create_snapshot(self, name: str = None) -> int:
+        """
+        Create a new (empty) snapshot.
+
+        :param name: Optional name of the snapshot (e.g., the date of the crawl).
+        :return: The id of the snapshot.
+        """
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO snapshots (name, created) VALUES (?, ?)",
+                (name, time.time()),
+            )
+            return cursor.lastrowid
+
+    def add(self, snapshot_id: int, records: Iterable) -> int:
+        """
+        Add apps to a snapshot (an app already in the snapshot is replaced).
+
+        :param snapshot_id: The id of the snapshot.
+        :param records: The records of the apps (dictionaries with the package name
+                        and, optionally, the version code, rating, title and developer
+                        of each app, like the records written by the crawlers).
+        :return: The number of records added.
+        """
+
+        rows = (
+            (
+                snapshot_id,
+                record["package"],
+                int(record["version_code"]) if record.get("version_code") else None,
+                float(record["rating"]) if record.get("rating") else None,
+                record.get("title"),
+                record.get("developer"),
+            )
+            for record in records
+        )
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO apps VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            return self._connection.total_changes - before
+
+    def import_file(self, path, name: str = None) -> int:
+        """
+        Create a new snapshot with the apps in the output file of a crawler.
+
+        :param path: The path of the output file (CSV if its extension is ".csv", JSON
+                     lines otherwise).
+        :param name: Optional name of the snapshot.
+        :return: The id of the snapshot.
+        """
+
+        path = Path(path)
+        snapshot_id = self.create_snapshot(name or path.name)
+        with path.open("r", newline="") as file:
+            if path.suffix.lower() == ".csv":
+                records = csv.DictReader(file)
+            else:
+                records = (json.loads(line) for line in file if line.strip())
+            count = self.add(snapshot_id, records)
+        logger.info(f"{count} apps imported from '{path}' in snapshot {snapshot_id}")
+        return snapshot_id
+
+    def snapshots(self) -> list:
+        """
+        Get the snapshots in the store.
+
+        :return: A list of dictionaries (with the id, name, creation time and number of
+                 apps of each snapshot), from the oldest to the newest snapshot.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT s.id, s.name, s.created, "
+                "(SELECT COUNT(*) FROM apps a WHERE a.snapshot_id = s.id) "
+                "FROM snapshots s ORDER BY s.id"
+            ).fetchall()
+        return [
+            {"id": row[0], "name": row[1], "created": row[2], "apps": row[3]}
+            for row in rows
+        ]
+
+    def latest(self, count: int = 2) -> list:
+        """
+        Get the ids of the most recent snapshots.
+
+        :param count: How many snapshots to return.
+        :return: A list with the ids of the snapshots, from the oldest to the newest.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id FROM snapshots ORDER BY id DESC LIMIT ?", (count,)
+            ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def diff(self, old_snapshot_id: int, new_snapshot_id: int) -> Iterable:
+        """
+        Find the differences between two snapshots.
+
+        :param old_snapshot_id: The id of the older snapshot.
+        :param new_snapshot_id: The id of the newer snapshot.
+        :return: A generator of Change objects (the apps added, removed and updated,
+                 i.e., with a different version code, in the newer snapshot), ordered by
+                 package name.
+        """
+
+        query = """
+            SELECT 'added', new.package, NULL, new.version_code
+            FROM apps new LEFT JOIN apps old
+                ON old.snapshot_id = :old AND old.package = new.package
+            WHERE new.snapshot_id = :new AND old.package IS NULL
+            UNION ALL
+            SELECT 'removed', old.package, old.version_code, NULL
+            FROM apps old LEFT JOIN apps new
+                ON new.snapshot_id = :new AND new.package = old.package
+            WHERE old.snapshot_id = :old AND new.package IS NULL
+            UNION ALL
+            SELECT 'updated', new.package, old.version_code, new.version_code
+            FROM apps new JOIN apps old
+                ON old.snapshot_id = :old AND old.package = new.package
+            WHERE new.snapshot_id = :new
+                AND new.version_code IS NOT NULL
+                AND new.version_code IS NOT old.version_code
+            ORDER BY 2
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                query, {"old": old_snapshot_id, "new": new_snapshot_id}
+            ).fetchall()
+
+        for row in rows:
+            yield Change(*row)
+
+    def write_changes(self, old_snapshot_id: int, new_snapshot_id: int, path) -> list:
+        """
+        Write the differences between two snapshots to a file (the change feed), and
+        get the apps to download.
+
+        :param old_snapshot_id: The id of the older snapshot.
+        :param new_snapshot_id: The id of the newer snapshot.
+        :param path: The path of the file (JSON lines, one change per line).
+        :return: A list with the package names of the apps added or updated in the
+                 newer snapshot (the apps that need to be downloaded).
+        """
+
+        to_download = []
+        with Path(path).open("w") as file:
+            for change in self.diff(old_snapshot_id, new_snapshot_id):
+                file.write(f"{json.dumps(change.to_dict())}\n")
+                if change.change != Change.REMOVED:
+                    to_download.append(change.package)
+        return to_download
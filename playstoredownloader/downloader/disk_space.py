@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import logging
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from playstoredownloader.downloader.downloader import DownloadError
+from playstoredownloader.playstore import allocation
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientDiskSpaceError(DownloadError):
+    """There is not enough free disk space to download a package."""
+
+
+class DiskSpace(object):
+    """
+    Keep track of the disk space needed by the packages waiting to be downloaded.
+
+    The space of a package is reserved as soon as its size is known (i.e., when its
+    details and delivery data are resolved, before transferring any file), so that a
+    batch of downloads fails (or pauses) before starting a download that can't fit on
+    the disk, instead of failing late with the disk full.
+    """
+
+    def __init__(
+        self,
+        directory,
+        min_free: int = 0,
+        wait: bool = False,
+        poll_interval: float = 30,
+    ):
+        """
+        DiskSpace object constructor.
+
+        :param directory: The directory where the files are downloaded.
+        :param min_free: The number of bytes that must always be left free.
+        :param wait: Flag indicating whether to wait for free space when the disk is
+                     full (instead of failing).
+        :param poll_interval: How many seconds to wait before checking again the free
+                              space (when waiting).
+        """
+
+        self.directory = directory
+        self.min_free = min_free
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    def free(self) -> int:
+        """
+        Get the free disk space, not counting the space already reserved.
+
+        :return: The number of bytes available for new reservations.
+        """
+
+        with self._lock:
+            reserved = self.reserved
+        return shutil.disk_usage(self.directory).free - reserved - self.min_free
+
+    def _try_reserve(self, size: int) -> bool:
+        with self._lock:
+            available = shutil.disk_usage(self.directory).free - self.reserved
+            if available - self.min_free < size:
+                return False
+            self.reserved += size
+            return True
+
+    def reserve(self, size: int, description: str = "the download") -> None:
+        """
+        Reserve disk space, failing (or waiting) if there is not enough free space.
+
+        :param size: The number of bytes to reserve.
+        :param description: The description of what needs the space (for the logs).
+        """
+
+        while not self._try_reserve(size):
+            message = (
+                f"Not enough free disk space in '{self.directory}' for {description} "
+                f"({size} bytes needed, {max(self.free(), 0)} available)"
+            )
+            if not self.wait:
+                logger.error(message)
+                raise InsufficientDiskSpaceError(message)
+            logger.warning(f"{message}, retrying in {self.poll_interval}s")
+            time.sleep(self.poll_interval)
+
+    def release(self, size: int) -> None:
+        """
+        Release reserved disk space (e.g., when the download has written its files,
+        or when it's not needed anymore).
+
+        :param size: The number of bytes to release.
+        """
+
+        with self._lock:
+            self.reserved = max(self.reserved - size, 0)
+
+    @contextmanager
+    def using(self, size: int):
+        """
+        Use the disk space reserved for a download executed by the current thread in a
+        block of code: the reservation is released as the space is actually taken by
+        the files of the download (e.g., when they are preallocated, see allocation),
+        and entirely at the end of the block.
+
+        :param size: The number of bytes reserved for the download.
+        """
+
+        remaining = size
+
+        def on_allocated(allocated_size):
+            nonlocal remaining
+            released = min(allocated_size, remaining)
+            remaining -= released
+            self.release(released)
+
+        try:
+            with allocation.reporting(on_allocated):
+                yield
+        finally:
+            self.release(remaining)
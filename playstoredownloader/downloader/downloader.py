@@ -5,6 +5,8 @@ import logging
 from playstoredownloader.downloader.out_dir import OutDir
 from playstoredownloader.playstore.meta import PackageMeta
 from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.throttle import BandwidthLimiter
+from playstoredownloader.playstore.timings import DownloadTimings, recording
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +16,10 @@ class DownloadError(Exception):
 
 
 class DownloadResult:
-    def __init__(self, success):
+    def __init__(self, success, timings=None):
         self.success = success
+        # DownloadTimings object with the time spent in each phase of the download.
+        self.timings = timings
 
     def raise_for_failures(self):
         if not self.success:
@@ -23,23 +27,129 @@ class DownloadResult:
 
 
 class Downloader:
-    def __init__(self, blobs, split_apks, credentials, out, tag):
-        self.api = Playstore(credentials)
+    def __init__(
+        self,
+        blobs,
+        split_apks,
+        credentials,
+        out,
+        tag,
+        library=None,
+        timings=None,
+        limit_rate=None,
+        fsync=False,
+    ):
+        """
+        Download packages from the Play Store.
+
+        :param blobs: Flag indicating whether to also download the .obb files.
+        :param split_apks: Flag indicating whether to also download the split apks.
+        :param credentials: The path to the JSON file containing the credentials.
+        :param out: The directory where to save the downloaded files.
+        :param tag: Optional tag prepended to the file names.
+        :param library: Optional path of the library of the acquired apps.
+        :param timings: Optional path of a JSON lines file where to append the time
+                        spent in each phase of every download (and of the login).
+        :param limit_rate: Optional maximum number of bytes per second downloaded.
+        :param fsync: Flag indicating whether to flush the downloaded files to disk.
+        """
+        self.login_timings = DownloadTimings()
+        with recording(self.login_timings):
+            self.api = Playstore(
+                credentials,
+                library_file=library,
+                bandwidth_limiter=BandwidthLimiter(limit_rate) if limit_rate else None,
+                fsync_downloads=fsync,
+            )
         self.blobs = blobs
         self.split_apks = split_apks
         self.out = out
         self.tag = tag
+        self.timings = timings
+
+        if self.timings:
+            self.login_timings.write(self.timings)
+
+    def _new_meta(self, package_name, version_code=None):
+        timings = DownloadTimings(package_name)
+        with recording(timings):
+            meta = PackageMeta(
+                api=self.api, package_name=package_name, version_code=version_code
+            )
+        meta.timings = timings
+        return meta
+
+    def prepare(self, package_name, version_code=None):
+        """
+        Resolve all the data needed before downloading a package (details and
+        delivery data), without transferring any file.
+
+        The delivery data is kept in the delivery cache of the Playstore object, so
+        the following download will be able to start transferring the files straight
+        away.
+
+        :param package_name: The package name of the app to be downloaded.
+        :param version_code: Optional version code of a specific version of the app
+                             to be downloaded (by default, the current version).
+        :return: PackageMeta object containing data about the app.
+        """
+
+        meta = self._new_meta(package_name.strip(" '\""), version_code)
+        try:
+            with recording(meta.timings):
+                # noinspection PyProtectedMember
+                self.api._get_delivery_data(
+                    meta, OutDir(self.out, tag=self.tag, meta=meta)
+                )
+        except Exception as e:
+            # The error (if persistent) will be reported when downloading the package.
+            logger.debug(f"Unable to prefetch delivery data for {package_name}: {e}")
+        return meta
 
-    def download(self, package_name):
-        meta = PackageMeta(
-            api=self.api,
-            package_name=package_name.strip(" '\""),
+    def expected_size(self, meta):
+        """
+        Get the number of bytes that will be written when downloading a package.
+
+        :param meta: PackageMeta object containing data about the app.
+        :return: The total size of the files to be downloaded (or an estimate, if the
+                 delivery data of the package is not known yet).
+        """
+
+        # noinspection PyProtectedMember
+        delivery_data = self.api.delivery_cache.get(
+            self.api._delivery_cache_key(
+                meta, OutDir(self.out, tag=self.tag, meta=meta)
+            )
         )
+        if delivery_data is None:
+            return meta.docV2.details.appDetails.installationSize
+
+        size = delivery_data.downloadSize
+        if self.blobs:
+            size += sum(obb.size for obb in delivery_data.additionalFile)
+        if self.split_apks:
+            size += sum(split_apk.size for split_apk in delivery_data.split)
+        return size
+
+    def download_prepared(self, meta):
         out_dir = OutDir(self.out, tag=self.tag, meta=meta)
-        result = self.api.download(
-            meta=meta,
-            out_dir=out_dir,
-            download_obb=self.blobs,
-            download_split_apks=self.split_apks,
+        with recording(meta.timings), meta.timings.phase("download"):
+            result = self.api.download(
+                meta=meta,
+                out_dir=out_dir,
+                download_obb=self.blobs,
+                download_split_apks=self.split_apks,
+            )
+
+        logger.debug(
+            f"Timings for {meta.package_name}: "
+            + ", ".join(f"{k} {v:.3f}s" for k, v in meta.timings.phases.items())
         )
-        return DownloadResult(result)
+        if self.timings:
+            meta.timings.write(self.timings, success=result)
+
+        return DownloadResult(result, timings=meta.timings)
+
+    def download(self, package_name, version_code=None):
+        meta = self._new_meta(package_name.strip(" '\""), version_code)
+        return self.download_prepared(meta)
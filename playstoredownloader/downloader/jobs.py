@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from playstoredownloader.downloader.singleflight import Flight, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """The job queue can't accept more jobs."""
+
+
+class JobState(object):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    ALL = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+
+class Job(Flight):
+    """
+    A download job: a flight whose work is executed in background by a JobQueue.
+    """
+
+    def __init__(self, key):
+        super().__init__(key)
+        self.id = uuid.uuid4().hex
+        self.state = JobState.QUEUED
+        self.progress = 0
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in (JobState.SUCCEEDED, JobState.FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "key": self.key,
+            "state": self.state,
+            "progress": self.progress,
+            "error": self.error,
+            "result": self.result,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "subscribers": self.subscriber_count,
+        }
+
+
+class JobQueue(object):
+    """
+    Execute jobs in background with a bounded pool of workers.
+
+    Jobs with the same key (e.g., the same package) submitted while a previous one is
+    still queued or running are coalesced into the existing job.
+    """
+
+    def __init__(
+        self, work, max_workers: int = 2, max_queued: int = 100, max_history=1000
+    ):
+        """
+        JobQueue object constructor.
+
+        :param work: The function executed for each job, receiving the Job object as
+                     parameter. The job fails if the function raises an exception.
+        :param max_workers: The maximum number of jobs executed concurrently.
+        :param max_queued: The maximum number of jobs waiting for a free worker, after
+                           which new jobs are rejected.
+        :param max_history: How many jobs (including the completed ones) are kept in
+                            memory to be queried.
+        """
+
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_history = max_history
+
+        self._work = work
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._flights = SingleFlight(flight_factory=Job)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, callback=None) -> Job:
+        """
+        Submit a new job, or join the job already in progress for the same key.
+
+        :param key: The key identifying the work of the job (e.g., the package name).
+        :param callback: Optional function accepting the name of an event and its data,
+                         called for each event published by the job.
+        :return: The Job object.
+        """
+
+        with self._lock:
+            job, leader = self._flights.join(key)
+            if leader:
+                if self.queued_count >= self.max_queued:
+                    self._flights.finish(job)
+                    raise QueueFullError(
+                        f"Too many jobs waiting to be executed ({self.max_queued}), "
+                        "please try again later"
+                    )
+                self._jobs[job.id] = job
+                self._prune()
+
+        if callback is not None:
+            job.subscribe(callback)
+
+        if leader:
+            logger.info(f"New job {job.id} for {key}")
+            self._executor.submit(self._run, job)
+
+        return job
+
+    def _run(self, job: Job) -> None:
+        job.state = JobState.RUNNING
+        job.started = time.time()
+        try:
+            self._work(job)
+            job.state = JobState.SUCCEEDED
+        except Exception as e:
+            logger.error(f"Job {job.id} for {job.key} failed: {e}")
+            job.error = str(e)
+            job.state = JobState.FAILED
+        finally:
+            job.finished = time.time()
+            self._flights.finish(job)
+
+    def _prune(self) -> None:
+        # Forget the oldest completed jobs.
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_history:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+    @property
+    def queued_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.state == JobState.QUEUED)
+
+    def get(self, job_id: str) -> Job:
+        """
+        Get a job by its id.
+
+        :param job_id: The id of the job.
+        :return: The Job object, or None if no job with the specified id is known.
+        """
+
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        """
+        Get all the known jobs (from the oldest to the newest).
+
+        :return: A list of Job objects.
+        """
+
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
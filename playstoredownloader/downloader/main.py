@@ -1,9 +1,21 @@
 #!/usr/bin/env python3
 
+import logging
 from pathlib import Path
 
-from playstoredownloader.downloader.downloader import Downloader
+from playstoredownloader.downloader.disk_space import DiskSpace
+from playstoredownloader.downloader.downloader import DownloadError, Downloader
+from playstoredownloader.downloader.jobs import JobQueue
+from playstoredownloader.downloader.manifest import Manifest
 from playstoredownloader.downloader.multi_downloader import MultiDownloader
+from playstoredownloader.downloader.versions import (
+    expand_package_specs,
+    parse_package_spec,
+)
+from playstoredownloader.downloader.watch import Watcher
+from playstoredownloader.playstore.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
 
 
 def get_default_credentials():
@@ -20,11 +32,172 @@ def main(
     credentials=None,
     out_dir=Path.cwd() / "Downloads",
     tag=None,
+    library=None,
+    prefetch=0,
+    metrics=None,
+    timings=None,
+    limit_rate=None,
+    fsync=False,
+    min_free=0,
+    wait_for_space=False,
+    watch=None,
 ):
     credentials = credentials or get_default_credentials()
-    return download_packages(package, blobs, split_apks, credentials, out_dir, tag)
+    if watch:
+        if any(parse_package_spec(spec)[1] for spec in package):
+            raise RuntimeError("Specific versions of the apps can't be watched")
+        if prefetch:
+            # The new versions are downloaded as soon as they are found, there are no
+            # next packages to prefetch.
+            raise RuntimeError("The prefetch can't be used when watching the apps")
+        return watch_packages(
+            package,
+            watch,
+            blobs,
+            split_apks,
+            credentials,
+            out_dir,
+            tag,
+            library=library,
+            metrics=metrics,
+            timings=timings,
+            limit_rate=limit_rate,
+            fsync=fsync,
+            min_free=min_free,
+            wait_for_space=wait_for_space,
+        )
+    return download_packages(
+        package,
+        blobs,
+        split_apks,
+        credentials,
+        out_dir,
+        tag,
+        library=library,
+        prefetch=prefetch,
+        metrics=metrics,
+        timings=timings,
+        limit_rate=limit_rate,
+        fsync=fsync,
+        min_free=min_free,
+        wait_for_space=wait_for_space,
+    )
+
+
+def download_packages(
+    packages,
+    blobs,
+    split_apks,
+    credentials,
+    out,
+    tag,
+    library=None,
+    prefetch=0,
+    metrics=None,
+    timings=None,
+    limit_rate=None,
+    fsync=False,
+    min_free=0,
+    wait_for_space=False,
+):
+    downloader = Downloader(
+        blobs,
+        split_apks,
+        credentials,
+        out,
+        tag,
+        library=library,
+        timings=timings,
+        limit_rate=limit_rate,
+        fsync=fsync,
+    )
+    Path(out).mkdir(parents=True, exist_ok=True)
+    disk_space = DiskSpace(out, min_free=min_free, wait=wait_for_space)
+    # The specific versions requested (e.g., "package@version_code") that are already
+    # in the output directory are not downloaded again.
+    downloads = expand_package_specs(packages, Manifest.for_directory(out))
+    try:
+        return MultiDownloader(
+            downloads,
+            downloader,
+            prefetch=prefetch,
+            disk_space=disk_space,
+            # The prefetched delivery data is useless once expired from the cache.
+            max_age=downloader.api.delivery_cache.ttl,
+        ).download()
+    finally:
+        if downloader.api.library.enabled:
+            logger.info(
+                f"{downloader.api.library.round_trips_saved} request(s) to the server "
+                f"saved by using the library of acquired apps"
+            )
+        if metrics:
+            # Save the metrics collected during the batch (Prometheus text format).
+            REGISTRY.write(metrics)
+            logger.info(f"Metrics saved to '{metrics}'")
+
+
+def watch_packages(
+    packages,
+    interval,
+    blobs,
+    split_apks,
+    credentials,
+    out,
+    tag,
+    library=None,
+    metrics=None,
+    timings=None,
+    limit_rate=None,
+    fsync=False,
+    min_free=0,
+    wait_for_space=False,
+    max_workers=2,
+):
+    downloader = Downloader(
+        blobs,
+        split_apks,
+        credentials,
+        out,
+        tag,
+        library=library,
+        timings=timings,
+        limit_rate=limit_rate,
+        fsync=fsync,
+    )
+    Path(out).mkdir(parents=True, exist_ok=True)
+    disk_space = DiskSpace(out, min_free=min_free, wait=wait_for_space)
 
+    def download(job):
+        meta = downloader.prepare(job.key)
+        # Fail (or wait) before the download if the new version won't fit on the
+        # disk, together with the other versions being downloaded.
+        size = downloader.expected_size(meta)
+        disk_space.reserve(size, job.key)
+        with disk_space.using(size):
+            result = downloader.download_prepared(meta)
+        if not result.success:
+            raise DownloadError(f"Error when downloading '{job.key}'")
 
-def download_packages(packages, blobs, split_apks, credentials, out, tag):
-    downloader = Downloader(blobs, split_apks, credentials, out, tag)
-    return MultiDownloader(packages, downloader).download()
+    # The new versions are downloaded in background while the versions of the other
+    # apps are checked (a new version found while the previous one of the same app is
+    # still waiting to be downloaded is not downloaded twice).
+    jobs = JobQueue(download, max_workers=max_workers, max_queued=len(packages))
+    watcher = Watcher(
+        downloader.api,
+        packages,
+        lambda package_name, _: jobs.submit(package_name),
+        interval=interval,
+        manifest=Manifest.for_directory(out),
+    )
+    logger.info(f"Watching {len(watcher.package_names)} app(s) every {interval}s")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info("Stopping watching the apps")
+    finally:
+        jobs.shutdown()
+        if metrics:
+            # Save the metrics collected while watching (Prometheus text format).
+            REGISTRY.write(metrics)
+            logger.info(f"Metrics saved to '{metrics}'")
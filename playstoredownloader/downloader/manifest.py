@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class Manifest(object):
+    """
+    Record of the files downloaded into a directory.
+
+    For each downloaded file, the manifest keeps the package name and the version code
+    of the app, the size and the SHA-256 hash of the file, so that the files can be
+    identified (and verified) later without reading them again. The manifest is a JSON
+    lines file saved in the same directory (one line per downloaded file, the last line
+    for a file wins), so adding a new file is cheap even for directories with many
+    downloads.
+
+    There is a single Manifest object for each directory, shared by all the threads of
+    the process (use Manifest.for_directory to get it).
+    """
+
+    FILE_NAME = ".manifest.jsonl"
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / self.FILE_NAME
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def for_directory(cls, directory) -> "Manifest":
+        """
+        Get the manifest of a directory.
+
+        :param directory: The directory containing the downloaded files.
+        :return: The Manifest object of the directory.
+        """
+
+        key = os.path.realpath(directory)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(directory)
+            return cls._instances[key]
+
+    def _load(self) -> None:
+        if not self.path.is_file():
+            return
+
+        with self.path.open("r") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry["file"]] = entry
+                except (json.decoder.JSONDecodeError, KeyError):
+                    # Skip incomplete lines (e.g., after an interrupted write).
+                    continue
+
+    def record(
+        self,
+        file_path,
+        package_name: str,
+        version_code: int,
+        sha256: str,
+        **extra,
+    ) -> dict:
+        """
+        Record a file that was downloaded completely.
+
+        :param file_path: The path of the downloaded file (in the manifest directory).
+        :param package_name: The package name of the app.
+        :param version_code: The version code of the app.
+        :param sha256: The SHA-256 hash (hex string) of the file.
+        :param extra: Optional additional data to be saved with the entry.
+        :return: The entry added to the manifest.
+        """
+
+        stat = os.stat(file_path)
+        entry = {
+            "file": Path(file_path).name,
+            "package_name": package_name,
+            "version_code": version_code,
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "recorded": time.time(),
+            **extra,
+        }
+
+        with self._lock:
+            self._entries[entry["file"]] = entry
+            with self.path.open("a") as file:
+                file.write(json.dumps(entry) + "\n")
+
+        return entry
+
+    def get(self, file_path) -> dict:
+        """
+        Get the manifest entry of a file, only if the file wasn't modified after
+        being recorded.
+
+        :param file_path: The path of the file (in the manifest directory).
+        :return: A dictionary with the data of the file, or None if the file is not
+                 in the manifest or if it was modified.
+        """
+
+        with self._lock:
+            entry = self._entries.get(Path(file_path).name)
+
+        if entry is None:
+            return None
+
+        try:
+            stat = os.stat(self.directory / entry["file"])
+        except OSError:
+            return None
+
+        if stat.st_size != entry["size"] or stat.st_mtime != entry["mtime"]:
+            return None
+
+        return entry
+
+    def find(self, package_name: str, version_code: int = None) -> list:
+        """
+        Find the (unmodified) files downloaded for an app.
+
+        :param package_name: The package name of the app.
+        :param version_code: Optional version code of the app. If not specified, the
+                             files of all the versions are returned.
+        :return: A list with the manifest entries of the files.
+        """
+
+        with self._lock:
+            candidates = [
+                entry
+                for entry in self._entries.values()
+                if entry["package_name"] == package_name
+                and (version_code is None or entry["version_code"] == version_code)
+            ]
+
+        return [entry for entry in candidates if self.get(entry["file"])]
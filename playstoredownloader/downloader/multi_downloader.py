@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 
+import contextlib
 import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from playstoredownloader.downloader.downloader import DownloadError
 
@@ -8,19 +12,99 @@ logger = logging.getLogger(__name__)
 
 
 class MultiDownloader:
-    def __init__(self, package_list, downloader):
+    def __init__(
+        self, package_list, downloader, prefetch=0, disk_space=None, max_age=None
+    ):
+        """
+        Download a list of packages, one after the other.
+
+        :param package_list: The package names of the apps to be downloaded, or
+                             (package name, version code) tuples to download specific
+                             versions of the apps (None for the current version).
+        :param downloader: The Downloader object used to download each package.
+        :param prefetch: How many of the following packages should have their details
+                         and delivery data resolved in background while the current
+                         package is being downloaded (0 to disable the pipelining).
+        :param disk_space: Optional DiskSpace object, used to reserve the disk space
+                           of each package as soon as its size is known.
+        :param max_age: Optional number of seconds after which the data prefetched for
+                        a package is considered stale (e.g., the download links
+                        expired while the previous packages were being downloaded)
+                        and has to be resolved again before the download.
+        """
         self.package_list = package_list
         self.downloader = downloader
+        self.prefetch = prefetch
+        self.disk_space = disk_space
+        self.max_age = max_age
 
     def download(self):
         errors = False
-        for package in self.package_list:
-            result = self.downloader.download(package.strip(" '\""))
-            if not result.success:
-                logger.error(
-                    "There was an error when downloading package %s",
-                    package,
+
+        # The metadata of the next packages is resolved in background, while the files
+        # of the current package are being transferred, so the network is never idle
+        # waiting for details/delivery responses.
+        with ThreadPoolExecutor(
+            max_workers=max(self.prefetch, 1), thread_name_prefix="prefetch"
+        ) as executor:
+            pending = deque()
+            for package in self.package_list:
+                package, version_code = (
+                    package if isinstance(package, tuple) else (package, None)
                 )
-                errors = True
+                package = package.strip(" '\"")
+                pending.append(
+                    (
+                        package,
+                        version_code,
+                        executor.submit(self._prepare, package, version_code),
+                    )
+                )
+                if len(pending) > self.prefetch:
+                    errors |= not self._download_prepared(*pending.popleft())
+
+            while pending:
+                errors |= not self._download_prepared(*pending.popleft())
+
         if errors:
             raise DownloadError()
+
+    def _prepare(self, package, version_code=None):
+        meta = self.downloader.prepare(package, version_code)
+        size = 0
+        if self.disk_space is not None:
+            # Fail (or wait) now if the package won't fit on the disk, together with
+            # the other packages already prepared.
+            size = self.downloader.expected_size(meta)
+            self.disk_space.reserve(size, package)
+        return meta, size, time.monotonic()
+
+    def _download_prepared(self, package, version_code, future):
+        # Any error when requesting the details (or reserving the disk space) is
+        # raised here.
+        meta, size, prepared_at = future.result()
+        # The reserved space is released as it's taken by the files of the package
+        # (and entirely at the end of the download).
+        reservation = (
+            self.disk_space.using(size)
+            if self.disk_space is not None
+            else contextlib.nullcontext()
+        )
+        with reservation:
+            if (
+                self.max_age is not None
+                and time.monotonic() - prepared_at >= self.max_age
+            ):
+                # The download links prefetched for this package may not be valid
+                # anymore.
+                logger.debug(
+                    f"Prefetched data for {package} expired, resolving it again"
+                )
+                meta = self.downloader.prepare(package, version_code)
+            result = self.downloader.download_prepared(meta)
+        if not result.success:
+            logger.error(
+                "There was an error when downloading package %s",
+                package,
+            )
+        return result.success
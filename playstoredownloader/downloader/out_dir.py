@@ -3,6 +3,8 @@
 import pathlib
 import re
 
+from playstoredownloader.downloader.manifest import Manifest
+
 
 class OutDir(type(pathlib.Path())):
     """
@@ -26,6 +28,7 @@ class OutDir(type(pathlib.Path())):
         self.meta = meta
         self.tag = tag
         self.apk_path = self.joinpath(self.add_tag(self.build_filename()))
+        self.manifest = Manifest.for_directory(self)
 
     def build_filename(self):
         # TODO: include title and author in the final package name?
@@ -37,6 +40,9 @@ class OutDir(type(pathlib.Path())):
         #         package_name=self.meta.docV2.docid,
         #     ),
         # )
+        if self.meta.requested_version_code is not None:
+            # A specific version, kept together with the other versions of the app.
+            return f"{self.meta.package_name}.{self.meta.requested_version_code}.apk"
         return f"{self.meta.package_name}.apk"
 
     def add_tag(self, filename):
@@ -49,6 +55,24 @@ class OutDir(type(pathlib.Path())):
         return self.joinpath(self.add_tag(filename))
 
     def split_apk_path(self, split_apk):
-        version_code = self.meta.details.docV2.details.appDetails.versionCode
-        filename = f"{split_apk.name}.{version_code}.{self.meta.package_name}.apk"
+        filename = (
+            f"{split_apk.name}.{self.meta.version_code}.{self.meta.package_name}.apk"
+        )
         return self.joinpath(self.add_tag(filename))
+
+    def record(self, file_path, sha256, **extra):
+        """
+        Record a downloaded file in the manifest of this folder.
+
+        :param file_path: The path of the downloaded file.
+        :param sha256: The SHA-256 hash (hex string) of the downloaded file.
+        :param extra: Optional additional data to be saved in the manifest.
+        :return: The entry added to the manifest.
+        """
+        return self.manifest.record(
+            file_path,
+            self.meta.package_name,
+            self.meta.version_code,
+            sha256,
+            **extra,
+        )
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressThrottle(object):
+    """
+    Decide which progress updates are worth sending to the clients.
+
+    A progress update is sent only if enough time has passed since the last update
+    sent and the progress changed enough, while the first and the final (100) updates
+    are always sent.
+    """
+
+    def __init__(self, min_interval: float = 0.25, min_delta: int = 1):
+        """
+        ProgressThrottle object constructor.
+
+        :param min_interval: The minimum number of seconds between two updates.
+        :param min_delta: The minimum progress difference between two updates.
+        """
+
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self._last_time = None
+        self._last_progress = None
+
+    def should_send(self, progress: int) -> bool:
+        now = time.monotonic()
+        if (
+            self._last_progress is None
+            or progress >= 100
+            or (
+                now - self._last_time >= self.min_interval
+                and abs(progress - self._last_progress) >= self.min_delta
+            )
+        ):
+            if progress == self._last_progress:
+                return False
+            self._last_time = now
+            self._last_progress = progress
+            return True
+        return False
+
+
+class ProgressBatcher(object):
+    """
+    Collect the progress updates of many jobs and send them periodically in a single
+    frame for each subscriber, containing only the latest progress of each job.
+    """
+
+    def __init__(self, send, interval: float = 0.25):
+        """
+        ProgressBatcher object constructor.
+
+        :param send: The function used to send a frame, accepting the subscriber and a
+                     dictionary with the latest progress of each job (by job id).
+        :param interval: The number of seconds between two frames.
+        """
+
+        self.interval = interval
+
+        self._send = send
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, subscriber, job_id: str, progress: int) -> None:
+        """
+        Add a progress update, to be sent with the next frame.
+
+        :param subscriber: The subscriber to which the update has to be sent.
+        :param job_id: The id of the job.
+        :param progress: The progress of the job.
+        """
+
+        with self._lock:
+            self._pending.setdefault(subscriber, {})[job_id] = progress
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="progress-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def flush(self, subscriber=None) -> None:
+        """
+        Send the pending progress updates immediately (e.g., before sending a
+        final event, so that the subscriber receives the events in order).
+
+        :param subscriber: The subscriber whose updates have to be sent. If not
+                           specified, the updates of all the subscribers are sent.
+        """
+
+        with self._lock:
+            if subscriber is None:
+                frames = list(self._pending.items())
+                self._pending.clear()
+            elif subscriber in self._pending:
+                frames = [(subscriber, self._pending.pop(subscriber))]
+            else:
+                frames = []
+
+        for frame_subscriber, frame in frames:
+            try:
+                self._send(frame_subscriber, frame)
+            except Exception as e:
+                logger.warning(f"Unable to send progress to {frame_subscriber}: {e}")
+
+    def discard(self, subscriber) -> None:
+        """
+        Drop the pending progress updates of a subscriber (e.g., when it disconnects).
+
+        :param subscriber: The subscriber whose updates have to be dropped.
+        """
+
+        with self._lock:
+            self._pending.pop(subscriber, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.flush()
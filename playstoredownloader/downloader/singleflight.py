@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Flight(object):
+    """
+    A unit of work in progress, whose events are published to all its subscribers.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._subscribers = []
+        self._last_events = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback) -> None:
+        """
+        Subscribe to the events of this flight.
+
+        The latest event of each type already published is replayed to the new
+        subscriber, so that late subscribers see the current state (e.g., the current
+        download progress) straight away. The replay happens before the subscriber is
+        registered and while no other event can be published, so the new subscriber
+        never receives an older event after a newer one.
+
+        :param callback: A function accepting the name of the event and its data.
+        """
+
+        with self._lock:
+            for event, data in self._last_events.items():
+                callback(event, data)
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        """
+        Stop receiving the events of this flight (e.g., when the subscriber is gone).
+
+        :param callback: A function previously passed to subscribe.
+        """
+
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, event: str, data=None) -> None:
+        """
+        Publish an event to all the subscribers of this flight.
+
+        :param event: The name of the event.
+        :param data: The data of the event.
+        """
+
+        with self._lock:
+            self._last_events[event] = data
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(event, data)
+            except Exception as e:
+                # A broken subscriber must not stop the work or the other subscribers.
+                logger.warning(f"Unable to notify '{event}' for {self.key}: {e}")
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+class SingleFlight(object):
+    """
+    Coalesce identical concurrent requests: the first request for a key performs the
+    work, while the following requests for the same key (received before the work is
+    completed) only subscribe to the events of the work already in progress.
+    """
+
+    def __init__(self, flight_factory=Flight):
+        """
+        SingleFlight object constructor.
+
+        :param flight_factory: The function used to create a new flight, given its
+                               key (by default, a new Flight object is created).
+        """
+
+        self._flight_factory = flight_factory
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key, callback=None) -> (Flight, bool):
+        """
+        Join the flight for a key, creating it if no work is in progress for that key.
+
+        :param key: The key identifying the work (e.g., the package name).
+        :param callback: Optional function accepting the name of an event and its data,
+                         called for each event published by the flight.
+        :return: A tuple (flight, leader) where leader is True if the caller created
+                 the flight (and has to perform the work and call finish when done).
+        """
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flight_factory(key)
+                self._flights[key] = flight
+
+        if not leader:
+            logger.info(f"Joining the work already in progress for {key}")
+
+        if callback is not None:
+            flight.subscribe(callback)
+        return flight, leader
+
+    def finish(self, flight: Flight) -> None:
+        """
+        Mark the work of a flight as completed: the next request for the same key will
+        start a new flight.
+
+        :param flight: The flight whose work is completed.
+        """
+
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._flights
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import logging
+
+from playstoredownloader.downloader.manifest import Manifest
+
+logger = logging.getLogger(__name__)
+
+# The maximum number of version codes in a single range, to avoid sending a huge
+# number of requests because of a typo (e.g., "1-100000000").
+MAX_RANGE_SIZE = 1000
+
+
+def parse_package_spec(spec: str) -> tuple:
+    """
+    Parse a package to be downloaded, with the (optional) specific versions to be
+    downloaded instead of the current one: "package@version_codes", where the
+    version codes are a comma separated list of numbers and (inclusive) ranges,
+    e.g., "com.example.app@5", "com.example.app@10,12" or "com.example.app@100-105".
+
+    :param spec: The string to be parsed.
+    :return: A tuple (package name, list of version codes), where the list of version
+             codes is None if no version was specified (i.e., the current version has
+             to be downloaded).
+    """
+
+    package_name, separator, versions = spec.strip(" '\"").partition("@")
+    if not separator:
+        return package_name, None
+
+    version_codes = []
+    try:
+        for part in versions.split(","):
+            first, dash, last = part.strip().partition("-")
+            first = int(first)
+            last = int(last) if dash else first
+            if first <= 0 or last < first:
+                raise ValueError(part)
+            if last - first >= MAX_RANGE_SIZE:
+                raise ValueError(f"more than {MAX_RANGE_SIZE} versions in '{part}'")
+            version_codes.extend(range(first, last + 1))
+    except ValueError as e:
+        raise ValueError(f"Invalid versions for '{package_name}': {e}")
+
+    if not package_name:
+        raise ValueError(f"Missing package name in '{spec}'")
+
+    return package_name, version_codes
+
+
+def expand_package_specs(specs, manifest: Manifest = None) -> list:
+    """
+    Get the list of the downloads corresponding to a list of packages (with the
+    optional specific versions, see parse_package_spec).
+
+    :param specs: The packages to be downloaded.
+    :param manifest: Optional manifest of the directory where the apps are downloaded:
+                     the specific versions already in the directory are skipped.
+    :return: A list of (package name, version code) tuples without duplicates, where
+             the version code is None for the current version of the app.
+    """
+
+    downloads = []
+    for spec in specs:
+        package_name, version_codes = parse_package_spec(spec)
+        for version_code in version_codes or [None]:
+            if (
+                version_code is not None
+                and manifest is not None
+                and manifest.find(package_name, version_code)
+            ):
+                logger.info(
+                    f"Version {version_code} of '{package_name}' already downloaded"
+                )
+                continue
+            downloads.append((package_name, version_code))
+
+    return list(dict.fromkeys(downloads))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import heapq
+import logging
+import random
+import threading
+import time
+
+from playstoredownloader.downloader.manifest import Manifest
+from playstoredownloader.playstore.playstore import Playstore
+
+logger = logging.getLogger(__name__)
+
+
+class Watcher(object):
+    """
+    Periodically check the versions of a list of apps, to download the new versions as
+    soon as they are published.
+
+    The apps are checked in batches (with a single bulkDetails request for each batch),
+    and the checks of the batches are spread over the interval (with some random
+    jitter), instead of checking all the apps at the same time, to avoid bursts of
+    requests to the server.
+    """
+
+    def __init__(
+        self,
+        api: Playstore,
+        package_names: list,
+        on_new_version,
+        interval: float = 3600,
+        batch_size: int = 100,
+        jitter: float = 0.5,
+        manifest: Manifest = None,
+    ):
+        """
+        Watcher object constructor.
+
+        :param api: The Playstore object used to check the versions.
+        :param package_names: The package names of the apps to watch.
+        :param on_new_version: The function called (with the package name and the
+                               version code) for each new version found.
+        :param interval: How many seconds to wait between two checks of the same app.
+        :param batch_size: The maximum number of apps checked with a single request.
+        :param jitter: The maximum random delay of each check, as a fraction of the
+                       time between the checks of two consecutive batches.
+        :param manifest: Optional manifest of the directory where the apps are
+                         downloaded: a version is considered new only if it isn't
+                         already in the directory (so the versions already downloaded
+                         are not downloaded again, even after a restart, and a failed
+                         download is retried at the next check).
+        """
+
+        self.api = api
+        self.package_names = list(dict.fromkeys(package_names))
+        self.on_new_version = on_new_version
+        self.interval = interval
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self.manifest = manifest
+
+        self.batches = [
+            self.package_names[index : index + batch_size]
+            for index in range(0, len(self.package_names), batch_size)
+        ]
+
+        # The last version code seen for each app.
+        self.versions = {}
+
+        self._random = random.Random()
+        self._stop = threading.Event()
+
+    def _is_new(self, package_name: str, version_code: int) -> bool:
+        if self.manifest is not None:
+            return not self.manifest.find(package_name, version_code)
+        return self.versions.get(package_name) != version_code
+
+    def check(self, batch: list) -> list:
+        """
+        Check the versions of a batch of apps, calling on_new_version for each new
+        version found.
+
+        :param batch: The package names of the apps.
+        :return: A list of (package name, version code) tuples with the new versions.
+        """
+
+        docs = self.api.bulk_details(batch)
+        if docs is None:
+            return []
+
+        new_versions = []
+        for package_name in batch:
+            doc = docs.get(package_name)
+            if doc is None:
+                logger.warning(f"App '{package_name}' not found")
+                continue
+            version_code = doc.details.appDetails.versionCode
+            if self._is_new(package_name, version_code):
+                logger.info(f"New version {version_code} of '{package_name}'")
+                new_versions.append((package_name, version_code))
+            self.versions[package_name] = version_code
+
+        for package_name, version_code in new_versions:
+            self.on_new_version(package_name, version_code)
+        return new_versions
+
+    def _delay(self) -> float:
+        # A random delay, shorter than the time between two consecutive batches.
+        return self._random.uniform(0, self.jitter * self.interval / len(self.batches))
+
+    def run(self, cycles: int = None) -> None:
+        """
+        Check the apps periodically, until stop is called.
+
+        :param cycles: Optional number of checks of each app, after which the method
+                       returns.
+        """
+
+        if not self.batches:
+            return
+
+        # The next check of each batch: (time, cycle, batch index).
+        start = time.monotonic()
+        slot = self.interval / len(self.batches)
+        schedule = [
+            (start + index * slot + self._delay(), 0, index)
+            for index in range(len(self.batches))
+        ]
+        heapq.heapify(schedule)
+
+        while schedule and not self._stop.is_set():
+            due, cycle, index = heapq.heappop(schedule)
+            if self._stop.wait(max(due - time.monotonic(), 0)):
+                break
+
+            try:
+                self.check(self.batches[index])
+            except Exception as e:
+                logger.error(f"Error when checking the versions: {e}")
+
+            if cycles is None or cycle + 1 < cycles:
+                next_due = (
+                    start + (cycle + 1) * self.interval + index * slot + self._delay()
+                )
+                heapq.heappush(schedule, (next_due, cycle + 1, index))
+
+    def stop(self) -> None:
+        self._stop.set()
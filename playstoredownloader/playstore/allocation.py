@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current():
+    """
+    Get the function receiving the disk space allocated by the current thread.
+
+    :return: The function, or None if the allocations are not reported.
+    """
+
+    return getattr(_local, "callback", None)
+
+
+@contextmanager
+def reporting(callback):
+    """
+    Report the disk space allocated by the downloads executed by the current thread
+    in a block of code (e.g., to release the space reserved for them as soon as the
+    space is actually taken by the files).
+
+    :param callback: A function accepting the number of bytes allocated.
+    """
+
+    previous = current()
+    _local.callback = callback
+    try:
+        yield callback
+    finally:
+        _local.callback = previous
+
+
+def allocated(size: int) -> None:
+    """
+    Report disk space allocated by the current thread (if the allocations are
+    reported).
+
+    :param size: The number of bytes allocated.
+    """
+
+    callback = current()
+    if callback is not None and size > 0:
+        callback(size)
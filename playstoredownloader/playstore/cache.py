@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+
+from playstoredownloader.playstore import playstore_proto_pb2 as playstore_protobuf
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryCache(object):
+    """
+    Short-lived in-memory cache of the delivery data returned by the Play Store.
+
+    Every download requires a "delivery" request (and possibly a "purchase" request)
+    to obtain the download url and the cookies needed to fetch the actual files. When
+    the same version of an app is requested again shortly after (e.g., when retrying a
+    failed download) the delivery data is still valid, so those round-trips can be
+    avoided. The cached data expires after a configurable time and has to be
+    invalidated explicitly when the server rejects it (e.g., 4xx errors from the CDN).
+    """
+
+    # Download urls and cookies are valid only for a limited amount of time, so keep
+    # the data for just a few minutes.
+    DEFAULT_TTL = 300
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        """
+        DeliveryCache object constructor.
+
+        :param ttl: The number of seconds after which a cached entry expires. Use 0
+                    to disable the cache.
+        """
+
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(meta, base_version_code: int = None) -> tuple:
+        """
+        Build the cache key for the delivery data of a specific app.
+
+        :param meta: PackageMeta object containing data about the app.
+        :param base_version_code: Optional version code of the previous version of
+                                  the app from which a patch was requested (the
+                                  delivery data may contain a patch valid only for
+                                  that version).
+        :return: A tuple (package name, version code, offer type, base version code)
+                 identifying the delivery data of the app.
+        """
+
+        return (
+            meta.package_name,
+            meta.version_code,
+            meta.docV2.offer[0].offerType,
+            base_version_code,
+        )
+
+    def get(self, key: tuple) -> object:
+        """
+        Get the cached delivery data corresponding to a key.
+
+        :param key: The key of the cached entry (see key_for).
+        :return: A copy of the cached AndroidAppDeliveryData protobuf object, or None
+                 if the key is not cached or the cached entry is expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expiration, delivery_data = entry
+            if time.monotonic() >= expiration:
+                del self._entries[key]
+                return None
+
+        logger.debug(f"Using cached delivery data for {key}")
+
+        # Return a copy, so the caller can't modify the cached object.
+        cached = playstore_protobuf.AndroidAppDeliveryData()
+        cached.CopyFrom(delivery_data)
+        return cached
+
+    def put(self, key: tuple, delivery_data: object) -> None:
+        """
+        Add delivery data to the cache.
+
+        :param key: The key of the entry to add (see key_for).
+        :param delivery_data: The AndroidAppDeliveryData protobuf object to cache.
+        """
+
+        if self.ttl <= 0 or not delivery_data.downloadUrl:
+            return
+
+        to_cache = playstore_protobuf.AndroidAppDeliveryData()
+        to_cache.CopyFrom(delivery_data)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, to_cache)
+
+    def invalidate(self, key: tuple) -> None:
+        """
+        Remove an entry from the cache (if present).
+
+        :param key: The key of the entry to remove.
+        """
+
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                logger.debug(f"Delivery data for {key} was invalidated")
+
+    def clear(self) -> None:
+        """
+        Remove all the entries from the cache.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: tuple) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() < entry[0]
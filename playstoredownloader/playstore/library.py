@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class AccountLibrary(object):
+    """
+    Local record of the apps acquired by a Play Store account, and of the apps that
+    couldn't be acquired.
+
+    Without this record, the only way to know if an app belongs to the account is to
+    request its delivery data and check for an empty download url, then add the app to
+    the account with a purchase request. An app that doesn't belong to the account is
+    recorded as such until it's acquired, so this state lasts only for the apps whose
+    purchase failed (e.g., paid apps or apps not available for the account): when
+    those apps are requested again, they are purchased without the first (useless)
+    delivery request. All the other apps are handled as usual.
+
+    The record is kept in a JSON lines file (one line per change), so that it can be
+    updated cheaply during long crawls and shared between different accounts.
+    """
+
+    def __init__(self, account: str, library_file: str = None):
+        """
+        AccountLibrary object constructor.
+
+        :param account: The account (e.g., the email) owning the library.
+        :param library_file: The path to the file where to keep the record of the
+                             acquired apps. If not specified, the library is disabled.
+        """
+
+        self.account = account
+        self.library_file = Path(library_file) if library_file else None
+        self.round_trips_saved = 0
+
+        # The known apps: True if acquired, False if known not to be acquired.
+        self._ownership = {}
+        self._lock = threading.Lock()
+
+        if self.library_file and self.library_file.is_file():
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.library_file is not None
+
+    def _load(self) -> None:
+        with self.library_file.open("r") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    # Skip incomplete lines (e.g., after an interrupted write).
+                    continue
+                if entry.get("account") != self.account:
+                    continue
+                self._ownership[entry["docid"]] = entry.get("owned", True)
+
+        logger.debug(
+            f"{len(self)} acquired app(s) found in '{self.library_file}' "
+            f"for account '{self.account}'"
+        )
+
+    def _append(self, docid: str, owned: bool) -> None:
+        with self.library_file.open("a") as file:
+            file.write(
+                json.dumps({"account": self.account, "docid": docid, "owned": owned})
+                + "\n"
+            )
+
+    def is_owned(self, docid: str) -> bool:
+        """
+        Check if an app was already acquired by the account.
+
+        :param docid: The docid (package name) of the app.
+        :return: True if the app is known to belong to the account, False otherwise.
+        """
+
+        return self.ownership(docid) is True
+
+    def ownership(self, docid: str) -> bool:
+        """
+        Get what is known about the ownership of an app.
+
+        :param docid: The docid (package name) of the app.
+        :return: True if the app is known to belong to the account, False if the app
+                 is known not to belong to the account, None if the app is unknown.
+        """
+
+        with self._lock:
+            return self._ownership.get(docid)
+
+    def add(self, docid: str) -> None:
+        """
+        Record that an app was acquired by the account.
+
+        :param docid: The docid (package name) of the app.
+        """
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._ownership.get(docid) is not True:
+                self._ownership[docid] = True
+                self._append(docid, True)
+
+    def discard(self, docid: str) -> None:
+        """
+        Record that an app doesn't belong (anymore) to the account.
+
+        :param docid: The docid (package name) of the app.
+        """
+
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if self._ownership.get(docid) is not False:
+                self._ownership[docid] = False
+                self._append(docid, False)
+
+    def record_saved_round_trip(self) -> None:
+        with self._lock:
+            self.round_trips_saved += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for owned in self._ownership.values() if owned)
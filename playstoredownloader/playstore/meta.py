@@ -8,7 +8,15 @@ logger = logging.getLogger(__name__)
 
 
 class PackageMeta:
-    def __init__(self, api, package_name) -> None:
+    def __init__(self, api, package_name, version_code: int = None) -> None:
+        """
+        Data about an app to be downloaded.
+
+        :param api: The Playstore object used to request the details of the app.
+        :param package_name: The package name of the app.
+        :param version_code: Optional version code of a specific version of the app to
+                             be downloaded, instead of the current one.
+        """
         self.api = api
         self.package_name = package_name
         self.details = self.app_details()
@@ -20,6 +28,21 @@ class PackageMeta:
             logging.exception(exception)
             raise exception
 
+        self.requested_version_code = version_code
+
+    @property
+    def version_code(self) -> int:
+        """
+        The version code of the app to be downloaded: the requested version (if any),
+        otherwise the current version. The details always describe the current
+        version, only the download (delivery request, file names, manifest) uses the
+        requested one.
+        """
+
+        if self.requested_version_code is not None:
+            return self.requested_version_code
+        return self.details.docV2.details.appDetails.versionCode
+
     def app_details(self) -> object:
         """
         Get the details for a certain app (identified by the package name) in the
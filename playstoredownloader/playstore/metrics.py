@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Metric(object):
+    TYPE = None
+
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric '{self.name}' requires labels {self.label_names}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self):
+        # One sample for each combination of labels (metrics with more than one
+        # sample per combination, like the histograms, override this method).
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.label_names, key)), value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """
+    A value that can only increase (e.g., the number of requests).
+    """
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down (e.g., the number of downloads in progress).
+    """
+
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """
+    The distribution of a value (e.g., the duration of the requests), as the number
+    of observations falling in each bucket.
+    """
+
+    TYPE = "histogram"
+
+    DEFAULT_BUCKETS = (
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+        60,
+        120,
+        300,
+    )
+
+    def __init__(
+        self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the time (in seconds) spent executing a block of code.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0))
+            return counts[-1]
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(c), t)) for key, (c, t) in self._values.items())
+        for key, (counts, total) in items:
+            labels = dict(zip(self.label_names, key))
+            for upper_bound, count in zip(self.buckets, counts):
+                bucket_labels = {**labels, "le": _format_value(upper_bound)}
+                yield f"{self.name}_bucket", bucket_labels, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+class MetricsRegistry(object):
+    """
+    A collection of metrics, exported in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names=()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names=()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names=(),
+        buckets=Histogram.DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """
+        Export all the metrics in the Prometheus text format.
+
+        :return: A string with the current value of all the metrics.
+        """
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write(self, file_path: str) -> None:
+        """
+        Write all the metrics to a file, in the Prometheus text format (e.g., to be
+        read by the textfile collector of the node exporter).
+
+        :param file_path: The path of the file to be written.
+        """
+
+        with open(file_path, "w") as file:
+            file.write(self.render())
+
+    def clear(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+# The metrics collected by this process.
+REGISTRY = MetricsRegistry()
+
+LOGIN_DURATION = REGISTRY.histogram(
+    "playstore_login_duration_seconds", "Duration of the login requests."
+)
+LOGINS = REGISTRY.counter(
+    "playstore_logins_total", "Number of login attempts.", ("result",)
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    "playstore_request_duration_seconds",
+    "Duration of the requests to the Play Store API.",
+    ("path",),
+)
+REQUESTS = REGISTRY.counter(
+    "playstore_requests_total",
+    "Number of requests to the Play Store API.",
+    ("path", "status"),
+)
+RESPONSE_BYTES = REGISTRY.counter(
+    "playstore_response_bytes_total",
+    "Number of bytes received from the Play Store API (before decompression).",
+    ("path",),
+)
+RETRIES = REGISTRY.counter(
+    "playstore_retries_total", "Number of retried operations.", ("operation",)
+)
+DOWNLOAD_DURATION = REGISTRY.histogram(
+    "playstore_file_download_duration_seconds",
+    "Duration of the file transfers.",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+DOWNLOAD_THROUGHPUT = REGISTRY.histogram(
+    "playstore_file_download_throughput_bytes_per_second",
+    "Throughput of the completed file transfers.",
+    buckets=(1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 2.5e7, 5e7, 1e8),
+)
+DOWNLOADED_BYTES = REGISTRY.counter(
+    "playstore_downloaded_bytes_total", "Number of bytes downloaded and saved to disk."
+)
+DOWNLOADED_FILES = REGISTRY.counter(
+    "playstore_downloaded_files_total",
+    "Number of file transfers, by result.",
+    ("result",),
+)
+APP_DOWNLOADS = REGISTRY.counter(
+    "playstore_app_downloads_total",
+    "Number of app downloads (including additional files), by result.",
+    ("result",),
+)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import logging
+import queue
+import threading
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def iter_pages(fetch_page, first_page, limit: int = None, read_ahead: int = 1):
+    """
+    Iterate lazily over the items of a paginated listing, fetching the next pages in
+    background while the caller consumes the current one.
+
+    The pages are fetched one after the other (the location of a page is known only
+    after fetching the previous one) by a background thread, which stays at most
+    read_ahead pages ahead of the caller, so the memory used doesn't depend on the
+    length of the listing. No page is fetched after limit items have been received,
+    or after the caller stops iterating.
+
+    :param fetch_page: The function used to fetch a page: it receives the location of
+                       the page and returns a tuple (items, location of the next page),
+                       where the location of the next page is None for the last page.
+    :param first_page: The location of the first page.
+    :param limit: Optional maximum number of items to be returned.
+    :param read_ahead: The maximum number of pages fetched but not yet consumed.
+    :return: A generator of the items of all the pages.
+    """
+
+    pages = queue.Queue(maxsize=max(read_ahead, 1))
+    stop = threading.Event()
+
+    def put(element) -> bool:
+        # Wait for the caller to consume a page, unless it stopped iterating.
+        while not stop.is_set():
+            try:
+                pages.put(element, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        location = first_page
+        received = 0
+        try:
+            while location is not None and not stop.is_set():
+                items, location = fetch_page(location)
+                received += len(items)
+                if limit is not None and received >= limit:
+                    location = None
+                if not put(items):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="page-fetcher", daemon=True)
+    producer.start()
+
+    returned = 0
+    try:
+        while limit is None or returned < limit:
+            page = pages.get()
+            if page is _DONE:
+                return
+            if isinstance(page, Exception):
+                raise page
+            for item in page:
+                if limit is not None and returned >= limit:
+                    return
+                returned += 1
+                yield item
+    finally:
+        # The caller stopped iterating (or all the pages were consumed).
+        stop.set()
+
+
+def page_container(response: object) -> object:
+    """
+    Get the document containing the results of a page of a listing (search results,
+    apps in a category etc.).
+
+    :param response: The ResponseWrapper protobuf object of the page.
+    :return: The DocV2 protobuf object whose children are the results, or None if the
+             page contains no results.
+    """
+
+    payload = response.payload
+    container = None
+    for documents in (payload.searchResponse.doc, payload.listResponse.doc):
+        if documents:
+            container = documents[0]
+            break
+    else:
+        for pre_fetch in response.preFetch:
+            documents = pre_fetch.response.payload.listResponse.doc
+            if documents:
+                container = documents[0]
+                break
+
+    # Some listings wrap the results in a further (anonymous) container.
+    if (
+        container is not None
+        and not container.docid
+        and container.child
+        and container.child[0].child
+    ):
+        container = container.child[0]
+
+    return container
+
+
+def page_documents(response: object) -> (Iterable, str):
+    """
+    Get the results of a page of a listing and the location of the next page.
+
+    :param response: The ResponseWrapper protobuf object of the page.
+    :return: A tuple (results, next page), where results is a list of DocV2 protobuf
+             objects and next page is the path of the next page (relative to the API
+             url), or None if this is the last page.
+    """
+
+    container = page_container(response)
+    if container is None:
+        return [], None
+    next_page = (
+        container.containerMetadata.nextPageUrl
+        or response.payload.searchResponse.nextPageUrl
+    )
+    return list(container.child), next_page or None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import base64
+import binascii
+import gzip
+import hashlib
+import struct
+
+# The formats of the patches offered by the Play Store for updating an apk from a
+# previous version (the patchFormat field of AndroidAppPatchData).
+GDIFF = 1
+GZIPPED_GDIFF = 2
+
+# Only the GDIFF based formats can be applied (the bsdiff based formats would need
+# an additional dependency).
+SUPPORTED_FORMATS = (GDIFF, GZIPPED_GDIFF)
+
+# https://www.w3.org/TR/NOTE-gdiff-19970901
+_GDIFF_MAGIC = b"\xd1\xff\xd1\xff"
+_GDIFF_VERSION = 4
+
+# The format of the arguments of each copy command: (offset, length).
+_GDIFF_COPY_COMMANDS = {
+    249: ">HB",
+    250: ">HH",
+    251: ">Hi",
+    252: ">iB",
+    253: ">iH",
+    254: ">ii",
+    255: ">qi",
+}
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _read_exactly(file, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise RuntimeError("The patch is truncated")
+    return data
+
+
+def _read_struct(file, struct_format: str) -> tuple:
+    return struct.unpack(
+        struct_format, _read_exactly(file, struct.calcsize(struct_format))
+    )
+
+
+def _copy(source, destination, length: int, file_hash) -> None:
+    while length > 0:
+        chunk = source.read(min(length, _CHUNK_SIZE))
+        if not chunk:
+            raise RuntimeError("The patch refers to data beyond the end of the file")
+        destination.write(chunk)
+        file_hash.update(chunk)
+        length -= len(chunk)
+
+
+def apply_gdiff(base, patch, out) -> str:
+    """
+    Apply a GDIFF patch.
+
+    :param base: The (seekable) binary file object of the base version.
+    :param patch: The binary file object of the patch.
+    :param out: The binary file object where to write the patched file.
+    :return: The SHA-256 hash (hex string) of the patched file.
+    """
+
+    if _read_exactly(patch, 4) != _GDIFF_MAGIC:
+        raise RuntimeError("The patch is not in GDIFF format")
+    version = _read_exactly(patch, 1)[0]
+    if version != _GDIFF_VERSION:
+        raise RuntimeError(f"Unsupported GDIFF version {version}")
+
+    file_hash = hashlib.sha256()
+    while True:
+        command = _read_exactly(patch, 1)[0]
+        if command == 0:
+            # End of the patch.
+            return file_hash.hexdigest()
+        elif command <= 246:
+            # The next bytes (as many as the command) are the data to be added.
+            _copy(patch, out, command, file_hash)
+        elif command == 247:
+            (length,) = _read_struct(patch, ">H")
+            _copy(patch, out, length, file_hash)
+        elif command == 248:
+            (length,) = _read_struct(patch, ">i")
+            _copy(patch, out, length, file_hash)
+        else:
+            offset, length = _read_struct(patch, _GDIFF_COPY_COMMANDS[command])
+            base.seek(offset)
+            _copy(base, out, length, file_hash)
+
+
+def apply_patch(base_file, patch_file, out_file, patch_format: int) -> str:
+    """
+    Create a new version of a file by applying a patch to a previous version.
+
+    :param base_file: The path of the previous version of the file.
+    :param patch_file: The path of the patch.
+    :param out_file: The path where to write the new version of the file (it must not
+                     exist already).
+    :param patch_format: The format of the patch (one of SUPPORTED_FORMATS).
+    :return: The SHA-256 hash (hex string) of the new version of the file.
+    """
+
+    if patch_format not in SUPPORTED_FORMATS:
+        raise RuntimeError(f"Unsupported patch format {patch_format}")
+
+    with open(base_file, "rb") as base, open(out_file, "xb") as out:
+        if patch_format == GZIPPED_GDIFF:
+            patch = gzip.open(patch_file, "rb")
+        else:
+            patch = open(patch_file, "rb")
+        with patch:
+            try:
+                return apply_gdiff(base, patch, out)
+            except (OSError, EOFError) as e:
+                # E.g., a corrupted gzip stream.
+                raise RuntimeError(f"Invalid patch: {e}")
+
+
+def file_digest(file_path, algorithm: str = "sha256") -> bytes:
+    """
+    Calculate the hash of a file.
+
+    :param file_path: The path of the file.
+    :param algorithm: The name of the hash algorithm (e.g., "sha1" or "sha256").
+    :return: The (binary) digest of the file.
+    """
+
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.digest()
+
+
+def digest_matches(digest: bytes, expected: str) -> bool:
+    """
+    Check if a digest corresponds to the one sent by the Play Store.
+
+    :param digest: The (binary) digest.
+    :param expected: The expected digest, as a hex string or as a (url-safe) base64
+                     string.
+    :return: True if the digests are the same, False otherwise.
+    """
+
+    if expected.lower() == binascii.hexlify(digest).decode():
+        return True
+    try:
+        padding = "=" * (-len(expected) % 4)
+        return (
+            base64.urlsafe_b64decode(
+                expected.replace("+", "-").replace("/", "_") + padding
+            )
+            == digest
+        )
+    except (binascii.Error, ValueError):
+        return False
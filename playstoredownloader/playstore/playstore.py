@@ -1,23 +1,37 @@
 #!/usr/bin/env python3
 
+import errno
+import hashlib
 import json
 import logging
 import os
 import platform
-import re
+import queue
 import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable
+from urllib.parse import urlparse
 
 import requests
 import requests.packages.urllib3.util.ssl_
 from google.protobuf import json_format
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ChunkedEncodingError
 
 from playstoredownloader.downloader.out_dir import OutDir
 from playstoredownloader.playstore import playstore_proto_pb2 as playstore_protobuf
+from . import allocation, metrics, patch, timings
+from .cache import DeliveryCache
 from .credentials import EncryptedCredentials
+from .library import AccountLibrary
 from .meta import PackageMeta
+from .pagination import iter_pages, page_documents
+from .recorder import ResponseRecorder
+from .throttle import BandwidthLimiter, RequestRateLimiter
 from .util import Util
 
 # Detect Python version and set the SSL ciphers accordingly. This is needed to avoid
@@ -52,13 +66,45 @@ else:
 class Playstore(object):
 
     LOGIN_URL = "https://android.clients.google.com/auth"
+    API_URL = "https://android.clients.google.com/fdfe/"
 
-    def __init__(self, config_file: str = "credentials.json"):
+    # The maximum number of connections kept open with the same host (the requests
+    # to the Play Store API can be performed concurrently, e.g., when crawling).
+    SESSION_POOL_SIZE = 16
+
+    def __init__(
+        self,
+        config_file: str = "credentials.json",
+        library_file: str = None,
+        recorder: ResponseRecorder = None,
+        bandwidth_limiter: BandwidthLimiter = None,
+        download_rate_limit: int = None,
+        fsync_downloads: bool = False,
+        request_limiter: RequestRateLimiter = None,
+        compress_responses: bool = True,
+    ):
         """
         Playstore object constructor.
 
         :param config_file: The path to the json configuration file, which contains
                             the credentials.
+        :param library_file: Optional path to the file where to keep track of the
+                             apps already acquired by the account (see AccountLibrary).
+        :param recorder: Optional ResponseRecorder object, used to record the responses
+                         of the Play Store API or to replay previously recorded ones.
+        :param bandwidth_limiter: Optional BandwidthLimiter object limiting the total
+                                  bandwidth of the downloads (it can be shared with
+                                  other Playstore objects).
+        :param download_rate_limit: Optional maximum number of bytes per second of
+                                    each single file download.
+        :param fsync_downloads: Flag indicating whether to flush each downloaded file
+                                to disk before considering it complete.
+        :param request_limiter: Optional RequestRateLimiter object limiting the number
+                                of requests per second to the Play Store API (it can
+                                be shared with other Playstore objects).
+        :param compress_responses: Flag indicating whether to ask the Play Store API
+                                   to compress (with gzip) its responses. The
+                                   downloaded files are never compressed.
         """
 
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
@@ -79,6 +125,30 @@ class Playstore(object):
             self.lang_code: str = self.configuration["LANG_CODE"]
             self.lang: str = self.configuration["LANG"]
 
+            # The apps already acquired by the account.
+            self.library = AccountLibrary(self.email, library_file)
+
+            # Recently requested delivery data, to avoid repeating the same
+            # delivery/purchase requests when downloading the same app again.
+            self.delivery_cache = DeliveryCache()
+
+            self.recorder = recorder
+
+            self.bandwidth_limiter = bandwidth_limiter
+            self.download_rate_limit = download_rate_limit
+            self.fsync_downloads = fsync_downloads
+            self.request_limiter = request_limiter
+            self.compress_responses = compress_responses
+
+            # Reuse the connections for all the requests to the Play Store API.
+            self.session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.SESSION_POOL_SIZE,
+                pool_maxsize=self.SESSION_POOL_SIZE,
+            )
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
         except json.decoder.JSONDecodeError as ex:
             self.logger.critical(f"The configuration file is not a valid json: {ex}")
             raise
@@ -119,6 +189,11 @@ class Playstore(object):
         This is needed to obtain the auth token to be used for any further requests.
         """
 
+        if self.recorder is not None and self.recorder.replaying:
+            # The responses are replayed, no need to login.
+            self.auth_token = "replay"
+            return
+
         params = {
             "Email": self.email,
             "EncryptedPasswd": self.encrypted_password,
@@ -130,7 +205,11 @@ class Playstore(object):
             "lang": self.lang,
         }
 
+        start_time = time.perf_counter()
         response = requests.post(self.LOGIN_URL, data=params, verify=True)
+        login_time = time.perf_counter() - start_time
+        metrics.LOGIN_DURATION.observe(login_time)
+        timings.record("login", login_time)
 
         res = {}
 
@@ -142,11 +221,13 @@ class Playstore(object):
         if "auth" in res:
             self.logger.debug(f"Authentication token found: {res['auth']}")
             self.auth_token = res["auth"]
+            metrics.LOGINS.inc(result="success")
         else:
+            metrics.LOGINS.inc(result="failure")
             raise RuntimeError("Login failed, please check your credentials")
 
     def _execute_request(
-        self, path: str, query: dict = None, data: dict = None
+        self, path: str, query: dict = None, data: dict = None, content_type: str = None
     ) -> object:
         """
         Perform a request to the Play Store to the specified path.
@@ -154,9 +235,11 @@ class Playstore(object):
         Can be used only after a successful login.
 
         :param path: The final part of the url to be requested (the first part
-                     of the url is the same for all the requests so it's hardcoded).
+                     of the url is the same for all the requests, see API_URL).
         :param query: Optional query parameters to be used during the request.
         :param data: Optional body of the request.
+        :param content_type: The content type of the body of the request (by default,
+                             a form).
         :return: A protobuf object containing the response to the request.
         """
 
@@ -178,18 +261,48 @@ class Playstore(object):
             "device=crackling,hardware=qcom,product=crackling)",
             "X-DFE-SmallestScreenWidthDp": "320",
             "X-DFE-Filter-Level": "3",
-            "Host": "android.clients.google.com",
+            "Host": urlparse(self.API_URL).netloc,
+            # The protobuf responses (especially lists of apps and search results)
+            # compress well, and they are decompressed transparently by requests.
+            "Accept-Encoding": "gzip" if self.compress_responses else "identity",
         }
 
-        url = f"https://android.clients.google.com/fdfe/{path}"
+        url = f"{self.API_URL}{path}"
 
+        if self.recorder is not None:
+            recorder_key = ResponseRecorder.key_for(path, query, data)
+            if self.recorder.replaying:
+                return playstore_protobuf.ResponseWrapper.FromString(
+                    self.recorder.load(recorder_key)
+                )
+
+        # Don't use the query string (if any) in the metrics, to keep the number of
+        # different paths small.
+        metrics_path = path.split("?", 1)[0]
+
+        if self.request_limiter is not None:
+            self.request_limiter.acquire()
+
+        start_time = time.perf_counter()
         if data is not None:
-            headers["Content-Type"] = "application/x-www-form-urlencoded; charset=UTF-8"
-            response = requests.post(
+            headers["Content-Type"] = (
+                content_type or "application/x-www-form-urlencoded; charset=UTF-8"
+            )
+            response = self.session.post(
                 url, headers=headers, params=query, data=data, verify=True
             )
         else:
-            response = requests.get(url, headers=headers, params=query, verify=True)
+            response = self.session.get(url, headers=headers, params=query, verify=True)
+        request_time = time.perf_counter() - start_time
+
+        metrics.REQUEST_DURATION.observe(request_time, path=metrics_path)
+        metrics.REQUESTS.inc(path=metrics_path, status=response.status_code)
+        # The number of bytes actually received (before decompressing the content).
+        metrics.RESPONSE_BYTES.inc(response.raw.tell(), path=metrics_path)
+        timings.record(metrics_path, request_time)
+
+        if self.recorder is not None:
+            self.recorder.save(recorder_key, response.content)
 
         message = playstore_protobuf.ResponseWrapper.FromString(response.content)
 
@@ -217,129 +330,277 @@ class Playstore(object):
         :param error_str: The error message of the exception that will be raised if
                           the download of the file fails.
         :return: A generator that returns the download progress (0-100) at each
-                 iteration.
+                 iteration. The return value of the generator is the SHA-256 hash
+                 (hex string) of the downloaded file.
         """
         chunk_size = 1024
+        allocation_quantum = 1024 * 1024
         file_size = int(server_response.headers["Content-Length"])
+        file_hash = hashlib.sha256()
+        written_bytes = 0
+        start_time = time.perf_counter()
+
+        # The bandwidth limits (if any) of this download.
+        limiters = []
+        if self.bandwidth_limiter is not None:
+            limiters.append(self.bandwidth_limiter)
+        if self.download_rate_limit:
+            limiters.append(BandwidthLimiter(self.download_rate_limit))
+        quantum = min((limiter.quantum for limiter in limiters), default=0)
+        unthrottled_bytes = 0
+        unallocated_bytes = 0
+
+        # The file is written to a temporary file in the same directory, which is
+        # renamed only after verifying that the download is complete: readers never
+        # see a partially written file and an interrupted download never replaces a
+        # previous (complete) copy of the file.
+        temp_file = os.path.join(
+            os.path.dirname(os.path.abspath(destination_file)),
+            f".{os.path.basename(destination_file)}.{uuid.uuid4().hex}.part",
+        )
 
-        # Download the file and save it, yielding the progress (in the range 0-100).
         try:
-            with open(destination_file, "wb") as f:
-                last_progress = 0
-                for index, chunk in enumerate(
-                    Util.show_list_progress(
-                        server_response.iter_content(chunk_size=chunk_size),
-                        interactive=show_progress_bar,
-                        unit=" KB",
-                        total=(file_size // chunk_size),
-                        description=download_str,
-                    )
-                ):
-                    current_progress = 100 * index * chunk_size // file_size
-                    if current_progress > last_progress:
-                        last_progress = current_progress
-                        yield last_progress
-
-                    if chunk:
-                        f.write(chunk)
+            # Download the file and save it, yielding the progress (0-100).
+            try:
+                with open(temp_file, "xb") as f:
+                    preallocated = self._preallocate(f, file_size)
+                    if preallocated:
+                        allocation.allocated(file_size)
+
+                    last_progress = 0
+                    for index, chunk in enumerate(
+                        Util.show_list_progress(
+                            server_response.iter_content(chunk_size=chunk_size),
+                            interactive=show_progress_bar,
+                            unit=" KB",
+                            total=(file_size // chunk_size),
+                            description=download_str,
+                        )
+                    ):
+                        current_progress = 100 * index * chunk_size // file_size
+                        if current_progress > last_progress:
+                            last_progress = current_progress
+                            yield last_progress
+
+                        if chunk:
+                            f.write(chunk)
+                            file_hash.update(chunk)
+                            written_bytes += len(chunk)
+
+                            # Report the disk space taken by a file that wasn't
+                            # preallocated once every quantum bytes.
+                            if not preallocated:
+                                unallocated_bytes += len(chunk)
+                                if unallocated_bytes >= allocation_quantum:
+                                    allocation.allocated(unallocated_bytes)
+                                    unallocated_bytes = 0
+
+                            # Wait for the bandwidth limits once every quantum bytes,
+                            # instead of at every (small) chunk.
+                            unthrottled_bytes += len(chunk)
+                            if limiters and unthrottled_bytes >= quantum:
+                                for limiter in limiters:
+                                    limiter.consume(unthrottled_bytes)
+                                unthrottled_bytes = 0
+
+                    if self.fsync_downloads:
                         f.flush()
+                        os.fsync(f.fileno())
+
+                    # Download complete.
+                    yield 100
+            except ChunkedEncodingError:
+                # There was an error during the download so not all the file was
+                # written to disk, hence there will be a mismatch between the expected
+                # size and the actual size of the downloaded file, but the next code
+                # block will handle that.
+                pass
+
+            download_time = time.perf_counter() - start_time
+            metrics.DOWNLOADED_BYTES.inc(written_bytes)
+
+            # Check if the entire file was downloaded correctly, otherwise raise an
+            # exception.
+            if file_size != written_bytes:
+                metrics.DOWNLOADED_FILES.inc(result="failure")
+                self.logger.error(
+                    f"Download of '{destination_file}' not completed, please retry"
+                )
+                raise RuntimeError(error_str)
 
-                # Download complete.
-                yield 100
-        except ChunkedEncodingError:
-            # There was an error during the download so not all the file was written
-            # to disk, hence there will be a mismatch between the expected size and
-            # the actual size of the downloaded file, but the next code block will
-            # handle that.
-            pass
+            os.replace(temp_file, destination_file)
 
-        # Check if the entire file was downloaded correctly, otherwise raise an
-        # exception.
-        if file_size != os.path.getsize(destination_file):
-            self.logger.error(
-                f"Download of '{destination_file}' not completed, please retry, "
-                f"the file '{destination_file}' is corrupted and will be removed"
-            )
+            if self.fsync_downloads:
+                # Make the rename durable.
+                self._fsync_directory(
+                    os.path.dirname(os.path.abspath(destination_file))
+                )
 
+        except BaseException:
+            # The download failed or was interrupted (e.g., the generator was closed).
             try:
-                os.remove(destination_file)
+                os.remove(temp_file)
+            except FileNotFoundError:
+                pass
             except OSError:
                 self.logger.warning(
-                    f"The file '{destination_file}' is corrupted and should be "
-                    f"removed manually"
+                    f"The incomplete file '{temp_file}' should be removed manually"
                 )
+            raise
 
-            raise RuntimeError(error_str)
+        metrics.DOWNLOADED_FILES.inc(result="success")
+        metrics.DOWNLOAD_DURATION.observe(download_time)
+        if download_time > 0:
+            metrics.DOWNLOAD_THROUGHPUT.observe(written_bytes / download_time)
+
+        download_timings = timings.current()
+        if download_timings is not None:
+            # The time elapsed between sending the request and receiving the response
+            # headers (including DNS resolution, connection and TLS handshake, which
+            # are not exposed separately by requests).
+            elapsed = getattr(server_response, "elapsed", None)
+            download_timings.add_file(
+                Path(destination_file).name,
+                written_bytes,
+                elapsed.total_seconds() if elapsed is not None else None,
+                download_time,
+            )
 
-    def _download_with_progress(
-        self,
-        meta: PackageMeta,
-        out_dir: OutDir,
-        download_obb: bool = False,
-        download_split_apks: bool = False,
-        show_progress_bar: bool = False,
-    ) -> Iterable[int]:
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def _preallocate(file, size: int) -> bool:
         """
-        Internal method to download a certain app (identified by the package name) from
-        the Google Play Store and report the progress (using a generator that reports
-        the download progress in the range 0-100).
+        Internal method to allocate the disk space of a file before writing it, to
+        fail immediately if the disk is full and to reduce the fragmentation of the
+        file (where supported).
 
-        :param meta: PackageMeta object containing data about the app.
-        :param out_dir: OutDir object containing the location where to save the
-                        downloaded app (by default "package_name.apk").
-        :param download_obb: Flag indicating whether to also download the additional
-                             .obb files for an application (if any).
-        :param download_split_apks: Flag indicating whether to also download the
-                                    additional split apks for an application (if any).
-        :param show_progress_bar: Flag indicating whether to show a progress bar in the
-                                  terminal during the download of the file(s).
-        :return: A generator that returns the download progress (0-100) at each
-                 iteration.
+        :param file: The (empty) file object.
+        :param size: The expected size of the file.
+        :return: True if the disk space of the file was allocated, False otherwise.
         """
 
-        def _handle_missing_payload(res, pkg):
-            # If the query went completely wrong.
-            if "payload" not in self.protobuf_to_dict(res):
-                try:
-                    self.logger.error(
-                        f"Error for app '{pkg}': " f"{res.commands.displayErrorMessage}"
-                    )
-                    raise RuntimeError(
-                        f"Error for app '{pkg}': " f"{res.commands.displayErrorMessage}"
-                    )
-                except AttributeError:
-                    self.logger.error(
-                        "There was an error when requesting the download link "
-                        f"for app '{pkg}'"
-                    )
+        if size <= 0 or not hasattr(os, "posix_fallocate"):
+            return False
+        try:
+            os.posix_fallocate(file.fileno(), 0, size)
+            return True
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise RuntimeError(
+                    f"Not enough free disk space to save '{file.name}' ({size} bytes)"
+                ) from e
+            # Not supported by the file system, the file will grow while written.
+            return False
+
+    @staticmethod
+    def _fsync_directory(directory: str) -> None:
+        """
+        Internal method to flush to disk the entries of a directory (e.g., after
+        renaming a file), where supported.
+
+        :param directory: The path of the directory.
+        """
+
+        try:
+            directory_fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            # Not supported (e.g., on Windows).
+            return
+        try:
+            os.fsync(directory_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(directory_fd)
+
+    def _handle_missing_payload(self, response: object, package_name: str) -> None:
+        """
+        Internal method to check that a response to a delivery/purchase request
+        contains a payload, otherwise raise an exception.
+
+        :param response: The protobuf object containing the response to the request.
+        :param package_name: The package name of the app being downloaded.
+        """
 
+        # If the query went completely wrong.
+        if "payload" not in self.protobuf_to_dict(response):
+            try:
+                self.logger.error(
+                    f"Error for app '{package_name}': "
+                    f"{response.commands.displayErrorMessage}"
+                )
                 raise RuntimeError(
-                    "Unable to download the application, please see the logs for more "
-                    "information"
+                    f"Error for app '{package_name}': "
+                    f"{response.commands.displayErrorMessage}"
+                )
+            except AttributeError:
+                self.logger.error(
+                    "There was an error when requesting the download link "
+                    f"for app '{package_name}'"
                 )
 
-        version_code = meta.docV2.details.appDetails.versionCode
+            raise RuntimeError(
+                "Unable to download the application, please see the logs for more "
+                "information"
+            )
+
+    def _request_delivery_data(
+        self, meta: PackageMeta, base_version_code: int = None
+    ) -> object:
+        """
+        Internal method to request to the Play Store the data needed to download a
+        certain app (download url, cookies, additional files and split apks). If
+        needed, the app is added to the account first.
+
+        :param meta: PackageMeta object containing data about the app.
+        :param base_version_code: Optional version code of a previous version of the
+                                  app (already downloaded), from which a patch to the
+                                  requested version can be offered.
+        :return: An AndroidAppDeliveryData protobuf object.
+        """
+
+        docid = meta.docV2.docid
+        version_code = meta.version_code
         offer_type = meta.docV2.offer[0].offerType
 
-        # Check if the app was already downloaded by this account.
-        path = "delivery"
         query = {
             "ot": offer_type,
-            "doc": meta.docV2.docid,
+            "doc": docid,
             "vc": version_code,
         }
 
-        response = self._execute_request(path, query)
-        _handle_missing_payload(response, meta.package_name)
-        delivery_data = response.payload.deliveryResponse.appDeliveryData
-
-        if not delivery_data.downloadUrl:
+        if base_version_code is not None:
+            # Ask for a patch from the version already downloaded (the server
+            # decides whether to offer it).
+            query["bvc"] = base_version_code
+            query["pf"] = list(patch.SUPPORTED_FORMATS)
+
+        delivery_data = None
+
+        # According to the local library, the app doesn't belong to this account (a
+        # previous purchase failed), so there is no need to check if it can be
+        # delivered: add it to the account straight away (the other apps are checked
+        # as usual).
+        skip_delivery = self.library.enabled and self.library.ownership(docid) is False
+        if not skip_delivery:
+            # Check if the app was already downloaded by this account.
+            path = "delivery"
+            response = self._execute_request(path, query)
+            self._handle_missing_payload(response, meta.package_name)
+            delivery_data = response.payload.deliveryResponse.appDeliveryData
+
+            if not delivery_data.downloadUrl:
+                # The local library (if any) is not up to date.
+                self.library.discard(docid)
+
+        if delivery_data is None or not delivery_data.downloadUrl:
             # The app doesn't belong to the account, so it has to be added to the
             # account first.
             path = "purchase"
 
             response = self._execute_request(path, data=query)
-            _handle_missing_payload(response, meta.package_name)
+            self._handle_missing_payload(response, meta.package_name)
             delivery_data = (
                 response.payload.buyResponse.purchaseStatusResponse.appDeliveryData
             )
@@ -349,100 +610,395 @@ class Playstore(object):
                 path = "delivery"
                 query["dtok"] = download_token
                 response = self._execute_request(path, query)
-                _handle_missing_payload(response, meta.package_name)
+                self._handle_missing_payload(response, meta.package_name)
                 delivery_data = response.payload.deliveryResponse.appDeliveryData
 
-        # The url where to download the apk file.
-        temp_url = delivery_data.downloadUrl
+        if delivery_data.downloadUrl:
+            self.library.add(docid)
+            if skip_delivery:
+                self.library.record_saved_round_trip()
+
+        return delivery_data
+
+    def _get_delivery_data(self, meta: PackageMeta, out_dir: OutDir = None) -> object:
+        """
+        Internal method to get the data needed to download a certain app, using the
+        delivery cache when possible.
+
+        :param meta: PackageMeta object containing data about the app.
+        :param out_dir: Optional OutDir object where the app will be downloaded. If it
+                        contains a previous version of the app, a patch from that
+                        version is requested too.
+        :return: An AndroidAppDeliveryData protobuf object.
+        """
+
+        base = self._patch_base(meta, out_dir)
+        base_version_code = base["version_code"] if base else None
 
-        # Additional files (.obb) to be downloaded with the application.
-        # https://developer.android.com/google/play/expansion-files
-        additional_files = [
-            additional_file for additional_file in delivery_data.additionalFile
+        cache_key = DeliveryCache.key_for(meta, base_version_code)
+        delivery_data = self.delivery_cache.get(cache_key)
+        if delivery_data is None:
+            delivery_data = self._request_delivery_data(meta, base_version_code)
+            self.delivery_cache.put(cache_key, delivery_data)
+
+        return delivery_data
+
+    @classmethod
+    def _delivery_cache_key(cls, meta: PackageMeta, out_dir: OutDir = None) -> tuple:
+        """
+        Internal method to get the key of the cached delivery data of a certain app.
+
+        :param meta: PackageMeta object containing data about the app.
+        :param out_dir: Optional OutDir object where the app will be downloaded.
+        :return: The key of the delivery data in the delivery cache (see
+                 DeliveryCache.key_for).
+        """
+
+        base = cls._patch_base(meta, out_dir)
+        return DeliveryCache.key_for(meta, base["version_code"] if base else None)
+
+    @staticmethod
+    def _patch_base(meta: PackageMeta, out_dir: OutDir = None) -> dict:
+        """
+        Internal method to find the most recent previous version of an app already
+        downloaded, which can be patched to obtain the version to be downloaded.
+
+        :param meta: PackageMeta object containing data about the app.
+        :param out_dir: OutDir object where the app will be downloaded.
+        :return: The manifest entry of the apk of the previous version, or None if
+                 there is no (unmodified) previous version in the directory.
+        """
+
+        if out_dir is None:
+            return None
+
+        version_code = meta.version_code
+        candidates = [
+            entry
+            for entry in out_dir.manifest.find(meta.package_name)
+            if entry.get("kind") == "apk" and entry["version_code"] < version_code
         ]
+        return max(candidates, key=lambda entry: entry["version_code"], default=None)
 
-        # Additional split apk(s) to be downloaded with the application.
-        # https://developer.android.com/guide/app-bundle/dynamic-delivery
-        split_apks = [split_apk for split_apk in delivery_data.split]
+    def _request_file(self, url: str, delivery_data: object) -> requests.Response:
+        """
+        Internal method to request a file to be downloaded (apk, obb or split apk),
+        using the cookie contained in the delivery data.
+
+        :param url: The url of the file to be downloaded.
+        :param delivery_data: The AndroidAppDeliveryData protobuf object containing the
+                              cookie needed to download the file.
+        :return: The (streamed) response from the server.
+        """
 
         try:
             cookie = delivery_data.downloadAuthCookie[0]
         except IndexError:
-            self.logger.error(
-                f"DownloadAuthCookie was not received for '{meta.package_name}'"
-            )
-            raise RuntimeError(
-                f"DownloadAuthCookie was not received for '{meta.package_name}'"
-            )
+            raise RuntimeError("DownloadAuthCookie was not received")
 
         cookies = {str(cookie.name): str(cookie.value)}
 
         headers = {
             "User-Agent": "AndroidDownloadManager/8.0.0 (Linux; U; Android 8.0.0; "
             "STF-L09 Build/HUAWEISTF-L09)",
+            # The files are already compressed (apk and obb files are zip archives),
+            # so compressing them again would only waste CPU on both sides.
             "Accept-Encoding": "",
         }
 
-        # Execute another request to get the actual apk file.
-        response = requests.get(
-            temp_url, headers=headers, cookies=cookies, verify=True, stream=True
+        return requests.get(
+            url, headers=headers, cookies=cookies, verify=True, stream=True
         )
 
-        yield from self._download_single_file(
-            out_dir.apk_path,
-            response,
-            show_progress_bar,
-            f"Downloading {meta.package_name}",
-            "Unable to download the entire application",
+    def _download_patch(
+        self,
+        meta: PackageMeta,
+        out_dir: OutDir,
+        delivery_data: object,
+        base: dict,
+        show_progress_bar: bool = False,
+    ) -> Iterable[int]:
+        """
+        Internal method to obtain the apk of an app by downloading a patch and applying
+        it to a previous version of the app (already downloaded).
+
+        :param meta: PackageMeta object containing data about the app.
+        :param out_dir: OutDir object containing the location where to save the apk.
+        :param delivery_data: The AndroidAppDeliveryData protobuf object with the
+                              data of the patch.
+        :param base: The manifest entry of the apk of the previous version.
+        :param show_progress_bar: Flag indicating whether to show a progress bar in the
+                                  terminal during the download of the patch.
+        :return: A generator that returns the download progress (0-100) at each
+                 iteration. The return value of the generator is the SHA-256 hash
+                 (hex string) of the new apk.
+        """
+
+        patch_data = delivery_data.patchData
+        base_file = out_dir / base["file"]
+        if patch_data.baseSha1 and not patch.digest_matches(
+            patch.file_digest(base_file, "sha1"), patch_data.baseSha1
+        ):
+            raise RuntimeError(f"the patch doesn't apply to '{base_file}'")
+
+        response = self._request_file(patch_data.downloadUrl, delivery_data)
+        if not response.ok:
+            response.close()
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+        temp_name = f".{out_dir.apk_path.name}.{uuid.uuid4().hex}"
+        patch_file = out_dir / f"{temp_name}.patch"
+        patched_file = out_dir / f"{temp_name}.part"
+        try:
+            yield from self._download_single_file(
+                patch_file,
+                response,
+                show_progress_bar,
+                f"Downloading patch for {meta.package_name}",
+                "Unable to download the entire patch",
+            )
+            file_hash = patch.apply_patch(
+                base_file, patch_file, patched_file, patch_data.patchFormat
+            )
+
+            # The patched apk has to be exactly the new version of the app.
+            if delivery_data.sha256 and not patch.digest_matches(
+                bytes.fromhex(file_hash), delivery_data.sha256
+            ):
+                raise RuntimeError("the patched apk doesn't match the new version")
+
+            if self.fsync_downloads:
+                with open(patched_file, "rb") as f:
+                    os.fsync(f.fileno())
+            os.replace(patched_file, out_dir.apk_path)
+            if self.fsync_downloads:
+                self._fsync_directory(str(out_dir))
+        finally:
+            for temp_file in (patch_file, patched_file):
+                try:
+                    os.remove(temp_file)
+                except FileNotFoundError:
+                    pass
+
+        self.logger.info(
+            f"Updated '{meta.package_name}' from version {base['version_code']} "
+            f"with a patch of {response.headers['Content-Length']} bytes"
         )
+        return file_hash
+
+    def _download_with_progress(
+        self,
+        meta: PackageMeta,
+        out_dir: OutDir,
+        download_obb: bool = False,
+        download_split_apks: bool = False,
+        show_progress_bar: bool = False,
+    ) -> Iterable[int]:
+        """
+        Internal method to download a certain app (identified by the package name) from
+        the Google Play Store and report the progress (using a generator that reports
+        the download progress in the range 0-100).
+
+        :param meta: PackageMeta object containing data about the app.
+        :param out_dir: OutDir object containing the location where to save the
+                        downloaded app (by default "package_name.apk").
+        :param download_obb: Flag indicating whether to also download the additional
+                             .obb files for an application (if any).
+        :param download_split_apks: Flag indicating whether to also download the
+                                    additional split apks for an application (if any).
+        :param show_progress_bar: Flag indicating whether to show a progress bar in the
+                                  terminal during the download of the file(s).
+        :return: A generator that returns the download progress (0-100) at each
+                 iteration.
+        """
+
+        cache_key = self._delivery_cache_key(meta, out_dir)
+        from_cache = cache_key in self.delivery_cache
+        delivery_data = self._get_delivery_data(meta, out_dir)
+
+        if not delivery_data.downloadAuthCookie:
+            self.delivery_cache.invalidate(cache_key)
+            self.logger.error(
+                f"DownloadAuthCookie was not received for '{meta.package_name}'"
+            )
+            raise RuntimeError(
+                f"DownloadAuthCookie was not received for '{meta.package_name}'"
+            )
+
+        # When a previous version of the app was already downloaded, try to download
+        # only a patch from that version (if offered by the server).
+        file_hash = None
+        base = self._patch_base(meta, out_dir)
+        patch_data = delivery_data.patchData
+        if (
+            base is not None
+            and patch_data.downloadUrl
+            and patch_data.baseVersionCode == base["version_code"]
+            and patch_data.patchFormat in patch.SUPPORTED_FORMATS
+        ):
+            try:
+                file_hash = yield from self._download_patch(
+                    meta, out_dir, delivery_data, base, show_progress_bar
+                )
+            except Exception as e:
+                self.logger.warning(
+                    f"Unable to update '{meta.package_name}' from version "
+                    f"{base['version_code']} with a patch ({e}), downloading the "
+                    f"entire application"
+                )
+
+        if file_hash is None:
+            # Execute another request to get the actual apk file.
+            response, delivery_data, from_cache = self._request_delivered_file(
+                meta, out_dir, delivery_data, from_cache, lambda data: data.downloadUrl
+            )
+
+            file_hash = yield from self._download_single_file(
+                out_dir.apk_path,
+                response,
+                show_progress_bar,
+                f"Downloading {meta.package_name}",
+                "Unable to download the entire application",
+            )
+
+        out_dir.record(out_dir.apk_path, file_hash, kind="apk")
 
         # NOTE: expansion files (OBBs) will no longer be supported for new apps.
         # https://android-developers.googleblog.com/2020/11/new-android-app-bundle-and-target-api.html
         if download_obb:
             # Save the additional .obb files for this application.
-            for obb in additional_files:
+            # https://developer.android.com/google/play/expansion-files
+            for index, obb in enumerate(list(delivery_data.additionalFile)):
 
                 # Execute another query to get the actual file.
-                response = requests.get(
-                    obb.downloadUrl,
-                    headers=headers,
-                    cookies=cookies,
-                    verify=True,
-                    stream=True,
+                response, delivery_data, from_cache = self._request_delivered_file(
+                    meta,
+                    out_dir,
+                    delivery_data,
+                    from_cache,
+                    lambda data: data.additionalFile[index].downloadUrl,
                 )
 
                 obb_file_name = out_dir.obb_path(obb)
 
-                yield from self._download_single_file(
+                file_hash = yield from self._download_single_file(
                     obb_file_name,
                     response,
                     show_progress_bar,
                     f"Downloading additional .obb file for {meta.package_name}",
                     "Unable to download completely the additional .obb file(s)",
                 )
+                out_dir.record(obb_file_name, file_hash, kind="obb")
 
         if download_split_apks:
             # Save the split apk(s) for this application.
-            for split_apk in split_apks:
+            # https://developer.android.com/guide/app-bundle/dynamic-delivery
+            for index, split_apk in enumerate(list(delivery_data.split)):
 
                 # Execute another query to get the actual file.
-                response = requests.get(
-                    split_apk.downloadUrl,
-                    headers=headers,
-                    cookies=cookies,
-                    verify=True,
-                    stream=True,
+                response, delivery_data, from_cache = self._request_delivered_file(
+                    meta,
+                    out_dir,
+                    delivery_data,
+                    from_cache,
+                    lambda data: data.split[index].downloadUrl,
                 )
 
                 split_apk_file_name = out_dir.split_apk_path(split_apk)
 
-                yield from self._download_single_file(
+                file_hash = yield from self._download_single_file(
                     split_apk_file_name,
                     response,
                     show_progress_bar,
                     f"Downloading split apk for {meta.package_name}",
                     "Unable to download completely the additional split apk file(s)",
                 )
+                out_dir.record(split_apk_file_name, file_hash, kind="split")
+
+    def _request_delivered_file(
+        self,
+        meta: PackageMeta,
+        out_dir: OutDir,
+        delivery_data: object,
+        from_cache: bool,
+        url_of: Callable[[object], str],
+    ) -> tuple:
+        """
+        Internal method to request one of the files of an app (apk, obb or split apk)
+        with the url and the cookie contained in the delivery data. If the delivery
+        data was cached and the server rejects it (e.g., the url or the cookie expired
+        during a long download), new delivery data is requested and the file is
+        requested again.
+
+        :param meta: PackageMeta object containing data about the app.
+        :param out_dir: OutDir object where the app will be downloaded.
+        :param delivery_data: The AndroidAppDeliveryData protobuf object of the app.
+        :param from_cache: Flag indicating whether the delivery data was cached.
+        :param url_of: Function returning the url of the file from the delivery data.
+        :return: A tuple (response, delivery data, from cache) with the (successful)
+                 response of the file request and the delivery data to be used for
+                 the next files of the app.
+        """
+
+        cache_key = self._delivery_cache_key(meta, out_dir)
+        response = self._request_file(url_of(delivery_data), delivery_data)
+
+        if 400 <= response.status_code < 500:
+            response.close()
+            self.delivery_cache.invalidate(cache_key)
+            if from_cache:
+                # The cached download url (or its cookie) is not valid anymore, so
+                # request new delivery data and try again.
+                self.logger.warning(
+                    f"Cached download link for '{meta.package_name}' was rejected "
+                    f"(HTTP {response.status_code}), requesting a new one"
+                )
+                delivery_data = self._get_delivery_data(meta, out_dir)
+                from_cache = False
+                response = self._request_file(url_of(delivery_data), delivery_data)
+
+        if not response.ok:
+            response.close()
+            self.delivery_cache.invalidate(cache_key)
+            self.logger.error(
+                f"Unable to download '{meta.package_name}' "
+                f"(HTTP {response.status_code})"
+            )
+            raise RuntimeError(
+                f"Unable to download '{meta.package_name}' "
+                f"(HTTP {response.status_code})"
+            )
+
+        return response, delivery_data, from_cache
+
+    def _fetch_page(self, page: tuple, description: str) -> tuple:
+        """
+        Fetch a page of a paginated listing (e.g., search results).
+
+        :param page: A tuple (path, query) with the location of the page (the path of
+                     the next pages already contains the query parameters).
+        :param description: The description of the listing (for the logs).
+        :return: A tuple (results, next page), where results is a list of protobuf
+                 (DocV2) objects and next page is the location of the next page, or
+                 None if this is the last page.
+        """
+
+        path, query = page
+        response = self._execute_request(path, query)
+
+        # If the query went completely wrong (raise an error instead of ending the
+        # listing, so that an incomplete listing is not mistaken for a complete one).
+        if not response.HasField("payload"):
+            error = (
+                f"Error for {description}: {response.commands.displayErrorMessage}"
+                if response.HasField("commands")
+                else f"There was an error for {description}"
+            )
+            self.logger.error(error)
+            raise RuntimeError(error)
+
+        documents, next_page = page_documents(response)
+        return documents, (next_page, None) if next_page else None
 
     ############################
     # Playstore Public Methods #
@@ -548,7 +1104,95 @@ class Playstore(object):
 
         return list_response or None
 
-    # noinspection PyMethodMayBeStatic
+    def list_app_by_category_iter(
+        self,
+        category: str,
+        subcategory: str,
+        limit: int = None,
+        page_size: int = None,
+        read_ahead: int = 2,
+    ) -> Iterable:
+        """
+        Get the apps of a category, following all the pages of the listing.
+
+        Unlike list_app_by_category, the apps are returned lazily as the pages arrive
+        (with at most read_ahead pages fetched in advance), so even long listings (e.g.,
+        the full top charts) are crawled using a constant amount of memory.
+
+        :param category: The category to which the apps belong.
+        :param subcategory: The subcategory of the apps (top free, top paid,
+                            trending etc.).
+        :param limit: Optional maximum number of apps to be returned.
+        :param page_size: How many results to request from the server for each page.
+        :param read_ahead: How many pages can be fetched in advance.
+        :return: A generator of protobuf (DocV2) objects, one for each application in
+                 the listing.
+        """
+
+        query = {
+            "c": 3,
+            "cat": requests.utils.quote(category),
+            "ctr": requests.utils.quote(subcategory),
+        }
+        if page_size is not None:
+            query["n"] = int(page_size)
+
+        return iter_pages(
+            lambda page: self._fetch_page(
+                page, f"listing of '{category}' ({subcategory})"
+            ),
+            ("list", query),
+            limit=limit,
+            read_ahead=read_ahead,
+        )
+
+    def iter_listing(
+        self, url: str, limit: int = None, read_ahead: int = 1
+    ) -> Iterable:
+        """
+        Get the apps of a listing returned by the Play Store API (e.g., the url of a
+        related link in the details of an app), following all its pages.
+
+        :param url: The url of the listing, relative to the API url (e.g.,
+                    "getBrowseStream?...").
+        :param limit: Optional maximum number of apps to be returned.
+        :param read_ahead: How many pages can be fetched in advance.
+        :return: A generator of protobuf (DocV2) objects, one for each application in
+                 the listing.
+        """
+
+        return iter_pages(
+            lambda page: self._fetch_page(page, f"listing '{url}'"),
+            (url, None),
+            limit=limit,
+            read_ahead=read_ahead,
+        )
+
+    def iter_apps_by_developer(
+        self, developer_name: str, limit: int = None, read_ahead: int = 1
+    ) -> Iterable:
+        """
+        Get the apps published by a developer, following all the pages of results.
+
+        :param developer_name: The exact name of the developer in the Google Play Store.
+        :param limit: Optional maximum number of package names to be returned.
+        :param read_ahead: How many pages can be fetched in advance.
+        :return: A generator of the (distinct) package names of the applications
+                 published by the specified developer, returned as the pages arrive.
+        """
+
+        seen = set()
+
+        # Search the apps of the publisher, then keep only the apps of the developer
+        # (the search might also return apps of developers with a similar name).
+        for doc in self.search_iter(f'pub:"{developer_name}"', read_ahead=read_ahead):
+            if doc.creator != developer_name or doc.docid in seen:
+                continue
+            seen.add(doc.docid)
+            yield doc.docid
+            if limit is not None and len(seen) >= limit:
+                return
+
     def list_app_by_developer(self, developer_name: str) -> list:
         """
         Get the list of apps published by a developer.
@@ -559,30 +1203,100 @@ class Playstore(object):
                  are found.
         """
 
-        base_url = "https://play.google.com/store/apps/developer?id="
+        return list(self.iter_apps_by_developer(developer_name))
+
+    def list_apps_by_developers(
+        self, developer_names: Iterable, max_workers: int = 4
+    ) -> Iterable:
+        """
+        Get the apps published by many developers, crawling the developers in parallel.
+
+        The requests share the same pool of connections (see SESSION_POOL_SIZE), and
+        the results are returned as soon as they arrive, in no particular order. The
+        crawling stops when the caller stops iterating.
 
-        # Get the developer's page on Google Play Store.
-        request_url = f"{base_url}{requests.utils.quote(developer_name)}"
-        response = requests.get(
-            request_url,
-            headers={
-                "User-Agent": "AndroidDownloadManager/8.0.0 (Linux; U; Android 8.0.0; "
-                "STF-L09 Build/HUAWEISTF-L09)",
-            },
+        :param developer_names: The exact names of the developers in the Google Play
+                                Store.
+        :param max_workers: How many developers to crawl at the same time.
+        :return: A generator of distinct (package name, developer name) tuples.
+        """
+
+        developers = list(dict.fromkeys(developer_names))
+        if not developers:
+            return
+
+        records = queue.Queue()
+        stop = threading.Event()
+        finished = object()
+
+        def crawl(developer: str) -> None:
+            try:
+                if stop.is_set():
+                    return
+                for package_name in self.iter_apps_by_developer(developer):
+                    if stop.is_set():
+                        return
+                    records.put((package_name, developer))
+            except Exception as e:
+                self.logger.error(f"Error when crawling developer '{developer}': {e}")
+            finally:
+                records.put(finished)
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(min(max_workers, len(developers)), 1),
+            thread_name_prefix="developer-crawler",
         )
+        for developer in developers:
+            executor.submit(crawl, developer)
 
-        # TODO: handle pagination in case there are many apps published by a developer,
-        #  otherwise this method will get only a subset of the total number of apps.
+        seen = set()
+        pending = len(developers)
+        try:
+            while pending:
+                record = records.get()
+                if record is finished:
+                    pending -= 1
+                elif record not in seen:
+                    seen.add(record)
+                    yield record
+        finally:
+            # The caller stopped iterating (or all the developers were crawled).
+            stop.set()
+            executor.shutdown(wait=False)
+
+    def bulk_details(self, package_names: Iterable) -> dict:
+        """
+        Get the details of many apps with a single request.
 
-        # Use a regular expression to obtain the package names (the page shows only
-        # applications published by the selected developer). This list might contain
-        # duplicates, as the same package name can appear more than once in the page.
-        package_names = re.findall(
-            r"store/apps/details\?id=([a-zA-Z0-9._]+)", response.text
+        :param package_names: The package names of the apps.
+        :return: A dictionary with the protobuf (DocV2) object of each app found, by
+                 package name (the apps not found are missing). The result will be
+                 None if there was something wrong with the request.
+        """
+
+        request = playstore_protobuf.BulkDetailsRequest()
+        request.docid.extend(package_names)
+        request.includeChildDocs = False
+
+        response = self._execute_request(
+            "bulkDetails",
+            data=request.SerializeToString(),
+            content_type="application/x-protobuf",
         )
 
-        # Avoid duplicates.
-        return list(set(package_names))
+        # If the request went completely wrong.
+        if not response.HasField("payload"):
+            self.logger.error(
+                "Error when requesting the details of many apps: "
+                f"{response.commands.displayErrorMessage}"
+            )
+            return None
+
+        return {
+            entry.doc.docid: entry.doc
+            for entry in response.payload.bulkDetailsResponse.entry
+            if entry.doc.docid
+        }
 
     def search(self, query: str) -> object:
         """
@@ -634,6 +1348,39 @@ class Playstore(object):
 
         return doc
 
+    def search_iter(
+        self,
+        query: str,
+        limit: int = None,
+        page_size: int = None,
+        read_ahead: int = 1,
+    ) -> Iterable:
+        """
+        Search for apps in the Google Play Store, following the pages of results.
+
+        The results are returned lazily as the pages arrive: the next page is fetched
+        while the caller consumes the current one, and no more pages are fetched once
+        limit results have been received or the caller stops iterating.
+
+        :param query: The string describing the applications to be searched.
+        :param limit: Optional maximum number of results to be returned.
+        :param page_size: How many results to request from the server for each page.
+        :param read_ahead: How many pages can be fetched in advance.
+        :return: A generator of protobuf (DocV2) objects, one for each application
+                 found.
+        """
+
+        search_query = {"c": 3, "q": requests.utils.quote(query)}
+        if page_size is not None:
+            search_query["n"] = int(page_size)
+
+        return iter_pages(
+            lambda page: self._fetch_page(page, f"search '{query}'"),
+            ("search", search_query),
+            limit=limit,
+            read_ahead=read_ahead,
+        )
+
     def download(
         self,
         meta: PackageMeta,
@@ -671,7 +1418,9 @@ class Playstore(object):
             )
         except Exception as e:
             self.logger.error(f"Error during the download: {e}", exc_info=True)
+            metrics.APP_DOWNLOADS.inc(result="failure")
             return False
 
         # The apk and the additional files (if any) were downloaded correctly.
+        metrics.APP_DOWNLOADS.inc(result="success")
         return True
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseRecorder(object):
+    """
+    Record the raw responses of the Play Store API to a directory, or replay them
+    from the directory instead of contacting the server.
+
+    Each response is saved in a separate file, named after the path of the request and
+    a hash of its query parameters and body, so the same request always maps to the
+    same file. Replaying the responses makes the parsing code (search, lists of apps,
+    app details etc.) deterministic and fast, e.g., for micro-benchmarks or to develop
+    without network access.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, directory, mode: str = REPLAY):
+        """
+        ResponseRecorder object constructor.
+
+        :param directory: The directory containing the recorded responses.
+        :param mode: "record" to save the responses received from the server, or
+                     "replay" to read the responses from the directory (no request is
+                     sent to the server, not even the login).
+        """
+
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Invalid mode '{mode}'")
+
+        self.directory = Path(directory)
+        self.mode = mode
+        self._lock = threading.Lock()
+
+        if self.recording:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == self.RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == self.REPLAY
+
+    @staticmethod
+    def key_for(path: str, query: dict = None, data=None) -> str:
+        """
+        Get the key identifying a request.
+
+        :param path: The path of the request.
+        :param query: The query parameters of the request (if any).
+        :param data: The body of the request (if any).
+        :return: A string usable as file name.
+        """
+
+        if isinstance(data, bytes):
+            body = data.hex()
+        else:
+            body = sorted((str(k), str(v)) for k, v in (data or {}).items())
+        canonical = json.dumps(
+            [path, sorted((str(k), str(v)) for k, v in (query or {}).items()), body]
+        )
+        digest = hashlib.sha256(canonical.encode()).hexdigest()[:20]
+        name = re.sub(r"[^\w\-.]", "_", path.split("?", 1)[0])
+        return f"{name}-{digest}"
+
+    def _file_for(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def save(self, key: str, content: bytes) -> None:
+        """
+        Save a response.
+
+        :param key: The key of the request (see key_for).
+        :param content: The raw content of the response.
+        """
+
+        with self._lock:
+            self._file_for(key).write_bytes(content)
+
+    def load(self, key: str) -> bytes:
+        """
+        Load a recorded response.
+
+        :param key: The key of the request (see key_for).
+        :return: The raw content of the response.
+        """
+
+        response_file = self._file_for(key)
+        if not response_file.is_file():
+            raise RuntimeError(
+                f"No recorded response for request '{key}' in '{self.directory}'"
+            )
+        return response_file.read_bytes()
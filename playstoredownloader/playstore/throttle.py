@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+from playstoredownloader.playstore.util import Util
+
+
+def parse_rate(rate: str) -> int:
+    """
+    Parse a bandwidth limit, in bytes per second, with an optional k/M/G suffix
+    (e.g., "500k" or "2M").
+
+    :param rate: The string to be parsed.
+    :return: The number of bytes per second.
+    """
+
+    try:
+        bytes_per_second = Util.parse_size(rate)
+    except ValueError:
+        bytes_per_second = 0
+    if bytes_per_second <= 0:
+        raise ValueError(f"Invalid bandwidth limit '{rate}'")
+    return bytes_per_second
+
+
+class BandwidthLimiter(object):
+    """
+    Limit the number of bytes per second transferred by one or more downloads.
+
+    The limiter works as a token bucket (implemented with the equivalent "virtual
+    scheduling" algorithm): each transfer reserves the time needed to transfer its
+    bytes at the configured rate, and waits until that time has come. The reservations
+    are served in the order they are requested, so concurrent transfers sharing the
+    same limiter (reserving the same amount of bytes each time) get a fair share of the
+    bandwidth.
+    """
+
+    def __init__(self, rate: int, burst: float = 0.1):
+        """
+        BandwidthLimiter object constructor.
+
+        :param rate: The maximum number of bytes per second.
+        :param burst: How many seconds of unused bandwidth can be accumulated and
+                      used later without waiting.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def quantum(self) -> int:
+        """
+        The number of bytes to be transferred between two calls to consume: big enough
+        to keep the overhead of the limiter low, and small enough to keep the transfer
+        smooth (about 20 calls per second at the maximum rate).
+        """
+
+        return max(1024, min(64 * 1024, self.rate // 20))
+
+    def consume(self, amount: int) -> None:
+        """
+        Wait until a number of bytes can be transferred without exceeding the rate.
+
+        :param amount: The number of bytes to be transferred.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._next_time = max(self._next_time, now) + amount / self.rate
+            wait = self._next_time - now - self.burst
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RequestRateLimiter(BandwidthLimiter):
+    """
+    Limit the number of requests per second (e.g., to the Play Store API, when
+    crawling), shared by all the threads performing the requests.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        RequestRateLimiter object constructor.
+
+        :param rate: The maximum number of requests per second.
+        :param burst: How many requests can be performed without waiting after a
+                      period of inactivity.
+        """
+
+        super().__init__(rate, burst / rate)
+
+    def acquire(self) -> None:
+        """
+        Wait until a request can be performed without exceeding the rate.
+        """
+
+        self.consume(1)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+class DownloadTimings(object):
+    """
+    Breakdown of the time spent in each phase of a package download.
+
+    The phases are the requests to the Play Store API (identified by their path, e.g.,
+    "details", "delivery" or "purchase", accumulated if a request is repeated) and the
+    whole download of the files ("download", which also includes the delivery
+    requests when the delivery data was not prefetched), while for each transferred
+    file the time to first byte (from sending the request to receiving the response
+    headers, including the connection setup) and the transfer time are recorded.
+
+    The Playstore object records the timings into the DownloadTimings object that is
+    active in the current thread (see recording), if any.
+    """
+
+    def __init__(self, package_name: str = None):
+        self.package_name = package_name
+        self.phases = {}
+        self.files = []
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        """
+        Add the time spent in a phase.
+
+        :param phase: The name of the phase.
+        :param seconds: The number of seconds spent in the phase.
+        """
+
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Add the time (in seconds) spent executing a block of code as a phase.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add_file(
+        self, file_name: str, size: int, time_to_first_byte: float, transfer: float
+    ) -> None:
+        """
+        Add the timings of a transferred file.
+
+        :param file_name: The name of the file.
+        :param size: The number of bytes transferred.
+        :param time_to_first_byte: The number of seconds before receiving the response
+                                   headers, None if not known.
+        :param transfer: The number of seconds spent transferring the file content.
+        """
+
+        with self._lock:
+            self.files.append(
+                {
+                    "file": file_name,
+                    "size": size,
+                    "time_to_first_byte": time_to_first_byte,
+                    "transfer": transfer,
+                    "throughput": size / transfer if transfer > 0 else None,
+                }
+            )
+
+    @property
+    def transferred_bytes(self) -> int:
+        with self._lock:
+            return sum(file["size"] for file in self.files)
+
+    @property
+    def transfer_time(self) -> float:
+        with self._lock:
+            return sum(file["transfer"] for file in self.files)
+
+    @property
+    def throughput(self) -> float:
+        transfer_time = self.transfer_time
+        return self.transferred_bytes / transfer_time if transfer_time > 0 else None
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            phases = dict(self.phases)
+            files = [dict(file) for file in self.files]
+        return {
+            "package_name": self.package_name,
+            "phases": phases,
+            "files": files,
+            "transferred_bytes": self.transferred_bytes,
+            "transfer_time": self.transfer_time,
+            "throughput": self.throughput,
+        }
+
+    def write(self, file_path: str, **extra) -> None:
+        """
+        Append the timings to a JSON lines file (one line for each package).
+
+        :param file_path: The path of the file.
+        :param extra: Optional additional data to be saved with the timings.
+        """
+
+        line = json.dumps({**self.to_dict(), **extra, "recorded": time.time()})
+        with _write_lock:
+            with open(file_path, "a") as file:
+                file.write(line + "\n")
+
+
+def current() -> DownloadTimings:
+    """
+    Get the DownloadTimings object active in the current thread.
+
+    :return: The DownloadTimings object, or None if the timings are not recorded.
+    """
+
+    return getattr(_local, "timings", None)
+
+
+@contextmanager
+def recording(timings: DownloadTimings):
+    """
+    Record into a DownloadTimings object the timings of the operations executed by
+    the current thread in a block of code.
+    """
+
+    previous = current()
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+def record(phase: str, seconds: float) -> None:
+    """
+    Add the time spent in a phase to the DownloadTimings object active in the current
+    thread (if any).
+
+    :param phase: The name of the phase.
+    :param seconds: The number of seconds spent in the phase.
+    """
+
+    timings = current()
+    if timings is not None:
+        timings.add(phase, seconds)
@@ -2,11 +2,14 @@
 
 import itertools
 import logging
+import re
 import time
 from typing import Iterable
 
 from tqdm import tqdm
 
+from playstoredownloader.playstore import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,12 +39,28 @@ class Util(object):
                             raise
                         else:
                             logger.warning(f"{e} (retrying in {delay}s)")
+                            metrics.RETRIES.inc(operation=function.__name__)
                             time.sleep(delay)
 
             return wrapped
 
         return wrapper
 
+    @staticmethod
+    def parse_size(size: str) -> int:
+        """
+        Parse a number of bytes with an optional k/M/G suffix (e.g., "500k" or "2G").
+
+        :param size: The string to be parsed.
+        :return: The number of bytes.
+        """
+
+        units = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+        match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)b?\s*$", str(size), re.I)
+        if not match:
+            raise ValueError(f"Invalid size '{size}'")
+        return int(float(match.group(1)) * units[match.group(2).lower()])
+
     # When iterating over iterable L, use:
     # `for element in show_list_progress(L, interactive=True)`
     # to show a progress bar. When setting `interactive=False`, no progress bar will
@@ -2,7 +2,7 @@
 
 import os
 
-from playstore.playstore import Playstore
+from playstoredownloader.playstore.playstore import Playstore
 
 
 def main():
@@ -18,10 +18,11 @@ def main():
     # This list has to contain the exact developer(s) name(s).
     developer_list = ["Spotify AB", "WhatsApp LLC", "Mozilla"]
 
-    for developer in developer_list:
-        for package_name in api.list_app_by_developer(developer):
-            # Print package name and developer name.
-            print(f"{package_name}|{developer}")
+    # The developers are crawled in parallel, and the apps are printed as soon as
+    # they are found.
+    for package_name, developer in api.list_apps_by_developers(developer_list):
+        # Print package name and developer name.
+        print(f"{package_name}|{developer}", flush=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import os
+
+from playstoredownloader.crawler.discovery import PackageDiscoveryCrawler
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.throttle import RequestRateLimiter
+
+
+def main():
+    # Use the private credentials for this script (and don't send more than 5
+    # requests per second to the Google Play Store).
+    api = Playstore(
+        os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            os.path.pardir,
+            "private_credentials.json",
+        ),
+        request_limiter=RequestRateLimiter(5),
+    )
+
+    # Initial list with package names to explore.
+    seeds = ["com.whatsapp", "com.facebook.katana", "com.spotify.music"]
+
+    # Explore the apps related to the initial apps, then the apps related to them and
+    # so on. The package names found are saved in packages.jsonl as soon as they are
+    # found. If the crawl is interrupted, run the script again to resume it (the state
+    # of the crawl is saved in the package_crawler_state directory).
+    crawler = PackageDiscoveryCrawler(api, "package_crawler_state", "packages.jsonl")
+    found = crawler.crawl(seeds)
+
+    print(f"+++ Crawling completed! {found} new packages found +++")
+
+
+if __name__ == "__main__":
+    # Run the script from the main directory of the project by using this command:
+    # pipenv run python -m scripts.crawl_packages
+    main()
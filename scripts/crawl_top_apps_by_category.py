@@ -1,38 +1,37 @@
 #!/usr/bin/env python3
 
 import os
-from urllib.parse import urlparse, parse_qs
 
-from playstore.playstore import Playstore
+from playstoredownloader.crawler.categories import CategoryCrawler
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.throttle import RequestRateLimiter
 
 
 def main():
-    # Use the private credentials for this script.
+    # Use the private credentials for this script (and don't send more than 5
+    # requests per second to the Google Play Store).
     api = Playstore(
         os.path.join(
             os.path.dirname(os.path.realpath(__file__)),
             os.path.pardir,
             "private_credentials.json",
-        )
+        ),
+        request_limiter=RequestRateLimiter(5),
     )
 
-    # Get the categories in the Google Play Store.
-    res = api.protobuf_to_dict(api.get_store_categories())["category"]
-    store_categories = set(
-        map(lambda x: parse_qs(urlparse(x["dataUrl"]).query).get("cat", [None])[0], res)
+    # Get the top top_num free apps in each category (None to get the full top
+    # charts). The listings are crawled in parallel and the apps (package name,
+    # category, rank, rating etc.) are saved in top_apps.csv as soon as they are found.
+    # If the crawl is interrupted, run the script again to resume it.
+    top_num = None
+    crawler = CategoryCrawler(
+        api,
+        "top_apps.csv",
+        checkpoint_file="top_apps.checkpoint.json",
+        subcategories=["apps_topselling_free"],
+        limit=top_num,
     )
-
-    # Get the top top_num free apps in each category.
-    top_num = 10
-    for cat in store_categories:
-        if not cat:
-            continue
-        doc = api.list_app_by_category(cat, "apps_topselling_free", top_num).doc[0]
-        for app in doc.child if doc.docid else doc.child[0].child:
-            rating = app.aggregateRating.starRating
-
-            # Print package name, category and rating.
-            print(f"{app.docid}|{cat}|{rating}")
+    print(f"{crawler.crawl()} apps saved in top_apps.csv")
 
 
 if __name__ == "__main__":
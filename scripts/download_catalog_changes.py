@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+from playstoredownloader.crawler.snapshots import SnapshotStore
+from playstoredownloader.downloader.main import download_packages
+
+
+def main():
+    # The output file of the last crawl (e.g., top_apps.csv written by
+    # crawl_top_apps_by_category).
+    crawl_output = sys.argv[1] if len(sys.argv) > 1 else "top_apps.csv"
+
+    with SnapshotStore("catalog.db") as store:
+        # Save the apps found by the last crawl as a new snapshot, and compare it with
+        # the previous one.
+        new_snapshot = store.import_file(crawl_output)
+        snapshots = store.latest(2)
+        if len(snapshots) < 2:
+            print("First snapshot saved, run the script again after the next crawl")
+            return
+
+        # The changes (new apps, removed apps, new versions) are saved in
+        # changes.jsonl, then only the new apps and the new versions are downloaded.
+        to_download = store.write_changes(snapshots[0], new_snapshot, "changes.jsonl")
+
+    print(f"{len(to_download)} apps added or updated since the previous snapshot")
+    if to_download:
+        download_packages(
+            to_download,
+            False,
+            False,
+            os.path.join(
+                os.path.dirname(os.path.realpath(__file__)),
+                os.path.pardir,
+                "private_credentials.json",
+            ),
+            "Downloads",
+            None,
+            prefetch=2,
+        )
+
+
+if __name__ == "__main__":
+    # Run the script from the main directory of the project by using this command:
+    # pipenv run python -m scripts.download_catalog_changes top_apps.csv
+    main()
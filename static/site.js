@@ -110,7 +110,24 @@ jQuery(function ($) {
     };
 
     const socket = io.connect(document.location.protocol + '//' + document.location.host);
-    socket.on('download_progress', function (progress) {
+
+    // The id of the download job followed by this page.
+    let currentJobId = null;
+
+    socket.on('download_queued', function (jobId) {
+        currentJobId = jobId;
+    });
+
+    socket.on('download_progress', showProgress);
+
+    socket.on('download_progress_batch', function (progressByJob) {
+        // A batch contains the latest progress of each followed download job.
+        if (currentJobId !== null && currentJobId in progressByJob) {
+            showProgress(progressByJob[currentJobId]);
+        }
+    });
+
+    function showProgress(progress) {
         const downloadProgressContainer = $('#download-progress-container');
         if (parseFloat(downloadProgressContainer.css('opacity')) === 0) {
             downloadProgressContainer.fadeTo(500, 1);
@@ -122,7 +139,7 @@ jQuery(function ($) {
             downloadButtonItem.css('padding', '').html('<i class="fas fa-check"></i>');
             downloadProgressItem.removeClass('progress-bar-animated');
         }
-    });
+    }
 
     socket.on('download_success', function (message) {
         Swal.fire({
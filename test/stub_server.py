@@ -0,0 +1,875 @@
+#!/usr/bin/env python3
+
+"""
+A local stand-in for the Google Play Store, to test and benchmark PlaystoreDownloader
+offline and reproducibly.
+
+The server speaks the login form response and the fdfe endpoints used by the Playstore
+object (details, delivery, purchase, search, list, browse and bulkDetails) with the
+messages defined in playstore_proto_pb2, and serves synthetic apk, obb and split apk
+files (and patches between versions of the apks) with configurable size, latency,
+bandwidth and error injection (including support for range requests).
+
+Usage as a standalone server (e.g., for benchmarks):
+
+    python3 -m test.stub_server --port 8000 --apps 100 --apk-size 10000000
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import random
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+from playstoredownloader.playstore import playstore_proto_pb2 as playstore_protobuf
+from playstoredownloader.playstore.playstore import Playstore
+
+logger = logging.getLogger(__name__)
+
+COOKIE_NAME = "MarketDA"
+
+# The content of the synthetic files is this block repeated (deterministic, so the
+# hash of a file is always the same, but not trivially compressible).
+_BLOCK = b"".join(hashlib.sha256(str(index).encode()).digest() for index in range(2048))
+
+
+class StubApp(object):
+    """
+    An app known by the stand-in server.
+    """
+
+    def __init__(
+        self,
+        package_name: str,
+        version_code: int = 1,
+        apk_size: int = 1024 * 1024,
+        obb_sizes=(),
+        split_sizes=None,
+        category: str = "TOOLS",
+        creator: str = "Stub Developer",
+        title: str = None,
+        offer_type: int = 1,
+        related=(),
+        patch_bases=None,
+        previous_versions=None,
+    ):
+        """
+        StubApp object constructor.
+
+        :param package_name: The package name of the app.
+        :param version_code: The version code of the app.
+        :param apk_size: The size (in bytes) of the apk file.
+        :param obb_sizes: The sizes of the additional .obb files (the first one is the
+                          main expansion file, the second one is the patch file).
+        :param split_sizes: Optional dictionary with the sizes of the split apks (by
+                            split name).
+        :param category: The category of the app.
+        :param creator: The name of the developer of the app.
+        :param title: The title of the app (by default, the package name).
+        :param offer_type: The offer type of the app.
+        :param related: The package names of the related apps (linked in the details
+                        of the app).
+        :param patch_bases: Optional dictionary with the apk sizes of the previous
+                            versions of the app (by version code) from which a patch
+                            to the current version is offered.
+        :param previous_versions: Optional dictionary with the apk sizes of the
+                                  previous versions of the app (by version code) that
+                                  can still be downloaded.
+        """
+
+        self.package_name = package_name
+        self.version_code = version_code
+        self.apk_size = apk_size
+        self.obb_sizes = list(obb_sizes)
+        self.split_sizes = dict(split_sizes or {})
+        self.category = category
+        self.creator = creator
+        self.title = title or package_name
+        self.offer_type = offer_type
+        self.related = list(related)
+        self.patch_bases = dict(patch_bases or {})
+        self.previous_versions = dict(previous_versions or {})
+
+    def has_version(self, version_code: int) -> bool:
+        return (
+            version_code == self.version_code or version_code in self.previous_versions
+        )
+
+    def apk_size_for(self, version_code: int) -> int:
+        if version_code == self.version_code:
+            return self.apk_size
+        return self.previous_versions[version_code]
+
+    def file_size(self, kind: str, name: str) -> int:
+        if kind == "apk":
+            return self.apk_size
+        if kind == "obb":
+            return self.obb_sizes[int(name)]
+        if kind == "split":
+            return self.split_sizes[name]
+        if kind == "patch":
+            return len(self.patch(int(name)))
+        raise KeyError(kind)
+
+    def file_chunks(self, kind: str, name: str, start: int, end: int):
+        """
+        Generate the content of a file of this app.
+
+        :param kind: The kind of file ("apk", "obb", "split" or "patch").
+        :param name: The index of the obb file, the name of the split apk or the base
+                     version code of the patch.
+        :param start: The offset of the first byte to generate.
+        :param end: The offset after the last byte to generate.
+        :return: A generator of chunks of bytes.
+        """
+
+        if kind == "patch":
+            yield self.patch(int(name))[start:end]
+        else:
+            yield from file_content(end, start)
+
+    def patch(self, base_version_code: int) -> bytes:
+        """
+        Get the (gzipped GDIFF) patch from a previous version of the apk to the
+        current one.
+
+        :param base_version_code: The version code of the previous version.
+        :return: The content of the patch.
+        """
+
+        # The synthetic files differ only in their size, so the new version is the
+        # common part of the previous version followed by the additional data (if
+        # any).
+        common = min(self.patch_bases[base_version_code], self.apk_size)
+        data = b"".join(file_content(self.apk_size, common))
+        gdiff = b"\xd1\xff\xd1\xff\x04"
+        if common:
+            gdiff += struct.pack(">Bqi", 255, 0, common)
+        if data:
+            gdiff += struct.pack(">Bi", 248, len(data)) + data
+        return gzip.compress(gdiff + b"\x00", mtime=0)
+
+    def file_sha256(self, kind: str, name: str = "base") -> str:
+        """
+        Get the SHA-256 hash of a synthetic file of this app.
+
+        :param kind: The kind of file ("apk", "obb" or "split").
+        :param name: The index of the obb file or the name of the split apk.
+        :return: The SHA-256 hash (hex string) of the file.
+        """
+
+        file_hash = hashlib.sha256()
+        for chunk in file_content(self.file_size(kind, name)):
+            file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+
+def file_content(size: int, start: int = 0, chunk_size: int = 64 * 1024):
+    """
+    Generate the content of a synthetic file.
+
+    :param size: The size of the whole file.
+    :param start: The offset of the first byte to generate.
+    :param chunk_size: The maximum size of each generated chunk.
+    :return: A generator of chunks of bytes, from start to the end of the file.
+    """
+
+    position = start
+    while position < size:
+        offset = position % len(_BLOCK)
+        length = min(chunk_size, size - position, len(_BLOCK) - offset)
+        yield _BLOCK[offset : offset + length]
+        position += length
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    The stand-in Play Store server. All the attributes controlling the behavior of
+    the server (latency, bandwidth, error injection) can be changed while the server
+    is running.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        apps=(),
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        file_latency: float = 0.0,
+        bandwidth: int = None,
+        error_rate: float = 0.0,
+        truncate_rate: float = 0.0,
+        seed: int = None,
+        compress_responses: bool = True,
+    ):
+        """
+        StubServer object constructor.
+
+        :param apps: The StubApp objects known by the server.
+        :param host: The address where to listen.
+        :param port: The port where to listen (0 to use a free port).
+        :param latency: The number of seconds to wait before answering an API request.
+        :param file_latency: The number of seconds to wait before answering a file
+                             request.
+        :param bandwidth: The maximum number of bytes per second sent for each file
+                          (None for no limit).
+        :param error_rate: The probability that a file request fails with HTTP 500.
+        :param truncate_rate: The probability that a file transfer is interrupted.
+        :param seed: Optional seed of the random error injection.
+        :param compress_responses: Flag indicating whether to compress (with gzip) the
+                                   API responses when the client accepts it.
+        """
+
+        super().__init__((host, port), StubRequestHandler)
+
+        self.apps = {app.package_name: app for app in apps}
+        self.latency = latency
+        self.file_latency = file_latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.compress_responses = compress_responses
+        self.login_ok = True
+        self.cookie_value = "stub-cookie"
+        self.owned = set()
+
+        self.requests = []
+        self._failures = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self) -> str:
+        return f"{self.url}/auth"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/fdfe/"
+
+    def add_app(self, app: StubApp) -> None:
+        self.apps[app.package_name] = app
+
+    def fail_next(self, path: str, status: int = 500, count: int = 1) -> None:
+        """
+        Make the next requests to a path fail.
+
+        :param path: The path (or the beginning of the path) of the request (e.g.,
+                     "/fdfe/details", "/files" or "/files/<package>/<version>/obb").
+        :param status: The HTTP status code of the failed responses.
+        :param count: How many requests should fail.
+        """
+
+        with self._lock:
+            self._failures[path] = (status, count)
+
+    def _injected_failure(self, path: str, rate: float = 0.0):
+        with self._lock:
+            for prefix, (status, count) in list(self._failures.items()):
+                if path.startswith(prefix):
+                    if count <= 1:
+                        del self._failures[prefix]
+                    else:
+                        self._failures[prefix] = (status, count - 1)
+                    return status
+            if rate and self._random.random() < rate:
+                return 500
+        return None
+
+    def _random_event(self, rate: float) -> bool:
+        with self._lock:
+            return bool(rate) and self._random.random() < rate
+
+    def log_request_path(self, method: str, path: str) -> None:
+        with self._lock:
+            self.requests.append((method, path))
+
+    def request_count(self, path: str = None) -> int:
+        """
+        Count the requests received by the server.
+
+        :param path: Optional path (e.g., "/fdfe/delivery") to count only the requests
+                     to that path.
+        :return: The number of requests received.
+        """
+
+        with self._lock:
+            return sum(
+                1
+                for _, request_path in self.requests
+                if path is None or request_path == path
+            )
+
+    def start(self) -> "StubServer":
+        """
+        Start serving the requests in a background thread.
+        """
+
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="stub-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    @contextmanager
+    def patch_playstore(self):
+        """
+        Make the Playstore objects created in this block use this server.
+        """
+
+        login_url, api_url = Playstore.LOGIN_URL, Playstore.API_URL
+        Playstore.LOGIN_URL, Playstore.API_URL = self.login_url, self.api_url
+        try:
+            yield self
+        finally:
+            Playstore.LOGIN_URL, Playstore.API_URL = login_url, api_url
+
+    ####################
+    # Protobuf answers #
+    ####################
+
+    def file_url(
+        self, app: StubApp, kind: str, name: str = "base", version_code: int = None
+    ) -> str:
+        return (
+            f"{self.url}/files/{quote(app.package_name)}/"
+            f"{version_code or app.version_code}/{kind}/{quote(name)}"
+        )
+
+    def doc_for(self, app: StubApp) -> playstore_protobuf.DocV2:
+        doc = playstore_protobuf.DocV2()
+        doc.docid = app.package_name
+        doc.backendDocid = app.package_name
+        doc.docType = 1
+        doc.backendId = 3
+        doc.title = app.title
+        doc.creator = app.creator
+        doc.offer.add(offerType=app.offer_type, micros=0, currencyCode="USD")
+        details = doc.details.appDetails
+        details.developerName = app.creator
+        details.versionCode = app.version_code
+        details.versionString = f"1.0.{app.version_code}"
+        details.title = app.title
+        details.appCategory.append(app.category)
+        details.installationSize = app.apk_size
+        details.packageName = app.package_name
+        return doc
+
+    def delivery_data_for(
+        self,
+        app: StubApp,
+        base_version_code: int = None,
+        patch_formats=(),
+        version_code: int = None,
+    ) -> object:
+        delivery_data = playstore_protobuf.AndroidAppDeliveryData()
+        if version_code not in (None, app.version_code):
+            # A previous version of the app: only its apk is still available.
+            size = app.apk_size_for(version_code)
+            apk_hash = hashlib.sha256()
+            for chunk in file_content(size):
+                apk_hash.update(chunk)
+            delivery_data.downloadSize = size
+            delivery_data.downloadUrl = self.file_url(
+                app, "apk", version_code=version_code
+            )
+            delivery_data.sha256 = apk_hash.hexdigest()
+            delivery_data.downloadAuthCookie.add(
+                name=COOKIE_NAME, value=self.cookie_value
+            )
+            return delivery_data
+
+        delivery_data.downloadSize = app.apk_size
+        delivery_data.downloadUrl = self.file_url(app, "apk")
+        delivery_data.sha256 = app.file_sha256("apk")
+        delivery_data.downloadAuthCookie.add(name=COOKIE_NAME, value=self.cookie_value)
+        for index, size in enumerate(app.obb_sizes):
+            delivery_data.additionalFile.add(
+                fileType=index,
+                versionCode=app.version_code,
+                size=size,
+                downloadUrl=self.file_url(app, "obb", str(index)),
+            )
+        for name, size in app.split_sizes.items():
+            delivery_data.split.add(
+                name=name, size=size, downloadUrl=self.file_url(app, "split", name)
+            )
+        # The patches are offered only in the gzipped GDIFF format.
+        if base_version_code in app.patch_bases and 2 in patch_formats:
+            base_sha1 = hashlib.sha1()
+            for chunk in file_content(app.patch_bases[base_version_code]):
+                base_sha1.update(chunk)
+            patch_data = delivery_data.patchData
+            patch_data.baseVersionCode = base_version_code
+            patch_data.baseSha1 = base_sha1.hexdigest()
+            patch_data.downloadUrl = self.file_url(app, "patch", str(base_version_code))
+            patch_data.patchFormat = 2
+            patch_data.maxPatchSize = app.file_size("patch", str(base_version_code))
+        return delivery_data
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    server: StubServer
+
+    def log_message(self, format_string, *args):
+        logger.debug(format_string, *args)
+
+    #########
+    # Utils #
+    #########
+
+    def _query(self) -> dict:
+        query = parse_qs(urlparse(self.path).query)
+        return {key: unquote(values[-1]) for key, values in query.items()}
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(
+        self, status: int, body: bytes, content_type: str, content_encoding=None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_message(self, message, status: int = 200) -> None:
+        body = message.SerializeToString()
+        if self.server.compress_responses and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        ):
+            self._send(status, gzip.compress(body), "application/x-protobuf", "gzip")
+        else:
+            self._send(status, body, "application/x-protobuf")
+
+    def _send_error_message(self, status: int, message: str) -> None:
+        response = playstore_protobuf.ResponseWrapper()
+        response.commands.displayErrorMessage = message
+        self._send_message(response, status)
+
+    def _app(self, package_name: str) -> StubApp:
+        return self.server.apps.get(package_name)
+
+    ############
+    # Dispatch #
+    ############
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        path = urlparse(self.path).path
+        self.server.log_request_path(method, path)
+
+        if path.startswith("/files/"):
+            self._handle_file(path)
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # Read the body (if any) even when failing, to keep the connection usable.
+        body = self._body() if method == "POST" else b""
+
+        status = self.server._injected_failure(path)
+        if status:
+            self._send_error_message(status, "Injected error")
+            return
+
+        handlers = {
+            "/auth": self._handle_login,
+            "/fdfe/details": self._handle_details,
+            "/fdfe/delivery": self._handle_delivery,
+            "/fdfe/purchase": self._handle_purchase,
+            "/fdfe/search": self._handle_search,
+            "/fdfe/list": self._handle_list,
+            "/fdfe/browse": self._handle_browse,
+            "/fdfe/bulkDetails": self._handle_bulk_details,
+        }
+        handler = handlers.get(path)
+        if handler is None:
+            self._send_error_message(404, "Not found")
+        else:
+            handler(body)
+
+    #############
+    # Endpoints #
+    #############
+
+    def _handle_login(self, body: bytes) -> None:
+        if self.server.login_ok:
+            text = "SID=stub-sid\nLSID=stub-lsid\nAuth=stub-auth-token\n"
+            self._send(200, text.encode(), "text/plain")
+        else:
+            self._send(403, b"Error=BadAuthentication\n", "text/plain")
+
+    def _handle_details(self, _) -> None:
+        app = self._app(self._query().get("doc"))
+        if app is None:
+            self._send_error_message(404, "Item not found.")
+            return
+
+        response = playstore_protobuf.ResponseWrapper()
+        doc = response.payload.detailsResponse.docV2
+        doc.CopyFrom(self.server.doc_for(app))
+        for package_name in app.related:
+            doc.relatedLinks.relatedLinks.add(
+                label="Similar apps",
+                url1=f"details?{urlencode({'doc': package_name})}",
+            )
+        # The other apps of the developer, as a listing.
+        doc.relatedLinks.youMightAlsoLike.label = f"More by {app.creator}"
+        doc.relatedLinks.youMightAlsoLike.url1 = (
+            f"search?{urlencode({'c': 3, 'q': f'pub:{app.creator}'})}"
+        )
+        self._send_message(response)
+
+    def _handle_delivery(self, _) -> None:
+        query = self._query()
+        app = self._app(query.get("doc"))
+        version_code = int(query["vc"]) if "vc" in query else None
+        if app is None or not app.has_version(version_code or app.version_code):
+            self._send_error_message(404, "Item not found.")
+            return
+
+        response = playstore_protobuf.ResponseWrapper()
+        delivery_response = response.payload.deliveryResponse
+        if app.package_name in self.server.owned or "dtok" in query:
+            patch_formats = parse_qs(urlparse(self.path).query).get("pf", [])
+            delivery_response.appDeliveryData.CopyFrom(
+                self.server.delivery_data_for(
+                    app,
+                    int(query["bvc"]) if "bvc" in query else None,
+                    [int(patch_format) for patch_format in patch_formats],
+                    version_code,
+                )
+            )
+        else:
+            # The app doesn't belong to the account: empty delivery data.
+            delivery_response.SetInParent()
+        self._send_message(response)
+
+    def _handle_purchase(self, body: bytes) -> None:
+        form = {key: values[-1] for key, values in parse_qs(body.decode()).items()}
+        app = self._app(form.get("doc"))
+        version_code = int(form["vc"]) if "vc" in form else None
+        if app is None or not app.has_version(version_code or app.version_code):
+            self._send_error_message(404, "Item not found.")
+            return
+
+        with self.server._lock:
+            self.server.owned.add(app.package_name)
+
+        response = playstore_protobuf.ResponseWrapper()
+        buy_response = response.payload.buyResponse
+        buy_response.purchaseStatusResponse.appDeliveryData.CopyFrom(
+            self.server.delivery_data_for(app, version_code=version_code)
+        )
+        buy_response.downloadToken = "stub-download-token"
+        self._send_message(response)
+
+    def _container(self, doc_id: str, apps: list, next_page_path: str):
+        # A page of results (with the url of the next page, if any).
+        query = self._query()
+        offset = int(query.get("o", 0))
+        count = int(query.get("n", 20))
+        page = apps[offset : offset + count]
+
+        container = playstore_protobuf.DocV2()
+        container.docid = doc_id
+        for app in page:
+            container.child.add().CopyFrom(self.server.doc_for(app))
+        if offset + count < len(apps):
+            next_query = {**query, "o": offset + count, "n": count}
+            container.containerMetadata.nextPageUrl = (
+                f"{next_page_path}?{urlencode(next_query)}"
+            )
+        return container
+
+    def _handle_search(self, _) -> None:
+        text = self._query().get("q", "").lower()
+        match = re.match(r'pub:"?([^"]*)"?$', text)
+        apps = [
+            app
+            for app in self.server.apps.values()
+            if (match and app.creator.lower() == match.group(1))
+            or (
+                not match
+                and (text in app.package_name.lower() or text in app.title.lower())
+            )
+        ]
+
+        response = playstore_protobuf.ResponseWrapper()
+        search_response = response.payload.searchResponse
+        search_response.originalQuery = text
+        search_response.suggestedQuery = text
+        if apps:
+            search_response.doc.add().CopyFrom(
+                self._container("search", apps, "search")
+            )
+        self._send_message(response)
+
+    def _handle_list(self, _) -> None:
+        query = self._query()
+        category = query.get("cat")
+        apps = [app for app in self.server.apps.values() if app.category == category]
+
+        response = playstore_protobuf.ResponseWrapper()
+        if "ctr" in query:
+            response.payload.listResponse.doc.add().CopyFrom(
+                self._container(query["ctr"], apps, "list")
+            )
+        else:
+            # The available subcategories.
+            response.payload.listResponse.SetInParent()
+            for subcategory in ("apps_topselling_free", "apps_topselling_paid"):
+                pre_fetch = response.preFetch.add()
+                pre_fetch.url = f"list?c=3&cat={category}&ctr={subcategory}"
+                pre_fetch.response.payload.listResponse.doc.add(docid=subcategory)
+        self._send_message(response)
+
+    def _handle_browse(self, _) -> None:
+        response = playstore_protobuf.ResponseWrapper()
+        browse_response = response.payload.browseResponse
+        browse_response.contentsUrl = "browse?c=3"
+        for category in sorted({app.category for app in self.server.apps.values()}):
+            browse_response.category.add(
+                name=category.title(), dataUrl=f"browse?c=3&cat={category}"
+            )
+        self._send_message(response)
+
+    def _handle_bulk_details(self, body: bytes) -> None:
+        request = playstore_protobuf.BulkDetailsRequest.FromString(body)
+        response = playstore_protobuf.ResponseWrapper()
+        bulk_response = response.payload.bulkDetailsResponse
+        bulk_response.SetInParent()
+        for docid in request.docid:
+            entry = bulk_response.entry.add()
+            app = self._app(docid)
+            if app is not None:
+                entry.doc.CopyFrom(self.server.doc_for(app))
+        self._send_message(response)
+
+    #########
+    # Files #
+    #########
+
+    def _handle_file(self, path: str) -> None:
+        if self.server.file_latency:
+            time.sleep(self.server.file_latency)
+
+        status = self.server._injected_failure(path, self.server.error_rate)
+        if status:
+            self._send(status, b"Injected error", "text/plain")
+            return
+
+        try:
+            _, _, package_name, version_code, kind, name = path.split("/")
+            app = self._app(unquote(package_name))
+            if kind == "apk":
+                # The apks of the previous versions can still be downloaded.
+                size = app.apk_size_for(int(version_code))
+            else:
+                size = app.file_size(kind, unquote(name))
+                if int(version_code) != app.version_code:
+                    raise KeyError(version_code)
+        except (AttributeError, KeyError, IndexError, ValueError):
+            self._send(404, b"Not found", "text/plain")
+            return
+
+        if f"{COOKIE_NAME}={self.server.cookie_value}" not in self.headers.get(
+            "Cookie", ""
+        ):
+            self._send(403, b"Forbidden", "text/plain")
+            return
+
+        start, end = 0, size - 1
+        range_match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+        if range_match and size:
+            if range_match.group(1):
+                start = int(range_match.group(1))
+                if range_match.group(2):
+                    end = min(int(range_match.group(2)), size - 1)
+            elif range_match.group(2):
+                start = max(size - int(range_match.group(2)), 0)
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+
+        length = end - start + 1
+        self.send_header("Content-Type", "application/vnd.android.package-archive")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        # The transfer can be interrupted after sending half of the content.
+        limit = (
+            length // 2
+            if self.server._random_event(self.server.truncate_rate)
+            else length
+        )
+
+        sent = 0
+        start_time = time.monotonic()
+        for chunk in app.file_chunks(kind, unquote(name), start, end + 1):
+            chunk = chunk[: limit - sent]
+            if not chunk:
+                break
+            try:
+                self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+                return
+            sent += len(chunk)
+            if self.server.bandwidth:
+                delay = start_time + sent / self.server.bandwidth - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+        if sent < length:
+            self.close_connection = True
+
+
+def write_credentials(file_path: str) -> str:
+    """
+    Write a configuration file with (fake) credentials accepted by the stand-in server.
+
+    :param file_path: The path of the configuration file.
+    :return: The path of the configuration file.
+    """
+
+    with open(file_path, "w") as file:
+        json.dump(
+            [
+                {
+                    "USERNAME": "stub.account@example.com",
+                    "PASSWORD": "stub-password",
+                    "ANDROID_ID": "0123456789abcdef",
+                    "LANG_CODE": "en_US",
+                    "LANG": "us",
+                }
+            ],
+            file,
+        )
+    return file_path
+
+
+def synthetic_apps(
+    count: int,
+    apk_size: int = 1024 * 1024,
+    obb_size: int = 0,
+    split_size: int = 0,
+    prefix: str = "com.stub.app",
+) -> list:
+    """
+    Create a list of synthetic apps.
+
+    :param count: The number of apps.
+    :param apk_size: The size of the apk file of each app.
+    :param obb_size: The size of the main .obb file of each app (0 for no .obb file).
+    :param split_size: The size of the split apk of each app (0 for no split apk).
+    :param prefix: The prefix of the package names of the apps.
+    :return: A list of StubApp objects.
+    """
+
+    return [
+        StubApp(
+            f"{prefix}{index}",
+            apk_size=apk_size,
+            obb_sizes=[obb_size] if obb_size else [],
+            split_sizes={"config.en": split_size} if split_size else {},
+        )
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python3 -m test.stub_server",
+        description="Run a local stand-in for the Google Play Store.",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--apps", type=int, default=10, help="Number of apps")
+    parser.add_argument("--apk-size", type=int, default=1024 * 1024)
+    parser.add_argument("--obb-size", type=int, default=0)
+    parser.add_argument("--split-size", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--file-latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=None, help="Bytes/second")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--no-compression",
+        action="store_true",
+        help="Never compress the API responses",
+    )
+    args = parser.parse_args()
+
+    server = StubServer(
+        synthetic_apps(args.apps, args.apk_size, args.obb_size, args.split_size),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        file_latency=args.file_latency,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        truncate_rate=args.truncate_rate,
+        seed=args.seed,
+        compress_responses=not args.no_compression,
+    )
+    print(f"Login url: {server.login_url}")
+    print(f"API url: {server.api_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import playstoredownloader.playstore.cache as cache_module
+from playstoredownloader.playstore import playstore_proto_pb2 as playstore_protobuf
+from playstoredownloader.playstore.cache import DeliveryCache
+
+CACHE_KEY = ("com.example.app", 1, 1, None)
+
+
+@pytest.fixture(scope="function")
+def delivery_data():
+    data = playstore_protobuf.AndroidAppDeliveryData()
+    data.downloadUrl = "https://example.com/app.apk"
+    data.downloadSize = 1024
+    return data
+
+
+@pytest.fixture(scope="function")
+def clock(monkeypatch):
+    # Fake monotonic clock that can be moved forward manually.
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+# noinspection PyShadowingNames
+class TestDeliveryCache(object):
+    def test_cache_hit(self, delivery_data):
+        cache = DeliveryCache()
+        cache.put(CACHE_KEY, delivery_data)
+        assert CACHE_KEY in cache
+        assert cache.get(CACHE_KEY).downloadUrl == delivery_data.downloadUrl
+
+    def test_cache_returns_copy(self, delivery_data):
+        cache = DeliveryCache()
+        cache.put(CACHE_KEY, delivery_data)
+        cache.get(CACHE_KEY).downloadUrl = "modified"
+        assert cache.get(CACHE_KEY).downloadUrl == delivery_data.downloadUrl
+
+    def test_cache_miss(self):
+        cache = DeliveryCache()
+        assert CACHE_KEY not in cache
+        assert cache.get(CACHE_KEY) is None
+
+    def test_cache_expiration(self, delivery_data, clock):
+        cache = DeliveryCache(ttl=10)
+        cache.put(CACHE_KEY, delivery_data)
+        clock[0] += 5
+        assert cache.get(CACHE_KEY) is not None
+        clock[0] += 5
+        assert cache.get(CACHE_KEY) is None
+
+    def test_cache_invalidation(self, delivery_data):
+        cache = DeliveryCache()
+        cache.put(CACHE_KEY, delivery_data)
+        cache.invalidate(CACHE_KEY)
+        assert cache.get(CACHE_KEY) is None
+
+    def test_cache_disabled(self, delivery_data):
+        cache = DeliveryCache(ttl=0)
+        cache.put(CACHE_KEY, delivery_data)
+        assert cache.get(CACHE_KEY) is None
+
+    def test_cache_ignores_missing_download_url(self):
+        cache = DeliveryCache()
+        cache.put(CACHE_KEY, playstore_protobuf.AndroidAppDeliveryData())
+        assert cache.get(CACHE_KEY) is None
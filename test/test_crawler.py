@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+
+import pytest
+
+from playstoredownloader.crawler.bloom import BloomFilter
+from playstoredownloader.crawler.categories import CategoryCrawler
+from playstoredownloader.crawler.discovery import PackageDiscoveryCrawler
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.throttle import RequestRateLimiter
+from test.stub_server import StubApp, StubServer, write_credentials
+
+GAMES = [StubApp(f"com.stub.game{i}", category="GAME") for i in range(7)]
+TOOLS = [StubApp(f"com.stub.tool{i}", category="TOOLS") for i in range(5)]
+# A chain of related apps (each app is related to the next one), and another
+# developer whose apps are found through the "more by" listing.
+CHAIN = [
+    StubApp(
+        f"com.stub.chain{i}",
+        creator="Chain Developer" if i != 3 else "Other Developer",
+        related=[f"com.stub.chain{i + 1}"] if i < 5 else [],
+    )
+    for i in range(6)
+]
+OTHERS = [StubApp(f"com.stub.other{i}", creator="Other Developer") for i in range(3)]
+
+
+@pytest.fixture(scope="function")
+def apps():
+    return GAMES + TOOLS
+
+
+# noinspection PyShadowingNames
+@pytest.fixture(scope="function")
+def api(apps, monkeypatch, tmp_path):
+    with StubServer(apps) as server:
+        monkeypatch.setattr(Playstore, "LOGIN_URL", server.login_url)
+        monkeypatch.setattr(Playstore, "API_URL", server.api_url)
+        playstore = Playstore(
+            write_credentials(str(tmp_path / "credentials.json")),
+            request_limiter=RequestRateLimiter(1000),
+        )
+        playstore.server = server
+        yield playstore
+
+
+def read_jsonl(path) -> list:
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+# noinspection PyShadowingNames
+class TestCategoryCrawler(object):
+    def test_crawl_all_listings(self, api, tmp_path):
+        output_file = tmp_path / "apps.jsonl"
+        crawler = CategoryCrawler(api, output_file, max_workers=3)
+
+        assert crawler.categories() == ["GAME", "TOOLS"]
+        # Two subcategories (top free and top paid) for each category.
+        assert crawler.crawl() == 2 * (len(GAMES) + len(TOOLS))
+
+        records = read_jsonl(output_file)
+        games = [
+            record["package"]
+            for record in sorted(records, key=lambda record: record["rank"])
+            if record["category"] == "GAME"
+            and record["subcategory"] == "apps_topselling_free"
+        ]
+        assert games == [app.package_name for app in GAMES]
+
+    def test_crawl_csv_with_limit(self, api, tmp_path):
+        output_file = tmp_path / "apps.csv"
+        crawler = CategoryCrawler(
+            api, output_file, subcategories=["apps_topselling_free"], limit=3
+        )
+
+        assert crawler.crawl(["GAME"]) == 3
+        with open(output_file, newline="") as file:
+            rows = list(csv.DictReader(file))
+        assert [row["package"] for row in rows] == [
+            app.package_name for app in GAMES[:3]
+        ]
+        assert rows[0]["rank"] == "1"
+
+    def test_resume(self, api, tmp_path):
+        output_file = tmp_path / "apps.csv"
+        checkpoint_file = tmp_path / "checkpoint.json"
+
+        def crawler():
+            return CategoryCrawler(
+                api,
+                output_file,
+                checkpoint_file=checkpoint_file,
+                subcategories=["apps_topselling_free"],
+                page_size=4,
+                max_workers=1,
+                checkpoint_interval=2,
+            )
+
+        # The second page of the games fails: the first page is saved, and the
+        # listing is resumed by the next crawl.
+        original_fetch_page = api._fetch_page
+
+        def fetch_page(page, description):
+            if "GAME" in description and "o=" in page[0]:
+                raise RuntimeError("Injected error")
+            return original_fetch_page(page, description)
+
+        api._fetch_page = fetch_page
+        assert crawler().crawl() == 4 + len(TOOLS)
+        checkpoint = json.loads(checkpoint_file.read_text())
+        assert checkpoint["progress"] == {
+            "GAME/apps_topselling_free": 4,
+            "TOOLS/apps_topselling_free": None,
+        }
+
+        api._fetch_page = original_fetch_page
+        list_requests = api.server.request_count("/fdfe/list")
+        assert crawler().crawl() == len(GAMES) - 4
+        # Only the games were listed again.
+        assert api.server.request_count("/fdfe/list") == list_requests + 2
+
+        with open(output_file, newline="") as file:
+            rows = list(csv.DictReader(file))
+        assert sorted(row["package"] for row in rows) == sorted(
+            app.package_name for app in GAMES + TOOLS
+        )
+
+        # Everything was crawled already.
+        assert crawler().crawl() == 0
+
+
+class TestBloomFilter(object):
+    def test_add_and_contains(self, tmp_path):
+        bloom_filter = BloomFilter(1000, error_rate=0.01)
+        # Rarely, a new string is a false positive.
+        assert sum(bloom_filter.add(f"com.package{i}") for i in range(1000)) > 990
+        assert bloom_filter.add("com.package0") is False
+        assert all(f"com.package{i}" in bloom_filter for i in range(1000))
+        false_positives = sum(f"org.other{i}" in bloom_filter for i in range(10000))
+        assert false_positives < 300
+
+        bloom_filter.save(tmp_path / "seen.bloom")
+        loaded = BloomFilter.load(tmp_path / "seen.bloom")
+        assert len(loaded) == len(bloom_filter)
+        assert "com.package999" in loaded
+        assert "org.other" not in loaded
+
+
+# noinspection PyShadowingNames
+class TestPackageDiscoveryCrawler(object):
+    @pytest.fixture(scope="function")
+    def apps(self):
+        return CHAIN + OTHERS
+
+    def test_crawl(self, api, tmp_path):
+        crawler = PackageDiscoveryCrawler(
+            api, tmp_path / "state", tmp_path / "packages.jsonl", max_workers=2
+        )
+        assert crawler.crawl(["com.stub.chain0"]) == len(CHAIN) + len(OTHERS)
+
+        records = {
+            record["package"]: record
+            for record in read_jsonl(tmp_path / "packages.jsonl")
+        }
+        assert set(records) == {app.package_name for app in CHAIN + OTHERS}
+        assert records["com.stub.chain0"]["depth"] == 0
+        assert records["com.stub.chain1"]["found_from"] == "com.stub.chain0"
+
+        # Nothing new to find when crawling again.
+        assert crawler.crawl(["com.stub.chain0"]) == 0
+
+    def test_resume(self, api, tmp_path):
+        def crawler():
+            return PackageDiscoveryCrawler(
+                api,
+                tmp_path / "state",
+                tmp_path / "packages.csv",
+                max_workers=1,
+                expected_packages=1000,
+                checkpoint_interval=1,
+            )
+
+        assert crawler().crawl(["com.stub.chain0"], max_packages=3) == 3
+        assert crawler().crawl(max_depth=1) > 0
+        assert crawler().crawl() > 0
+
+        with open(tmp_path / "packages.csv", newline="") as file:
+            packages = [row["package"] for row in csv.DictReader(file)]
+        assert sorted(packages) == sorted(app.package_name for app in CHAIN + OTHERS)
+        assert list((tmp_path / "state").glob("*-1.*")) == []
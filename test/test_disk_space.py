@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import shutil
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from playstoredownloader.downloader import disk_space as disk_space_module
+from playstoredownloader.downloader.disk_space import (
+    DiskSpace,
+    InsufficientDiskSpaceError,
+)
+from playstoredownloader.downloader.downloader import DownloadResult
+from playstoredownloader.downloader.multi_downloader import MultiDownloader
+from playstoredownloader.playstore import allocation
+
+Usage = namedtuple("Usage", ["total", "used", "free"])
+
+
+class FakeDisk(object):
+    def __init__(self, free):
+        self.free = free
+
+    def disk_usage(self, _):
+        return Usage(10 * self.free, 0, self.free)
+
+
+class FakeDownloader(object):
+    def __init__(self, disk, sizes, disk_space=None):
+        self.disk = disk
+        self.sizes = sizes
+        self.disk_space = disk_space
+        self.downloaded = []
+        self.reserved_during_download = []
+
+    def prepare(self, package_name, version_code=None):
+        return package_name
+
+    def expected_size(self, meta):
+        return self.sizes[meta]
+
+    def download_prepared(self, meta):
+        if self.disk_space is not None:
+            self.reserved_during_download.append(self.disk_space.reserved)
+        self.downloaded.append(meta)
+        self.disk.free -= self.sizes[meta]
+        return DownloadResult(True)
+
+
+class CountingDiskSpace(DiskSpace):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reservations = 0
+        self.reservations_lock = threading.Lock()
+
+    def reserve(self, size: int, description: str = "the download") -> None:
+        try:
+            super().reserve(size, description)
+        finally:
+            with self.reservations_lock:
+                self.reservations += 1
+
+
+class PreallocatingDownloader(FakeDownloader):
+    def __init__(self, disk, sizes, disk_space, prefetch):
+        super().__init__(disk, sizes, disk_space)
+        self.prefetch = prefetch
+
+    def download_prepared(self, meta):
+        # The files are preallocated when the download starts.
+        self.disk.free -= self.sizes[meta]
+        allocation.allocated(self.sizes[meta])
+        self.downloaded.append(meta)
+
+        # The next packages are prepared while this package is being downloaded.
+        expected = min(len(self.downloaded) + self.prefetch, len(self.sizes))
+        deadline = time.monotonic() + 5
+        while self.disk_space.reservations < expected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return DownloadResult(True)
+
+
+@pytest.fixture(scope="function")
+def disk(monkeypatch):
+    fake_disk = FakeDisk(free=1000)
+    monkeypatch.setattr(shutil, "disk_usage", fake_disk.disk_usage)
+    return fake_disk
+
+
+# noinspection PyShadowingNames
+class TestDiskSpace(object):
+    def test_reserve(self, disk):
+        disk_space = DiskSpace("/downloads", min_free=100)
+        disk_space.reserve(600)
+        assert disk_space.free() == 300
+        with pytest.raises(InsufficientDiskSpaceError):
+            disk_space.reserve(400)
+
+        disk_space.release(600)
+        disk_space.reserve(900)
+
+    def test_wait_for_space(self, disk, monkeypatch):
+        def free_space(_):
+            disk.free = 5000
+
+        monkeypatch.setattr(disk_space_module.time, "sleep", free_space)
+        disk_space = DiskSpace("/downloads", wait=True)
+        disk_space.reserve(2000)
+        assert disk_space.reserved == 2000
+
+    def test_batch_stops_when_disk_is_full(self, disk):
+        downloader = FakeDownloader(disk, {"first": 400, "second": 400, "third": 400})
+        with pytest.raises(InsufficientDiskSpaceError):
+            MultiDownloader(
+                ["first", "second", "third"],
+                downloader,
+                prefetch=0,
+                disk_space=DiskSpace("/downloads", min_free=500),
+            ).download()
+
+        # The second package was never started.
+        assert downloader.downloaded == ["first"]
+
+    def test_batch_releases_space(self, disk):
+        disk.free = 2000
+        downloader = FakeDownloader(disk, {"first": 800, "second": 800})
+        disk_space = DiskSpace("/downloads")
+        MultiDownloader(
+            ["first", "second"], downloader, prefetch=0, disk_space=disk_space
+        ).download()
+        assert downloader.downloaded == ["first", "second"]
+        assert disk_space.reserved == 0
+
+    def test_space_reserved_during_download(self, disk):
+        disk.free = 2000
+        disk_space = DiskSpace("/downloads")
+        downloader = FakeDownloader(disk, {"first": 800, "second": 600}, disk_space)
+        MultiDownloader(
+            ["first", "second"], downloader, prefetch=0, disk_space=disk_space
+        ).download()
+
+        # The files may not be preallocated, so the space of each package is released
+        # only after its download.
+        assert downloader.reserved_during_download == [800, 600]
+        assert disk_space.reserved == 0
+
+    def test_preallocated_space_not_counted_twice(self, disk):
+        disk_space = CountingDiskSpace("/downloads")
+        downloader = PreallocatingDownloader(
+            disk, {"first": 300, "second": 300, "third": 300}, disk_space, prefetch=1
+        )
+        MultiDownloader(
+            ["first", "second", "third"],
+            downloader,
+            prefetch=1,
+            disk_space=disk_space,
+        ).download()
+        assert downloader.downloaded == ["first", "second", "third"]
+        assert disk_space.reserved == 0
+        assert disk.free == 100
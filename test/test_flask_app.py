@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+import pytest
+
+import flask_app
+from playstoredownloader.downloader.jobs import JobQueue
+
+PACKAGE_NAME = "com.example.app"
+
+
+@pytest.fixture(scope="function")
+def release_download():
+    return threading.Event()
+
+
+@pytest.fixture(scope="function")
+def download_jobs(monkeypatch, release_download):
+    def download(job):
+        # Wait until the test has requested the download from all the clients.
+        release_download.wait(5)
+        job.publish("download_progress", 50)
+        job.publish("download_success", "The application was successfully downloaded")
+
+    jobs = JobQueue(download, max_workers=1)
+    monkeypatch.setattr(flask_app, "download_jobs", jobs)
+    monkeypatch.setattr(flask_app, "progress_batcher", None)
+    yield jobs
+    jobs.shutdown()
+
+
+def wait_until_done(jobs: JobQueue) -> None:
+    deadline = time.monotonic() + 5
+    while not all(job.done for job in jobs.jobs()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+# noinspection PyShadowingNames
+class TestSocket(object):
+    def test_same_download_requested_twice(self, download_jobs, release_download):
+        client = flask_app.socket.test_client(flask_app.application)
+        client.emit("start_download", PACKAGE_NAME)
+        client.emit("start_download", PACKAGE_NAME)
+        release_download.set()
+        wait_until_done(download_jobs)
+
+        events = [event["name"] for event in client.get_received()]
+        assert events.count("download_queued") == 2
+        assert events.count("download_progress") == 1
+        assert events.count("download_success") == 1
+        assert len(download_jobs.jobs()) == 1
+        client.disconnect()
+
+    def test_disconnect_unsubscribes(self, download_jobs, release_download):
+        client = flask_app.socket.test_client(flask_app.application)
+        client.emit("start_download", PACKAGE_NAME)
+        job = download_jobs.jobs()[0]
+        assert job.subscriber_count == 1
+
+        client.disconnect()
+        assert job.subscriber_count == 0
+        release_download.set()
+        wait_until_done(download_jobs)
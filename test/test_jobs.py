@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import threading
+
+import pytest
+
+from playstoredownloader.downloader.jobs import JobQueue, JobState, QueueFullError
+
+
+def wait_for(job):
+    for _ in range(500):
+        if job.done:
+            return
+        threading.Event().wait(0.01)
+
+
+class TestJobQueue(object):
+    def test_successful_job(self):
+        def work(job):
+            job.progress = 100
+            job.publish("download_progress", 100)
+
+        events = []
+        queue = JobQueue(work)
+        job = queue.submit("com.example.app", lambda e, data: events.append(data))
+        wait_for(job)
+
+        assert job.state == JobState.SUCCEEDED
+        assert job.to_dict()["progress"] == 100
+        assert events == [100]
+        assert queue.get(job.id) is job
+        queue.shutdown()
+
+    def test_failed_job(self):
+        def work(job):
+            raise RuntimeError("Download error")
+
+        queue = JobQueue(work)
+        job = queue.submit("com.example.app")
+        wait_for(job)
+
+        assert job.state == JobState.FAILED
+        assert job.error == "Download error"
+        queue.shutdown()
+
+    def test_same_key_coalesced(self):
+        release = threading.Event()
+        executed = []
+
+        def work(job):
+            executed.append(job.key)
+            release.wait(5)
+
+        queue = JobQueue(work, max_workers=1)
+        first = queue.submit("com.example.app")
+        second = queue.submit("com.example.app")
+        release.set()
+        wait_for(first)
+
+        assert first is second
+        assert executed == ["com.example.app"]
+        assert len(queue.jobs()) == 1
+        queue.shutdown()
+
+    def test_queue_full(self):
+        release = threading.Event()
+
+        queue = JobQueue(lambda job: release.wait(5), max_workers=1, max_queued=1)
+        running = queue.submit("com.example.first")
+        for _ in range(500):
+            if running.state == JobState.RUNNING:
+                break
+            threading.Event().wait(0.01)
+        queue.submit("com.example.second")
+
+        with pytest.raises(QueueFullError):
+            queue.submit("com.example.third")
+
+        release.set()
+        queue.shutdown()
+
+    def test_history_pruned(self):
+        queue = JobQueue(lambda job: None, max_history=2)
+        for index in range(5):
+            wait_for(queue.submit(f"com.example.app{index}"))
+
+        assert len(queue.jobs()) <= 3
+        assert queue.jobs()[-1].key == "com.example.app4"
+        queue.shutdown()
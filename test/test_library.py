@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import os
+
+from playstoredownloader.playstore.library import AccountLibrary
+
+# noinspection PyUnresolvedReferences
+from test.test_session_fixtures import download_folder_path
+
+
+# noinspection PyShadowingNames
+class TestAccountLibrary(object):
+    def test_disabled_library(self):
+        library = AccountLibrary("user@example.com")
+        library.add("com.example.app")
+        assert library.enabled is False
+        assert library.is_owned("com.example.app") is False
+
+    def test_library_persistence(self, download_folder_path):
+        library_file = os.path.join(download_folder_path, "library_persistence.jsonl")
+
+        library = AccountLibrary("user@example.com", library_file)
+        library.add("com.example.first")
+        library.add("com.example.second")
+        library.discard("com.example.first")
+
+        reloaded = AccountLibrary("user@example.com", library_file)
+        assert reloaded.is_owned("com.example.first") is False
+        assert reloaded.is_owned("com.example.second") is True
+        assert len(reloaded) == 1
+
+    def test_library_ownership(self, download_folder_path):
+        library_file = os.path.join(download_folder_path, "library_ownership.jsonl")
+
+        library = AccountLibrary("user@example.com", library_file)
+        library.add("com.example.owned")
+        library.discard("com.example.not_owned")
+
+        reloaded = AccountLibrary("user@example.com", library_file)
+        assert reloaded.ownership("com.example.owned") is True
+        assert reloaded.ownership("com.example.not_owned") is False
+        assert reloaded.ownership("com.example.unknown") is None
+        assert len(reloaded) == 1
+
+    def test_library_per_account(self, download_folder_path):
+        library_file = os.path.join(download_folder_path, "library_accounts.jsonl")
+
+        AccountLibrary("first@example.com", library_file).add("com.example.app")
+
+        assert AccountLibrary("first@example.com", library_file).is_owned(
+            "com.example.app"
+        )
+        assert not AccountLibrary("second@example.com", library_file).is_owned(
+            "com.example.app"
+        )
+
+    def test_library_corrupted_line(self, download_folder_path):
+        library_file = os.path.join(download_folder_path, "library_corrupted.jsonl")
+
+        AccountLibrary("user@example.com", library_file).add("com.example.app")
+        with open(library_file, "a") as file:
+            file.write('{"account": "user@exa')
+
+        assert AccountLibrary("user@example.com", library_file).is_owned(
+            "com.example.app"
+        )
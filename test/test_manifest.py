@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import os
+
+from playstoredownloader.downloader.manifest import Manifest
+
+# noinspection PyUnresolvedReferences
+from test.test_session_fixtures import download_folder_path
+
+
+def write_file(directory, name, content):
+    file_path = os.path.join(directory, name)
+    with open(file_path, "wb") as file:
+        file.write(content)
+    return file_path
+
+
+# noinspection PyShadowingNames
+class TestManifest(object):
+    def test_record_and_reload(self, tmp_path):
+        file_path = write_file(tmp_path, "com.example.app.apk", b"content")
+        Manifest(tmp_path).record(file_path, "com.example.app", 10, "hash", kind="apk")
+
+        entry = Manifest(tmp_path).get(file_path)
+        assert entry["package_name"] == "com.example.app"
+        assert entry["version_code"] == 10
+        assert entry["sha256"] == "hash"
+        assert entry["size"] == len(b"content")
+        assert entry["kind"] == "apk"
+
+    def test_modified_file(self, tmp_path):
+        file_path = write_file(tmp_path, "com.example.app.apk", b"content")
+        manifest = Manifest(tmp_path)
+        manifest.record(file_path, "com.example.app", 10, "hash")
+        write_file(tmp_path, "com.example.app.apk", b"modified content")
+        assert manifest.get(file_path) is None
+
+    def test_find(self, tmp_path):
+        manifest = Manifest(tmp_path)
+        for version_code in (1, 2):
+            file_path = write_file(tmp_path, f"app-{version_code}.apk", b"content")
+            manifest.record(file_path, "com.example.app", version_code, "hash")
+
+        assert len(manifest.find("com.example.app")) == 2
+        assert manifest.find("com.example.app", 2)[0]["file"] == "app-2.apk"
+        assert manifest.find("com.example.other") == []
+
+    def test_shared_instance(self, download_folder_path):
+        assert Manifest.for_directory(download_folder_path) is Manifest.for_directory(
+            os.path.join(download_folder_path, ".")
+        )
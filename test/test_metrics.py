@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from playstoredownloader.playstore.metrics import MetricsRegistry
+
+
+class TestMetrics(object):
+    def test_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Test counter.", ("path",))
+        counter.inc(path="details")
+        counter.inc(2, path="details")
+        counter.inc(path="delivery")
+
+        assert counter.value(path="details") == 3
+        rendered = registry.render()
+        assert "# TYPE test_total counter" in rendered
+        assert 'test_total{path="details"} 3' in rendered
+        assert 'test_total{path="delivery"} 1' in rendered
+
+    def test_histogram(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "test_seconds", "Test histogram.", buckets=(1, 5)
+        )
+        histogram.observe(0.5)
+        histogram.observe(3)
+        histogram.observe(10)
+
+        rendered = registry.render()
+        assert 'test_seconds_bucket{le="1"} 1' in rendered
+        assert 'test_seconds_bucket{le="5"} 2' in rendered
+        assert 'test_seconds_bucket{le="+Inf"} 3' in rendered
+        assert "test_seconds_sum 13.5" in rendered
+        assert "test_seconds_count 3" in rendered
+
+    def test_histogram_timer(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Test histogram.")
+        with histogram.time():
+            pass
+        assert histogram.count() == 1
+
+    def test_gauge(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge("test_jobs", "Test gauge.")
+        gauge.inc(3)
+        gauge.dec()
+        assert gauge.value() == 2
+        assert "test_jobs 2" in registry.render()
+
+    def test_label_escaping(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test counter.", ("name",)).inc(name='a"b\\c')
+        assert 'test_total{name="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_wrong_labels(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Test counter.", ("path",))
+        with pytest.raises(ValueError):
+            counter.inc(status=200)
+
+    def test_duplicated_metric(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test counter.")
+        with pytest.raises(ValueError):
+            registry.counter("test_total", "Test counter.")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import threading
+
+import pytest
+
+from playstoredownloader.downloader.downloader import DownloadError, DownloadResult
+from playstoredownloader.downloader.multi_downloader import MultiDownloader
+
+PACKAGES = [f"com.example.app{index}" for index in range(6)]
+
+
+class FakeDownloader(object):
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.prepared = []
+        self.prepared_before_download = {}
+        self.downloaded = []
+        self.lock = threading.Lock()
+
+    def prepare(self, package_name, version_code=None):
+        if package_name == "raise.error":
+            raise RuntimeError("Details error")
+        if version_code is not None:
+            package_name = f"{package_name}@{version_code}"
+        with self.lock:
+            self.prepared.append(package_name)
+        return package_name
+
+    def download_prepared(self, meta):
+        with self.lock:
+            self.prepared_before_download[meta] = len(self.prepared)
+        self.downloaded.append(meta)
+        return DownloadResult(meta not in self.failing)
+
+
+class TestMultiDownloader(object):
+    def test_download_order(self):
+        downloader = FakeDownloader()
+        MultiDownloader(PACKAGES, downloader, prefetch=2).download()
+        assert downloader.downloaded == PACKAGES
+        assert sorted(downloader.prepared) == sorted(PACKAGES)
+
+    def test_download_versions(self):
+        downloader = FakeDownloader()
+        MultiDownloader(
+            [("com.example.app", 1), ("com.example.app", 2), PACKAGES[0]],
+            downloader,
+            prefetch=2,
+        ).download()
+        assert downloader.downloaded == [
+            "com.example.app@1",
+            "com.example.app@2",
+            PACKAGES[0],
+        ]
+
+    def test_download_prefetch(self):
+        downloader = FakeDownloader()
+        MultiDownloader(PACKAGES, downloader, prefetch=2).download()
+
+        # The metadata of the next packages was requested before starting the
+        # download of the first package (the prefetch runs in background, so
+        # only the upper bound is deterministic).
+        assert downloader.prepared_before_download[PACKAGES[0]] <= 3
+        assert downloader.prepared_before_download[PACKAGES[-1]] == len(PACKAGES)
+
+    def test_download_without_prefetch(self):
+        downloader = FakeDownloader()
+        MultiDownloader(PACKAGES, downloader, prefetch=0).download()
+        assert all(
+            downloader.prepared_before_download[package] == index + 1
+            for index, package in enumerate(PACKAGES)
+        )
+
+    def test_download_error(self):
+        downloader = FakeDownloader(failing=[PACKAGES[1]])
+        with pytest.raises(DownloadError):
+            MultiDownloader(PACKAGES, downloader, prefetch=2).download()
+
+        # The error doesn't stop the download of the other packages.
+        assert downloader.downloaded == PACKAGES
+
+    def test_prepare_error(self):
+        downloader = FakeDownloader()
+        with pytest.raises(RuntimeError):
+            MultiDownloader(["raise.error"], downloader, prefetch=2).download()
+
+    def test_prefetched_data_expired(self):
+        downloader = FakeDownloader()
+        MultiDownloader(PACKAGES, downloader, prefetch=2, max_age=3600).download()
+        assert len(downloader.prepared) == len(PACKAGES)
+
+        # The data prefetched too long before the download is resolved again.
+        downloader = FakeDownloader()
+        MultiDownloader(PACKAGES, downloader, prefetch=2, max_age=0).download()
+        assert downloader.downloaded == PACKAGES
+        assert sorted(downloader.prepared) == sorted(PACKAGES * 2)
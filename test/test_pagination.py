@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+import pytest
+
+from playstoredownloader.playstore.pagination import iter_pages
+
+
+class Pages(object):
+    """A fake paginated listing, recording which pages are fetched."""
+
+    def __init__(self, pages: int, page_size: int = 3):
+        self.pages = pages
+        self.page_size = page_size
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def fetch(self, page: int):
+        with self.lock:
+            self.fetched.append(page)
+        items = [page * self.page_size + i for i in range(self.page_size)]
+        return items, page + 1 if page + 1 < self.pages else None
+
+    def wait_fetched(self, count: int, timeout: float = 5) -> None:
+        deadline = time.monotonic() + timeout
+        while len(self.fetched) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+class TestPagination(object):
+    def test_all_pages(self):
+        pages = Pages(4)
+        assert list(iter_pages(pages.fetch, 0)) == list(range(12))
+        assert pages.fetched == [0, 1, 2, 3]
+
+    def test_limit_does_not_fetch_unneeded_pages(self):
+        pages = Pages(10)
+        assert list(iter_pages(pages.fetch, 0, limit=4, read_ahead=5)) == [0, 1, 2, 3]
+        time.sleep(0.1)
+        assert pages.fetched == [0, 1]
+
+    def test_read_ahead_is_bounded(self):
+        pages = Pages(10)
+        results = iter_pages(pages.fetch, 0, read_ahead=2)
+        assert next(results) == 0
+        # The consumed page, plus two pages waiting in the queue, plus the page
+        # waiting to be queued.
+        pages.wait_fetched(4)
+        time.sleep(0.1)
+        assert pages.fetched == [0, 1, 2, 3]
+
+        results.close()
+        time.sleep(0.3)
+        assert pages.fetched == [0, 1, 2, 3]
+
+    def test_empty_listing(self):
+        assert list(iter_pages(lambda _: ([], None), 0)) == []
+
+    def test_error(self):
+        def fetch(page):
+            if page == 1:
+                raise RuntimeError("Page not available")
+            return ["item"], page + 1
+
+        results = iter_pages(fetch, 0)
+        assert next(results) == "item"
+        with pytest.raises(RuntimeError):
+            next(results)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import base64
+import gzip
+import hashlib
+import struct
+
+import pytest
+
+from playstoredownloader.downloader.downloader import Downloader
+from playstoredownloader.downloader.manifest import Manifest
+from playstoredownloader.downloader.out_dir import OutDir
+from playstoredownloader.playstore import patch
+from playstoredownloader.playstore.playstore import Playstore
+from test.stub_server import StubApp, StubServer, file_content, write_credentials
+
+PACKAGE_NAME = "com.patched.app"
+BASE = bytes(range(256)) * 4
+
+
+def gdiff(*commands: bytes) -> bytes:
+    return b"\xd1\xff\xd1\xff\x04" + b"".join(commands) + b"\x00"
+
+
+def file_requests(server: StubServer) -> list:
+    # The kind of each file requested ("apk", "patch", etc.), with its version code.
+    return [
+        "/".join(path.split("/")[3:5])
+        for _, path in server.requests
+        if path.startswith("/files/")
+    ]
+
+
+@pytest.fixture(scope="function")
+def stub_server(monkeypatch):
+    with StubServer([StubApp(PACKAGE_NAME, apk_size=100000)]) as server:
+        monkeypatch.setattr(Playstore, "LOGIN_URL", server.login_url)
+        monkeypatch.setattr(Playstore, "API_URL", server.api_url)
+        yield server
+
+
+@pytest.fixture(scope="function")
+def credentials(tmp_path):
+    return write_credentials(str(tmp_path / "credentials.json"))
+
+
+# noinspection PyShadowingNames
+class TestApplyPatch(object):
+    def apply(self, tmp_path, patch_content: bytes, patch_format=patch.GDIFF):
+        (tmp_path / "base").write_bytes(BASE)
+        (tmp_path / "patch").write_bytes(patch_content)
+        file_hash = patch.apply_patch(
+            tmp_path / "base", tmp_path / "patch", tmp_path / "out", patch_format
+        )
+        content = (tmp_path / "out").read_bytes()
+        assert file_hash == hashlib.sha256(content).hexdigest()
+        return content
+
+    def test_commands(self, tmp_path):
+        content = self.apply(
+            tmp_path,
+            gdiff(
+                b"\x03abc",
+                struct.pack(">BH", 247, 2) + b"de",
+                struct.pack(">Bi", 248, 1) + b"f",
+                struct.pack(">BHB", 249, 10, 2),
+                struct.pack(">BHH", 250, 300, 3),
+                struct.pack(">BHi", 251, 0, 1),
+                struct.pack(">BiB", 252, 1000, 4),
+                struct.pack(">BiH", 253, 5, 1),
+                struct.pack(">Bii", 254, 6, 1),
+                struct.pack(">Bqi", 255, 7, 1),
+            ),
+        )
+        assert content == (
+            b"abcdef"
+            + BASE[10:12]
+            + BASE[300:303]
+            + BASE[0:1]
+            + BASE[1000:1004]
+            + BASE[5:8]
+        )
+
+    def test_gzipped(self, tmp_path):
+        content = self.apply(
+            tmp_path,
+            gzip.compress(gdiff(struct.pack(">Bii", 254, 0, len(BASE)), b"\x01!")),
+            patch.GZIPPED_GDIFF,
+        )
+        assert content == BASE + b"!"
+
+    @pytest.mark.parametrize(
+        "patch_content,patch_format",
+        [
+            (b"not a patch", patch.GDIFF),
+            (gdiff(b"\x03abc")[:-1], patch.GDIFF),
+            (gdiff(struct.pack(">Bii", 254, 1000, 100)), patch.GDIFF),
+            (gdiff(b"\x01a"), patch.GZIPPED_GDIFF),
+            (gdiff(b"\x01a"), 3),
+        ],
+    )
+    def test_invalid_patch(self, tmp_path, patch_content, patch_format):
+        with pytest.raises(RuntimeError):
+            self.apply(tmp_path, patch_content, patch_format)
+
+    def test_digest_matches(self):
+        digest = hashlib.sha1(BASE).digest()
+        assert patch.digest_matches(digest, hashlib.sha1(BASE).hexdigest()) is True
+        assert patch.digest_matches(digest, "0" * 40) is False
+        assert (
+            patch.digest_matches(digest, base64.urlsafe_b64encode(digest).decode())
+            is True
+        )
+        assert patch.digest_matches(digest, "not base64!") is False
+
+
+# noinspection PyShadowingNames
+class TestPatchDownload(object):
+    def update(self, stub_server, apk_size, patch_bases):
+        app = stub_server.apps[PACKAGE_NAME]
+        app.version_code = 2
+        app.apk_size = apk_size
+        app.patch_bases = patch_bases
+
+    def test_download_patch(self, stub_server, credentials, tmp_path):
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        assert downloader.download(PACKAGE_NAME).success is True
+
+        self.update(stub_server, 150000, {1: 100000})
+        assert downloader.download(PACKAGE_NAME).success is True
+
+        apk = (tmp_path / f"{PACKAGE_NAME}.apk").read_bytes()
+        assert apk == b"".join(file_content(150000))
+        assert file_requests(stub_server) == ["1/apk", "2/patch"]
+        entry = Manifest.for_directory(tmp_path).find(PACKAGE_NAME, 2)[0]
+        assert entry["sha256"] == hashlib.sha256(apk).hexdigest()
+        assert entry["kind"] == "apk"
+        # No temporary files are left.
+        assert sorted(path.name for path in tmp_path.iterdir() if path.is_file()) == [
+            ".manifest.jsonl",
+            f"{PACKAGE_NAME}.apk",
+            "credentials.json",
+        ]
+
+    def test_fallback_to_full_download(self, stub_server, credentials, tmp_path):
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        assert downloader.download(PACKAGE_NAME).success is True
+
+        # A patch from a different base version can't be applied.
+        self.update(stub_server, 150000, {1: 90000})
+        assert downloader.download(PACKAGE_NAME).success is True
+
+        apk = (tmp_path / f"{PACKAGE_NAME}.apk").read_bytes()
+        assert apk == b"".join(file_content(150000))
+        assert file_requests(stub_server) == ["1/apk", "2/apk"]
+
+    def test_fallback_on_patch_error(self, stub_server, credentials, tmp_path):
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        assert downloader.download(PACKAGE_NAME).success is True
+
+        self.update(stub_server, 80000, {1: 100000})
+        stub_server.fail_next("/files", status=500)
+        assert downloader.download(PACKAGE_NAME).success is True
+
+        apk = (tmp_path / f"{PACKAGE_NAME}.apk").read_bytes()
+        assert apk == b"".join(file_content(80000))
+        assert file_requests(stub_server) == ["1/apk", "2/patch", "2/apk"]
+
+    def test_no_previous_version(self, stub_server, credentials, tmp_path):
+        self.update(stub_server, 150000, {1: 100000})
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        assert downloader.download(PACKAGE_NAME).success is True
+        assert file_requests(stub_server) == ["2/apk"]
+
+    def test_patch_cached_per_base_version(self, stub_server, credentials, tmp_path):
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        assert downloader.download(PACKAGE_NAME).success is True
+        self.update(stub_server, 150000, {1: 100000})
+
+        # The cached delivery data contains a patch from the version already
+        # downloaded, so it's not used for a directory without that version.
+        meta = downloader.prepare(PACKAGE_NAME)
+        delivery_requests = stub_server.request_count("/fdfe/delivery")
+        # noinspection PyProtectedMember
+        delivery_data = downloader.api._get_delivery_data(
+            meta, OutDir(tmp_path / "other", meta=meta)
+        )
+        assert not delivery_data.patchData.downloadUrl
+        assert stub_server.request_count("/fdfe/delivery") == delivery_requests + 1
+
+        assert downloader.download_prepared(meta).success is True
+        assert file_requests(stub_server) == ["1/apk", "2/patch"]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import threading
+
+import pytest
+
+import playstoredownloader.downloader.progress as progress_module
+from playstoredownloader.downloader.progress import ProgressBatcher, ProgressThrottle
+
+
+@pytest.fixture(scope="function")
+def clock(monkeypatch):
+    # Fake monotonic clock that can be moved forward manually.
+    clock = [1000.0]
+    monkeypatch.setattr(progress_module.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+# noinspection PyShadowingNames
+class TestProgressThrottle(object):
+    def test_min_interval(self, clock):
+        throttle = ProgressThrottle(min_interval=1, min_delta=1)
+        assert throttle.should_send(1) is True
+        assert throttle.should_send(2) is False
+        clock[0] += 1
+        assert throttle.should_send(3) is True
+
+    def test_min_delta(self, clock):
+        throttle = ProgressThrottle(min_interval=0, min_delta=5)
+        assert throttle.should_send(1) is True
+        assert throttle.should_send(4) is False
+        assert throttle.should_send(6) is True
+
+    def test_final_progress_always_sent(self, clock):
+        throttle = ProgressThrottle(min_interval=10, min_delta=50)
+        assert throttle.should_send(1) is True
+        assert throttle.should_send(100) is True
+        assert throttle.should_send(100) is False
+
+
+class TestProgressBatcher(object):
+    def test_latest_progress_per_job(self):
+        frames = []
+        batcher = ProgressBatcher(lambda sub, frame: frames.append((sub, frame)), 60)
+        batcher.add("client", "job1", 10)
+        batcher.add("client", "job1", 20)
+        batcher.add("client", "job2", 5)
+        batcher.add("other", "job1", 20)
+        batcher.flush("client")
+        assert frames == [("client", {"job1": 20, "job2": 5})]
+        batcher.flush()
+        assert frames[-1] == ("other", {"job1": 20})
+        batcher.flush()
+        assert len(frames) == 2
+
+    def test_discard(self):
+        frames = []
+        batcher = ProgressBatcher(lambda sub, frame: frames.append((sub, frame)), 60)
+        batcher.add("client", "job", 10)
+        batcher.add("other", "job", 10)
+        batcher.discard("client")
+        batcher.flush()
+        assert frames == [("other", {"job": 10})]
+
+    def test_periodic_flush(self):
+        sent = threading.Event()
+        batcher = ProgressBatcher(lambda sub, frame: sent.set(), 0.01)
+        batcher.add("client", "job", 50)
+        assert sent.wait(5) is True
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from playstoredownloader.playstore.meta import PackageMeta
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore.recorder import ResponseRecorder
+from test.stub_server import StubServer, synthetic_apps, write_credentials
+
+
+@pytest.fixture(scope="function")
+def stub_credentials_path(tmp_path):
+    return write_credentials(str(tmp_path / "credentials.json"))
+
+
+# noinspection PyShadowingNames
+class TestResponseRecorder(object):
+    def test_key(self):
+        key = ResponseRecorder.key_for("details", {"doc": "com.example", "vc": 1})
+        assert key.startswith("details-")
+        assert key == ResponseRecorder.key_for(
+            "details", {"vc": 1, "doc": "com.example"}
+        )
+        assert key != ResponseRecorder.key_for("details", {"doc": "com.other"})
+        assert key != ResponseRecorder.key_for("delivery", {"doc": "com.example"})
+        assert ResponseRecorder.key_for("bulkDetails", data=b"\x01") != (
+            ResponseRecorder.key_for("bulkDetails", data=b"\x02")
+        )
+
+    def test_invalid_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            ResponseRecorder(tmp_path, "invalid")
+
+    def test_record_and_replay(self, stub_credentials_path, tmp_path):
+        responses_dir = tmp_path / "responses"
+
+        with StubServer(synthetic_apps(3, apk_size=1024)) as server:
+            with server.patch_playstore():
+                api = Playstore(
+                    stub_credentials_path,
+                    recorder=ResponseRecorder(responses_dir, ResponseRecorder.RECORD),
+                )
+                recorded_meta = PackageMeta(api, "com.stub.app1")
+                recorded_search = api.search("com.stub")
+
+        # The server is not running anymore, all the responses are replayed.
+        api = Playstore(
+            stub_credentials_path,
+            recorder=ResponseRecorder(responses_dir, ResponseRecorder.REPLAY),
+        )
+        assert PackageMeta(api, "com.stub.app1").details == recorded_meta.details
+        assert api.search("com.stub") == recorded_search
+
+        with pytest.raises(RuntimeError):
+            api.search("not recorded")
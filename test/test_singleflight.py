@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import threading
+
+from playstoredownloader.downloader.singleflight import SingleFlight
+
+
+class TestSingleFlight(object):
+    def test_first_request_leads(self):
+        flights = SingleFlight()
+        _, first_leader = flights.join("com.example.app", lambda event, data: None)
+        _, second_leader = flights.join("com.example.app", lambda event, data: None)
+        _, other_leader = flights.join("com.example.other", lambda event, data: None)
+        assert first_leader is True
+        assert second_leader is False
+        assert other_leader is True
+
+    def test_events_shared_with_subscribers(self):
+        flights = SingleFlight()
+        first_events, second_events = [], []
+
+        flight, _ = flights.join(
+            "com.example.app", lambda event, data: first_events.append((event, data))
+        )
+        flight.publish("download_progress", 10)
+        flight.publish("download_progress", 20)
+
+        # The late subscriber receives the latest progress straight away.
+        flights.join(
+            "com.example.app", lambda event, data: second_events.append((event, data))
+        )
+        flight.publish("download_success", "Done")
+
+        assert first_events == [
+            ("download_progress", 10),
+            ("download_progress", 20),
+            ("download_success", "Done"),
+        ]
+        assert second_events == [
+            ("download_progress", 20),
+            ("download_success", "Done"),
+        ]
+        assert flight.subscriber_count == 2
+
+    def test_finished_flight(self):
+        flights = SingleFlight()
+        flight, _ = flights.join("com.example.app", lambda event, data: None)
+        assert "com.example.app" in flights
+        flights.finish(flight)
+        assert "com.example.app" not in flights
+        _, leader = flights.join("com.example.app", lambda event, data: None)
+        assert leader is True
+
+    def test_broken_subscriber(self):
+        flights = SingleFlight()
+        events = []
+
+        def broken(event, data):
+            raise ConnectionError()
+
+        flight, _ = flights.join("com.example.app", broken)
+        flights.join("com.example.app", lambda event, data: events.append(event))
+        flight.publish("download_progress", 50)
+        assert events == ["download_progress"]
+
+    def test_unsubscribe(self):
+        flights = SingleFlight()
+        events = []
+
+        def callback(event, data):
+            events.append(event)
+
+        flight, _ = flights.join("com.example.app", callback)
+        flight.publish("download_progress", 10)
+        flight.unsubscribe(callback)
+        flight.publish("download_success", "Done")
+        assert events == ["download_progress"]
+        assert flight.subscriber_count == 0
+
+    def test_replay_before_new_events(self):
+        flights = SingleFlight()
+        flight, _ = flights.join("com.example.app")
+        flight.publish("download_progress", 10)
+        publisher = threading.Thread(
+            target=flight.publish, args=("download_progress", 20)
+        )
+        events = []
+
+        def callback(event, data):
+            if not events:
+                # An event published during the replay is received after it.
+                publisher.start()
+                publisher.join(0.1)
+            events.append(data)
+
+        flight.subscribe(callback)
+        publisher.join()
+        assert events == [10, 20]
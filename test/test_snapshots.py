@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+
+from playstoredownloader.crawler.snapshots import Change, SnapshotStore
+
+
+def record(package: str, version_code: int, rating: float = 4.5) -> dict:
+    return {"package": package, "version_code": version_code, "rating": rating}
+
+
+class TestSnapshotStore(object):
+    def test_diff(self, tmp_path):
+        with SnapshotStore(tmp_path / "catalog.db") as store:
+            old = store.create_snapshot("monday")
+            store.add(
+                old,
+                [
+                    record("com.same", 1),
+                    record("com.updated", 1),
+                    record("com.removed", 3),
+                ],
+            )
+            new = store.create_snapshot("tuesday")
+            store.add(
+                new,
+                [
+                    record("com.same", 1, rating=4.0),
+                    record("com.updated", 2),
+                    record("com.added", 7),
+                    # The same app found twice in the same crawl.
+                    record("com.added", 7),
+                ],
+            )
+
+            assert list(store.diff(old, new)) == [
+                Change(Change.ADDED, "com.added", None, 7),
+                Change(Change.REMOVED, "com.removed", 3, None),
+                Change(Change.UPDATED, "com.updated", 1, 2),
+            ]
+            assert [snapshot["apps"] for snapshot in store.snapshots()] == [3, 3]
+            assert store.latest() == [old, new]
+
+            to_download = store.write_changes(old, new, tmp_path / "changes.jsonl")
+            assert to_download == ["com.added", "com.updated"]
+            with open(tmp_path / "changes.jsonl") as file:
+                changes = [json.loads(line) for line in file]
+            assert changes[1] == {
+                "change": "removed",
+                "package": "com.removed",
+                "old_version_code": 3,
+                "new_version_code": None,
+            }
+
+    def test_import_crawler_output(self, tmp_path):
+        with open(tmp_path / "first.csv", "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["package", "version_code"])
+            writer.writeheader()
+            writer.writerow({"package": "com.first", "version_code": 10})
+            writer.writerow({"package": "com.second", "version_code": 20})
+        with open(tmp_path / "second.jsonl", "w") as file:
+            file.write(f"{json.dumps(record('com.first', 11))}\n")
+            # Version code unknown (e.g., found by the package discovery crawler).
+            file.write(f"{json.dumps({'package': 'com.second'})}\n")
+
+        with SnapshotStore(tmp_path / "catalog.db") as store:
+            first = store.import_file(tmp_path / "first.csv")
+            second = store.import_file(tmp_path / "second.jsonl")
+            assert list(store.diff(first, second)) == [
+                Change(Change.UPDATED, "com.first", 10, 11)
+            ]
+
+        # The snapshots are persisted.
+        with SnapshotStore(tmp_path / "catalog.db") as store:
+            assert [snapshot["name"] for snapshot in store.snapshots()] == [
+                "first.csv",
+                "second.jsonl",
+            ]
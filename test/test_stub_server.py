@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+import os
+
+import pytest
+import requests
+
+from playstoredownloader.downloader.downloader import Downloader
+from playstoredownloader.downloader.manifest import Manifest
+from playstoredownloader.downloader.out_dir import OutDir
+from playstoredownloader.playstore import metrics
+from playstoredownloader.playstore.playstore import Playstore
+from test.stub_server import StubApp, StubServer, write_credentials
+
+APP = StubApp(
+    "com.stub.app",
+    version_code=42,
+    apk_size=300 * 1024 + 7,
+    obb_sizes=[50 * 1024],
+    split_sizes={"config.en": 10 * 1024},
+    category="GAME",
+    creator="Stub Games",
+)
+OTHER_APP = StubApp("com.stub.other", apk_size=1024, creator="Stub Games")
+
+
+@pytest.fixture(scope="function")
+def stub_server(monkeypatch):
+    with StubServer([APP, OTHER_APP]) as server:
+        monkeypatch.setattr(Playstore, "LOGIN_URL", server.login_url)
+        monkeypatch.setattr(Playstore, "API_URL", server.api_url)
+        yield server
+
+
+@pytest.fixture(scope="function")
+def stub_credentials_path(tmp_path):
+    return write_credentials(str(tmp_path / "credentials.json"))
+
+
+# noinspection PyShadowingNames
+class TestStubServer(object):
+    def test_download(self, stub_server, stub_credentials_path, tmp_path):
+        downloader = Downloader(True, True, stub_credentials_path, tmp_path, None)
+        result = downloader.download(APP.package_name)
+
+        assert result.success is True
+        manifest = {
+            entry["kind"]: entry
+            for entry in Manifest.for_directory(tmp_path).find(
+                APP.package_name, APP.version_code
+            )
+        }
+        assert manifest["apk"]["sha256"] == APP.file_sha256("apk")
+        assert manifest["apk"]["size"] == APP.apk_size
+        assert manifest["obb"]["sha256"] == APP.file_sha256("obb", "0")
+        assert manifest["split"]["sha256"] == APP.file_sha256("split", "config.en")
+        assert stub_server.request_count("/fdfe/purchase") == 1
+
+    def test_download_again_uses_cache(
+        self, stub_server, stub_credentials_path, tmp_path
+    ):
+        downloader = Downloader(False, False, stub_credentials_path, tmp_path, None)
+        assert downloader.download(APP.package_name).success is True
+        delivery_requests = stub_server.request_count("/fdfe/delivery")
+
+        # The cached download link is rejected, so new delivery data is requested.
+        stub_server.cookie_value = "new-cookie"
+        assert downloader.download(APP.package_name).success is True
+        assert stub_server.request_count("/fdfe/delivery") == delivery_requests + 1
+
+    @pytest.mark.parametrize("kind", ["obb", "split"])
+    def test_additional_file_link_rejected(
+        self, stub_server, stub_credentials_path, tmp_path, kind
+    ):
+        downloader = Downloader(True, True, stub_credentials_path, tmp_path, None)
+        files_path = f"/files/{APP.package_name}/{APP.version_code}/{kind}"
+
+        stub_server.fail_next(files_path, status=403)
+        assert downloader.download(APP.package_name).success is False
+
+        assert downloader.download(APP.package_name).success is True
+        delivery_requests = stub_server.request_count("/fdfe/delivery")
+
+        # The cached link of the additional file is rejected (e.g., it expired during
+        # the download of the apk), so new delivery data is requested.
+        stub_server.fail_next(files_path, status=403)
+        assert downloader.download(APP.package_name).success is True
+        assert stub_server.request_count("/fdfe/delivery") == delivery_requests + 1
+
+    def test_download_with_library(self, stub_server, stub_credentials_path, tmp_path):
+        library_file = str(tmp_path / "library.jsonl")
+        downloader = Downloader(
+            False, False, stub_credentials_path, tmp_path, None, library_file
+        )
+
+        # An unknown app is checked with a delivery request first.
+        assert downloader.download(OTHER_APP.package_name).success is True
+        assert stub_server.request_count("/fdfe/delivery") == 1
+        assert stub_server.request_count("/fdfe/purchase") == 1
+        assert downloader.api.library.round_trips_saved == 0
+
+        # The purchase of an app fails, so the app doesn't belong to the account.
+        stub_server.fail_next("/fdfe/purchase", status=500)
+        assert downloader.download(APP.package_name).success is False
+        assert stub_server.request_count("/fdfe/delivery") == 2
+        assert downloader.api.library.ownership(APP.package_name) is False
+
+        # When requested again (even by another run), the app is purchased straight
+        # away.
+        downloader = Downloader(
+            False, False, stub_credentials_path, tmp_path, None, library_file
+        )
+        assert downloader.download(APP.package_name).success is True
+        assert stub_server.request_count("/fdfe/delivery") == 2
+        assert stub_server.request_count("/fdfe/purchase") == 3
+        assert downloader.api.library.round_trips_saved == 1
+        assert downloader.api.library.is_owned(APP.package_name) is True
+
+    def test_download_interrupted(self, stub_server, stub_credentials_path, tmp_path):
+        stub_server.truncate_rate = 1
+        downloader = Downloader(False, False, stub_credentials_path, tmp_path, None)
+
+        assert downloader.download(APP.package_name).success is False
+        assert not os.path.exists(tmp_path / f"{APP.package_name}.apk")
+
+    def test_interrupted_download_keeps_previous_file(
+        self, stub_server, stub_credentials_path, tmp_path
+    ):
+        downloader = Downloader(False, False, stub_credentials_path, tmp_path, None)
+        assert downloader.download(APP.package_name).success is True
+        apk_path = tmp_path / f"{APP.package_name}.apk"
+        previous_mtime = apk_path.stat().st_mtime_ns
+
+        stub_server.truncate_rate = 1
+        assert downloader.download(APP.package_name).success is False
+
+        # The complete file downloaded before is untouched, and no temporary file
+        # is left behind.
+        assert apk_path.stat().st_size == APP.apk_size
+        assert apk_path.stat().st_mtime_ns == previous_mtime
+        assert [path.name for path in tmp_path.glob(".*.part")] == []
+
+    def test_closed_download_removes_temporary_file(
+        self, stub_server, stub_credentials_path, tmp_path
+    ):
+        downloader = Downloader(
+            False, False, stub_credentials_path, tmp_path, None, fsync=True
+        )
+        meta = downloader.prepare(APP.package_name)
+        out_dir = OutDir(tmp_path, meta=meta)
+
+        # noinspection PyProtectedMember
+        progress = downloader.api._download_with_progress(meta, out_dir)
+        next(progress)
+        assert len(list(tmp_path.glob(".*.part"))) == 1
+        progress.close()
+
+        assert list(tmp_path.glob(".*.part")) == []
+        assert not out_dir.apk_path.exists()
+
+    def test_download_error(self, stub_server, stub_credentials_path, tmp_path):
+        stub_server.fail_next("/files", status=503)
+        downloader = Downloader(False, False, stub_credentials_path, tmp_path, None)
+
+        assert downloader.download(APP.package_name).success is False
+        assert downloader.download(APP.package_name).success is True
+
+    def test_login_error(self, stub_server, stub_credentials_path, monkeypatch):
+        stub_server.login_ok = False
+        # Don't wait between the login attempts.
+        monkeypatch.setattr("time.sleep", lambda _: None)
+        with pytest.raises(RuntimeError):
+            Playstore(stub_credentials_path)
+
+    def test_search_and_browse(self, stub_server, stub_credentials_path):
+        api = Playstore(stub_credentials_path)
+
+        assert [doc.docid for doc in api.search("com.stub").child] == [
+            APP.package_name,
+            OTHER_APP.package_name,
+        ]
+        assert len(api.search('pub:"Stub Games"').child) == 2
+        assert api.search("missing") is None
+
+        categories = [category.name for category in api.get_store_categories().category]
+        assert categories == ["Game", "Tools"]
+
+        apps = api.list_app_by_category("GAME", "apps_topselling_free")
+        assert apps.doc[0].child[0].docid == APP.package_name
+
+    def test_search_iter(self, stub_server, stub_credentials_path):
+        for i in range(10):
+            stub_server.add_app(StubApp(f"com.stub.paged{i}", apk_size=1024))
+        api = Playstore(stub_credentials_path)
+
+        results = [doc.docid for doc in api.search_iter("com.stub.paged", page_size=3)]
+        assert results == [f"com.stub.paged{i}" for i in range(10)]
+        assert stub_server.request_count("/fdfe/search") == 4
+
+        assert len(list(api.search_iter("com.stub.paged", limit=5, page_size=3))) == 5
+        assert list(api.search_iter("missing")) == []
+
+    def test_list_app_by_category_iter(self, stub_server, stub_credentials_path):
+        for i in range(10):
+            stub_server.add_app(StubApp(f"com.stub.tool{i}", apk_size=1024))
+        api = Playstore(stub_credentials_path)
+
+        apps = api.list_app_by_category_iter(
+            "TOOLS", "apps_topselling_free", page_size=4
+        )
+        assert [app.docid for app in apps] == [OTHER_APP.package_name] + [
+            f"com.stub.tool{i}" for i in range(10)
+        ]
+        assert stub_server.request_count("/fdfe/list") == 3
+
+        apps = api.list_app_by_category_iter(
+            "TOOLS", "apps_topselling_free", limit=3, page_size=4
+        )
+        assert len(list(apps)) == 3
+        assert stub_server.request_count("/fdfe/list") == 4
+
+    def test_list_app_by_developer(self, stub_server, stub_credentials_path):
+        big_publisher = [f"com.big.app{i}" for i in range(25)]
+        for package_name in big_publisher:
+            stub_server.add_app(StubApp(package_name, creator="Big Publisher"))
+        stub_server.add_app(StubApp("com.big.other", creator="Big Publisher Inc"))
+        api = Playstore(stub_credentials_path)
+
+        # The apps are in more than one page of results.
+        assert api.list_app_by_developer("Big Publisher") == big_publisher
+        assert stub_server.request_count("/fdfe/search") == 2
+        assert api.list_app_by_developer("Nobody") == []
+
+        records = list(
+            api.list_apps_by_developers(
+                ["Stub Games", "Big Publisher", "Stub Games", "Nobody"], max_workers=3
+            )
+        )
+        assert len(records) == len(set(records)) == 27
+        assert set(records) == {
+            (APP.package_name, "Stub Games"),
+            (OTHER_APP.package_name, "Stub Games"),
+            *((package_name, "Big Publisher") for package_name in big_publisher),
+        }
+
+        records = api.list_apps_by_developers(["Big Publisher"])
+        assert next(records)[1] == "Big Publisher"
+        records.close()
+
+    def test_compressed_responses(self, stub_server, stub_credentials_path):
+        for i in range(20):
+            stub_server.add_app(StubApp(f"com.stub.compressed{i}", apk_size=1024))
+
+        def search(api):
+            received_bytes = metrics.RESPONSE_BYTES.value(path="search")
+            docids = [doc.docid for doc in api.search("com.stub.compressed").child]
+            return docids, metrics.RESPONSE_BYTES.value(path="search") - received_bytes
+
+        docids, compressed_bytes = search(Playstore(stub_credentials_path))
+        assert docids == [f"com.stub.compressed{i}" for i in range(20)]
+
+        api = Playstore(stub_credentials_path, compress_responses=False)
+        docids, uncompressed_bytes = search(api)
+        assert docids == [f"com.stub.compressed{i}" for i in range(20)]
+        assert 0 < compressed_bytes < uncompressed_bytes / 2
+
+    def test_range_request(self, stub_server):
+        response = requests.get(
+            f"{stub_server.url}/files/{APP.package_name}/42/apk/base",
+            headers={"Range": "bytes=100-199"},
+            cookies={"MarketDA": stub_server.cookie_value},
+        )
+        assert response.status_code == 206
+        assert len(response.content) == 100
+        assert response.headers["Content-Range"] == f"bytes 100-199/{APP.apk_size}"
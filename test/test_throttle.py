@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+import pytest
+
+from playstoredownloader.downloader.downloader import Downloader
+from playstoredownloader.playstore.playstore import Playstore
+from playstoredownloader.playstore import throttle
+from playstoredownloader.playstore.throttle import (
+    BandwidthLimiter,
+    RequestRateLimiter,
+    parse_rate,
+)
+from test.stub_server import StubServer, synthetic_apps, write_credentials
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(scope="function")
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(throttle, "time", fake_clock)
+    return fake_clock
+
+
+# noinspection PyShadowingNames
+class TestThrottle(object):
+    def test_parse_rate(self):
+        assert parse_rate("1000") == 1000
+        assert parse_rate("500k") == 500 * 1024
+        assert parse_rate("1.5M") == 1536 * 1024
+        assert parse_rate("2G") == 2 * 1024**3
+        with pytest.raises(ValueError):
+            parse_rate("fast")
+        with pytest.raises(ValueError):
+            parse_rate("0")
+
+    def test_burst_without_waiting(self, clock):
+        limiter = BandwidthLimiter(1000, burst=0.5)
+        limiter.consume(500)
+        assert clock.sleeps == []
+
+    def test_rate(self, clock):
+        limiter = BandwidthLimiter(1000, burst=0)
+        for _ in range(10):
+            limiter.consume(100)
+        # 1000 bytes at 1000 bytes/second.
+        assert sum(clock.sleeps) == pytest.approx(1.0)
+
+    def test_idle_time_is_not_accumulated(self, clock):
+        limiter = BandwidthLimiter(1000, burst=0.1)
+        limiter.consume(1000)
+        clock.now += 60
+        limiter.consume(1000)
+        assert clock.sleeps == [pytest.approx(0.9), pytest.approx(0.9)]
+
+    def test_request_rate(self, clock):
+        limiter = RequestRateLimiter(5, burst=2)
+        for _ in range(12):
+            limiter.acquire()
+        # The first 2 requests don't wait, then 5 requests per second.
+        assert [sleep for sleep in clock.sleeps if sleep > 1e-6] == [
+            pytest.approx(0.2)
+        ] * 10
+
+    def test_fair_sharing(self):
+        limiter = BandwidthLimiter(200 * 1024, burst=0)
+        transferred = {"first": 0, "second": 0}
+        stop = threading.Event()
+
+        def transfer(name):
+            while not stop.is_set():
+                limiter.consume(4096)
+                transferred[name] += 4096
+
+        threads = [threading.Thread(target=transfer, args=(n,)) for n in transferred]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        total = sum(transferred.values())
+        assert total <= 0.6 * 200 * 1024
+        assert abs(transferred["first"] - transferred["second"]) <= 0.2 * total
+
+    def test_download_with_limit(self, monkeypatch, tmp_path):
+        credentials = write_credentials(str(tmp_path / "credentials.json"))
+        with StubServer(synthetic_apps(1, apk_size=100 * 1024)) as server:
+            monkeypatch.setattr(Playstore, "LOGIN_URL", server.login_url)
+            monkeypatch.setattr(Playstore, "API_URL", server.api_url)
+            downloader = Downloader(
+                False, False, credentials, tmp_path, None, limit_rate=200 * 1024
+            )
+
+            start_time = time.monotonic()
+            assert downloader.download("com.stub.app0").success is True
+            # 100 KB at 200 KB/s (minus the initial burst).
+            assert time.monotonic() - start_time >= 0.35
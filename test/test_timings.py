@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import json
+import threading
+
+from playstoredownloader.playstore import timings
+from playstoredownloader.playstore.timings import DownloadTimings
+
+
+class TestTimings(object):
+    def test_record_without_recording(self):
+        assert timings.current() is None
+        # Nothing to record into, the timing is simply ignored.
+        timings.record("details", 1.0)
+
+    def test_record_accumulates_phases(self):
+        download_timings = DownloadTimings("com.example.app")
+        with timings.recording(download_timings):
+            timings.record("details", 0.5)
+            timings.record("delivery", 0.25)
+            timings.record("delivery", 0.25)
+        assert timings.current() is None
+        assert download_timings.phases == {"details": 0.5, "delivery": 0.5}
+
+    def test_recording_is_per_thread(self):
+        download_timings = DownloadTimings("com.example.app")
+
+        def other_thread():
+            timings.record("details", 1.0)
+
+        with timings.recording(download_timings):
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+        assert download_timings.phases == {}
+
+    def test_phase(self):
+        download_timings = DownloadTimings("com.example.app")
+        with download_timings.phase("download"):
+            pass
+        assert download_timings.phases["download"] >= 0
+
+    def test_files(self):
+        download_timings = DownloadTimings("com.example.app")
+        download_timings.add_file("app.apk", 3000, 0.1, 2.0)
+        download_timings.add_file("split.apk", 1000, None, 2.0)
+        assert download_timings.transferred_bytes == 4000
+        assert download_timings.transfer_time == 4.0
+        assert download_timings.throughput == 1000
+        assert download_timings.files[0]["throughput"] == 1500
+
+    def test_write(self, tmp_path):
+        timings_file = tmp_path / "timings.jsonl"
+        download_timings = DownloadTimings("com.example.app")
+        download_timings.add("details", 0.5)
+        download_timings.add_file("app.apk", 1000, 0.1, 0.5)
+        download_timings.write(timings_file, success=True)
+        DownloadTimings("com.example.other").write(timings_file, success=False)
+
+        lines = [json.loads(line) for line in timings_file.read_text().splitlines()]
+        assert len(lines) == 2
+        assert lines[0]["package_name"] == "com.example.app"
+        assert lines[0]["phases"] == {"details": 0.5}
+        assert lines[0]["throughput"] == 2000
+        assert lines[0]["success"] is True
+        assert lines[1]["throughput"] is None
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import pytest
+
+from playstoredownloader.downloader.downloader import DownloadError, Downloader
+from playstoredownloader.downloader.main import main
+from playstoredownloader.downloader.manifest import Manifest
+from playstoredownloader.downloader.versions import (
+    expand_package_specs,
+    parse_package_spec,
+)
+from playstoredownloader.playstore.playstore import Playstore
+from test.stub_server import StubApp, StubServer, file_content, write_credentials
+
+PACKAGE_NAME = "com.versioned.app"
+
+
+@pytest.fixture(scope="function")
+def stub_server(monkeypatch):
+    app = StubApp(
+        PACKAGE_NAME,
+        version_code=3,
+        apk_size=3000,
+        previous_versions={1: 1000, 2: 2000},
+    )
+    with StubServer([app]) as server:
+        monkeypatch.setattr(Playstore, "LOGIN_URL", server.login_url)
+        monkeypatch.setattr(Playstore, "API_URL", server.api_url)
+        yield server
+
+
+@pytest.fixture(scope="function")
+def credentials(tmp_path):
+    return write_credentials(str(tmp_path / "credentials.json"))
+
+
+def file_requests(server: StubServer) -> list:
+    return [path for _, path in server.requests if path.startswith("/files/")]
+
+
+class TestPackageSpecs(object):
+    @pytest.mark.parametrize(
+        "spec,expected",
+        [
+            ("com.example.app", ("com.example.app", None)),
+            (" 'com.example.app' ", ("com.example.app", None)),
+            ("com.example.app@5", ("com.example.app", [5])),
+            ("com.example.app@10,12", ("com.example.app", [10, 12])),
+            ("com.example.app@100-102,1", ("com.example.app", [100, 101, 102, 1])),
+        ],
+    )
+    def test_parse(self, spec, expected):
+        assert parse_package_spec(spec) == expected
+
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            "com.example.app@",
+            "com.example.app@latest",
+            "com.example.app@5-3",
+            "com.example.app@0",
+            "com.example.app@1-",
+            "com.example.app@1-100000",
+            "@5",
+        ],
+    )
+    def test_parse_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_package_spec(spec)
+
+    def test_expand(self, tmp_path):
+        manifest = Manifest.for_directory(tmp_path)
+        (tmp_path / "com.example.app.2.apk").write_bytes(b"apk")
+        manifest.record(tmp_path / "com.example.app.2.apk", "com.example.app", 2, "")
+
+        assert expand_package_specs(
+            ["com.example.app@1-3", "com.example.app@3", "com.example.app", "other"],
+            manifest,
+        ) == [
+            ("com.example.app", 1),
+            ("com.example.app", 3),
+            ("com.example.app", None),
+            ("other", None),
+        ]
+
+
+# noinspection PyShadowingNames
+class TestVersionsDownload(object):
+    def test_download_versions(self, stub_server, credentials, tmp_path):
+        main(
+            [f"{PACKAGE_NAME}@1-2", PACKAGE_NAME],
+            credentials=credentials,
+            out_dir=tmp_path,
+        )
+
+        for file_name, size in [
+            (f"{PACKAGE_NAME}.1.apk", 1000),
+            (f"{PACKAGE_NAME}.2.apk", 2000),
+            (f"{PACKAGE_NAME}.apk", 3000),
+        ]:
+            assert (tmp_path / file_name).read_bytes() == b"".join(file_content(size))
+
+        manifest = Manifest.for_directory(tmp_path)
+        for version_code in (1, 2, 3):
+            assert len(manifest.find(PACKAGE_NAME, version_code)) == 1
+
+        # The versions already downloaded are not requested again.
+        requests_count = stub_server.request_count()
+        main([f"{PACKAGE_NAME}@2,1"], credentials=credentials, out_dir=tmp_path)
+        assert stub_server.request_count() - requests_count == 1  # Only the login.
+        assert len(file_requests(stub_server)) == 3
+
+    def test_requested_version_keeps_details(self, stub_server, credentials, tmp_path):
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        meta = downloader.prepare(PACKAGE_NAME, 1)
+
+        # Only the download uses the requested version, the details still describe
+        # the current version of the app.
+        assert meta.version_code == 1
+        assert meta.docV2.details.appDetails.versionCode == 3
+        assert downloader.download_prepared(meta).success is True
+        assert Manifest.for_directory(tmp_path).find(PACKAGE_NAME, 1)
+        assert not Manifest.for_directory(tmp_path).find(PACKAGE_NAME, 3)
+
+    def test_download_missing_version(self, stub_server, credentials, tmp_path):
+        with pytest.raises(DownloadError):
+            main(
+                [f"{PACKAGE_NAME}@2,7"],
+                credentials=credentials,
+                out_dir=tmp_path,
+            )
+        assert (tmp_path / f"{PACKAGE_NAME}.2.apk").is_file()
+        assert not (tmp_path / f"{PACKAGE_NAME}.7.apk").exists()
+
+    def test_watch_versions(self, credentials, tmp_path):
+        with pytest.raises(RuntimeError):
+            main(
+                [f"{PACKAGE_NAME}@2"],
+                credentials=credentials,
+                out_dir=tmp_path,
+                watch=60,
+            )
+
+    def test_watch_with_prefetch(self, credentials, tmp_path):
+        with pytest.raises(RuntimeError):
+            main(
+                [PACKAGE_NAME],
+                credentials=credentials,
+                out_dir=tmp_path,
+                prefetch=2,
+                watch=60,
+            )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import time
+
+import pytest
+
+from playstoredownloader.downloader.downloader import Downloader
+from playstoredownloader.downloader.manifest import Manifest
+from playstoredownloader.downloader.watch import Watcher
+from playstoredownloader.playstore.playstore import Playstore
+from test.stub_server import StubServer, synthetic_apps, write_credentials
+
+APPS = synthetic_apps(5, apk_size=1024, prefix="com.watched.app")
+PACKAGE_NAMES = [app.package_name for app in APPS]
+
+
+@pytest.fixture(scope="function")
+def stub_server(monkeypatch):
+    with StubServer(APPS) as server:
+        monkeypatch.setattr(Playstore, "LOGIN_URL", server.login_url)
+        monkeypatch.setattr(Playstore, "API_URL", server.api_url)
+        yield server
+
+
+@pytest.fixture(scope="function")
+def credentials(tmp_path):
+    return write_credentials(str(tmp_path / "credentials.json"))
+
+
+# noinspection PyShadowingNames
+class TestWatcher(object):
+    def test_bulk_details(self, stub_server, credentials):
+        api = Playstore(credentials)
+        docs = api.bulk_details(PACKAGE_NAMES[:2] + ["com.missing"])
+        assert sorted(docs) == PACKAGE_NAMES[:2]
+        assert docs[PACKAGE_NAMES[0]].details.appDetails.versionCode == 1
+
+    def test_new_versions(self, stub_server, credentials):
+        new_versions = []
+        watcher = Watcher(
+            Playstore(credentials),
+            PACKAGE_NAMES,
+            lambda package_name, version_code: new_versions.append(
+                (package_name, version_code)
+            ),
+            batch_size=2,
+        )
+        assert [len(batch) for batch in watcher.batches] == [2, 2, 1]
+
+        for batch in watcher.batches:
+            watcher.check(batch)
+        assert new_versions == [(package_name, 1) for package_name in PACKAGE_NAMES]
+
+        # Only the apps with a different version are reported.
+        new_versions.clear()
+        stub_server.apps[PACKAGE_NAMES[3]].version_code = 2
+        for batch in watcher.batches:
+            watcher.check(batch)
+        assert new_versions == [(PACKAGE_NAMES[3], 2)]
+        assert stub_server.request_count("/fdfe/bulkDetails") == 6
+
+    def test_versions_already_downloaded(self, stub_server, credentials, tmp_path):
+        downloader = Downloader(False, False, credentials, tmp_path, None)
+        assert downloader.download(PACKAGE_NAMES[0]).success is True
+
+        new_versions = []
+        watcher = Watcher(
+            downloader.api,
+            PACKAGE_NAMES[:2],
+            lambda package_name, _: new_versions.append(package_name),
+            manifest=Manifest.for_directory(tmp_path),
+        )
+        watcher.check(PACKAGE_NAMES[:2])
+        assert new_versions == [PACKAGE_NAMES[1]]
+
+    def test_checks_spread_over_interval(self, stub_server, credentials):
+        check_times = []
+        watcher = Watcher(
+            Playstore(credentials),
+            PACKAGE_NAMES,
+            lambda *_: None,
+            interval=0.6,
+            batch_size=2,
+            jitter=0.1,
+        )
+        original_check = watcher.check
+
+        def check(batch):
+            check_times.append((time.monotonic(), batch[0]))
+            return original_check(batch)
+
+        watcher.check = check
+        start = time.monotonic()
+        watcher.run(cycles=2)
+
+        assert [batch for _, batch in check_times] == [
+            PACKAGE_NAMES[0],
+            PACKAGE_NAMES[2],
+            PACKAGE_NAMES[4],
+        ] * 2
+        offsets = [check_time - start for check_time, _ in check_times]
+        # A batch every 0.2 seconds (plus up to 0.02 seconds of jitter).
+        for index, offset in enumerate(offsets):
+            assert index * 0.2 <= offset < index * 0.2 + 0.15